@@ -0,0 +1,65 @@
+"""Awaitable versions of the public functions in :mod:`app.crud`.
+
+Each wrapper has the same signature as its ``crud`` counterpart and accepts
+either session type (see :func:`app.database.run_db`), so routers are written
+once and the sync/async choice stays a deployment setting (``DB_ASYNC``).
+A new ``crud`` function that routers call needs its wrapper added here.
+"""
+
+import functools
+
+from . import crud
+from .database import run_db
+
+
+def _awaitable(fn):
+        @functools.wraps(fn)
+        async def wrapper(db, *args, **kwargs):
+                return await run_db(db, fn, *args, **kwargs)
+
+        return wrapper
+
+
+create_book = _awaitable(crud.create_book)
+get_book = _awaitable(crud.get_book)
+get_book_by_isbn = _awaitable(crud.get_book_by_isbn)
+list_books = _awaitable(crud.list_books)
+update_book = _awaitable(crud.update_book)
+delete_book = _awaitable(crud.delete_book)
+import_books = _awaitable(crud.import_books)
+
+create_vendor = _awaitable(crud.create_vendor)
+get_vendor = _awaitable(crud.get_vendor)
+get_vendor_by_name = _awaitable(crud.get_vendor_by_name)
+list_vendors = _awaitable(crud.list_vendors)
+update_vendor = _awaitable(crud.update_vendor)
+delete_vendor = _awaitable(crud.delete_vendor)
+
+create_customer = _awaitable(crud.create_customer)
+get_customer = _awaitable(crud.get_customer)
+get_customer_by_name = _awaitable(crud.get_customer_by_name)
+list_customers = _awaitable(crud.list_customers)
+update_customer = _awaitable(crud.update_customer)
+delete_customer = _awaitable(crud.delete_customer)
+
+create_purchase = _awaitable(crud.create_purchase)
+create_purchases_bulk = _awaitable(crud.create_purchases_bulk)
+get_purchase = _awaitable(crud.get_purchase)
+list_purchases = _awaitable(crud.list_purchases)
+
+create_sale = _awaitable(crud.create_sale)
+create_sales_bulk = _awaitable(crud.create_sales_bulk)
+get_sale = _awaitable(crud.get_sale)
+list_sales = _awaitable(crud.list_sales)
+
+create_sales_return = _awaitable(crud.create_sales_return)
+get_sales_return = _awaitable(crud.get_sales_return)
+list_sales_returns = _awaitable(crud.list_sales_returns)
+
+create_sales_order = _awaitable(crud.create_sales_order)
+get_sales_order = _awaitable(crud.get_sales_order)
+list_sales_orders = _awaitable(crud.list_sales_orders)
+
+create_purchase_order = _awaitable(crud.create_purchase_order)
+get_purchase_order = _awaitable(crud.get_purchase_order)
+list_purchase_orders = _awaitable(crud.list_purchase_orders)
@@ -0,0 +1,233 @@
+"""Read-through cache for single-row lookups (books, vendors, customers).
+
+``crud.get_book`` / ``get_vendor`` / ``get_customer`` with ``cached=True``
+back the detail pages. With ``ENTITY_CACHE`` set they read a column snapshot
+from the cache instead, and re-attach it to the caller's session with
+``merge(load=False)`` so no ``SELECT`` is issued; the ``crud`` write functions
+invalidate entries after they commit. A snapshot can be up to
+``ENTITY_CACHE_TTL`` old, so write paths never start from one: they go
+through :func:`load`, which reads the row.
+
+``ENTITY_CACHE``
+    ``memory`` (per-process LRU), ``redis`` (shared by all workers) or unset
+    / ``off`` (default).
+``ENTITY_CACHE_TTL`` / ``ENTITY_CACHE_SIZE``
+    Seconds an entry lives (default 30) and ``memory`` capacity (default 1024).
+``ENTITY_CACHE_URL``
+    Server for ``redis``; needs the ``redis`` package. Any client with
+    ``get``/``set``/``delete``/``scan_iter`` can be plugged in with
+    :func:`configure`.
+
+A ``memory`` cache only sees its own process's writes, so with several
+workers use ``redis`` or accept up to ``ENTITY_CACHE_TTL`` of staleness.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import DateTime, Numeric
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "30"))
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "1024"))
+
+
+class MemoryBackend:
+        """Bounded LRU of ``key -> (expires_at, snapshot)``."""
+
+        def __init__(self, max_size: int = ENTITY_CACHE_SIZE, ttl: float = ENTITY_CACHE_TTL):
+                self.max_size = max_size
+                self.ttl = ttl
+                self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+                self._lock = threading.Lock()
+
+        def get(self, key: str) -> Optional[dict]:
+                with self._lock:
+                        entry = self._entries.get(key)
+                        if entry is None:
+                                return None
+                        if entry[0] <= time.monotonic():
+                                del self._entries[key]
+                                return None
+                        self._entries.move_to_end(key)
+                        return entry[1]
+
+        def set(self, key: str, snapshot: dict) -> None:
+                with self._lock:
+                        self._entries[key] = (time.monotonic() + self.ttl, snapshot)
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.max_size:
+                                self._entries.popitem(last=False)
+
+        def delete(self, *keys: str) -> None:
+                with self._lock:
+                        for key in keys:
+                                self._entries.pop(key, None)
+
+        def clear(self, prefix: str) -> None:
+                with self._lock:
+                        for key in [key for key in self._entries if key.startswith(prefix)]:
+                                del self._entries[key]
+
+
+class RedisBackend:
+        """Shared cache on a Redis-compatible client; snapshots are stored as JSON."""
+
+        def __init__(self, client, ttl: float = ENTITY_CACHE_TTL, namespace: str = "inventory:"):
+                self.client = client
+                self.ttl = ttl
+                self.namespace = namespace
+
+        def get(self, key: str) -> Optional[dict]:
+                raw = self.client.get(self.namespace + key)
+                return None if raw is None else json.loads(raw)
+
+        def set(self, key: str, snapshot: dict) -> None:
+                self.client.set(self.namespace + key, json.dumps(snapshot, default=_to_json), ex=max(int(self.ttl), 1))
+
+        def delete(self, *keys: str) -> None:
+                if keys:
+                        self.client.delete(*(self.namespace + key for key in keys))
+
+        def clear(self, prefix: str) -> None:
+                keys = list(self.client.scan_iter(match=f"{self.namespace}{prefix}*"))
+                if keys:
+                        self.client.delete(*keys)
+
+
+class CacheStats:
+        def __init__(self) -> None:
+                self._lock = threading.Lock()
+                self.hits: Dict[str, int] = {}
+                self.misses: Dict[str, int] = {}
+
+        def record(self, table: str, hit: bool) -> None:
+                with self._lock:
+                        counter = self.hits if hit else self.misses
+                        counter[table] = counter.get(table, 0) + 1
+
+
+_backend = None
+_stats = CacheStats()
+# Bumped on invalidation so a read racing a write never stores the old row
+_generations: Dict[str, int] = {}
+_generation_lock = threading.Lock()
+
+
+def configure(backend) -> None:
+        """Install ``backend`` (``MemoryBackend``, ``RedisBackend`` or None to disable)."""
+        global _backend
+        _backend = backend
+
+
+def _from_env() -> None:
+        kind = os.getenv("ENTITY_CACHE", "off").lower()
+        if kind == "memory":
+                configure(MemoryBackend())
+        elif kind == "redis":
+                import redis
+
+                configure(RedisBackend(redis.Redis.from_url(os.environ["ENTITY_CACHE_URL"])))
+        elif kind not in ("", "off", "0", "none"):
+                raise ValueError(f"Unknown ENTITY_CACHE: {kind}")
+
+
+def _to_json(value):
+        if isinstance(value, datetime):
+                return value.isoformat()
+        if isinstance(value, Decimal):
+                return str(value)
+        if isinstance(value, Enum):
+                return value.name
+        raise TypeError(f"Cannot cache {type(value).__name__}")
+
+
+def _snapshot(obj) -> dict:
+        return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def _restore(model, snapshot: dict):
+        values = {}
+        for column in model.__table__.columns:
+                value = snapshot[column.key]
+                if isinstance(value, str):
+                        # JSON round trip (redis): rebuild the Python types
+                        if isinstance(column.type, DateTime):
+                                value = datetime.fromisoformat(value)
+                        elif isinstance(column.type, Numeric):
+                                value = Decimal(value)
+                        elif isinstance(column.type, SAEnum) and column.type.enum_class is not None:
+                                value = column.type.enum_class[value]
+                values[column.key] = value
+        obj = model(**values)
+        make_transient_to_detached(obj)
+        return obj
+
+
+def _key(table: str, row_id) -> str:
+        return f"{table}:{row_id}"
+
+
+def get(db: Session, model, row_id: int):
+        """``db.get(model, row_id)``, served from the cache when possible."""
+        if _backend is None:
+                return db.get(model, row_id)
+        present = db.identity_map.get(identity_key(model, row_id))
+        if present is not None:
+                return present
+        table = model.__tablename__
+        snapshot = _backend.get(_key(table, row_id))
+        _stats.record(table, snapshot is not None)
+        if snapshot is not None:
+                return db.merge(_restore(model, snapshot), load=False)
+        with _generation_lock:
+                generation = _generations.get(table, 0)
+        obj = db.get(model, row_id)
+        if obj is not None:
+                with _generation_lock:
+                        if _generations.get(table, 0) == generation:
+                                _backend.set(_key(table, row_id), _snapshot(obj))
+        return obj
+
+
+def load(db: Session, model, row_id: int):
+        """``db.get(model, row_id)`` from the database, for write paths.
+
+        A cached snapshot already merged into ``db`` is refreshed from the row.
+        """
+        return db.get(model, row_id, populate_existing=_backend is not None)
+
+
+def invalidate(model, *row_ids: int) -> None:
+        """Drop ``row_ids`` of ``model``, or every cached row of it if none are given."""
+        if _backend is None:
+                return
+        table = model.__tablename__
+        with _generation_lock:
+                _generations[table] = _generations.get(table, 0) + 1
+                if row_ids:
+                        _backend.delete(*(_key(table, row_id) for row_id in row_ids))
+                else:
+                        _backend.clear(f"{table}:")
+
+
+def stats() -> dict:
+        """Backend in use and per-table hit/miss counters."""
+        return {
+                "backend": type(_backend).__name__ if _backend is not None else None,
+                "hits": dict(_stats.hits),
+                "misses": dict(_stats.misses),
+        }
+
+
+_from_env()
@@ -0,0 +1,140 @@
+"""HTTP conditional ``GET`` (``ETag`` / ``Last-Modified`` / ``304``).
+
+Validators come from ``updated_at``, which every write bumps:
+
+* detail endpoints hash the ``updated_at`` of the row and of the related rows
+  loaded for the requested ``expand`` level, so no query is needed;
+* list endpoints hash the JSON body of the page they are about to send, so
+  a plain ``GET`` costs no extra query. They send no ``Last-Modified``: a
+  deleted row would not move it.
+
+A matching ``If-None-Match`` (or, without one, ``If-Modified-Since``) is
+answered with ``304``; for a detail endpoint before anything is serialized,
+for a list after the page is loaded, which saves the transfer but not the
+queries. ETags are weak: they say the representation is equivalent, not
+byte-equal.
+
+``Cache-Control`` is ``CACHE_CONTROL`` (default ``no-cache``: reuse only after
+revalidating), overridable per router with ``CACHE_CONTROL_<ROUTER>``, e.g.
+``CACHE_CONTROL_BOOKS="private, max-age=30"``; an empty value sends none.
+
+SQLite stores ``updated_at`` with whole-second resolution, so on SQLite two
+writes to the same row within one second can share a detail validator.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, NamedTuple, Optional, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy import inspect
+
+from . import schemas
+
+
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "no-cache")
+
+class Validators(NamedTuple):
+        etag: str
+        last_modified: Optional[datetime]
+
+
+def _validators(parts: Sequence, stamps: Sequence[Optional[datetime]]) -> Validators:
+        digest = hashlib.sha256(repr(tuple(parts) + tuple(stamps)).encode()).hexdigest()[:32]
+        known = [_utc(stamp) for stamp in stamps if stamp is not None]
+        return Validators(f'W/"{digest}"', max(known) if known else None)
+
+
+def _utc(value: datetime) -> datetime:
+        # SQLite hands back naive UTC timestamps
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def page_validators(result) -> Validators:
+        """Validators for a list response, from its body (``serialization.respond`` output)."""
+        body = result.body if isinstance(result, Response) else result.model_dump_json().encode()
+        return Validators(f'W/"{hashlib.sha256(body).hexdigest()[:32]}"', None)
+
+
+def _stamps(obj, depth: int = 2) -> list:
+        # Only state that is already loaded is read, so this never hits the database
+        state = inspect(obj)
+        stamps = [(state.mapper.local_table.name, state.identity, state.dict.get("updated_at"))]
+        if depth:
+                for rel in state.mapper.relationships:
+                        value = state.dict.get(rel.key)
+                        if value is None:
+                                continue
+                        # Collections count only when loaded for the response (order lines)
+                        for item in value if rel.uselist else (value,):
+                                stamps.extend(_stamps(item, depth - 1))
+        return stamps
+
+
+def object_validators(obj, expand: Optional[schemas.Expand] = None) -> Validators:
+        """Validators for a detail response, from the loaded row and its loaded relations."""
+        stamps = _stamps(obj)
+        return _validators([expand.value if expand else None] + [s[:2] for s in stamps], [s[2] for s in stamps])
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+        if if_none_match.strip() == "*":
+                return True
+        opaque = etag.removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, last_modified: Optional[datetime]) -> bool:
+        if last_modified is None:
+                return False
+        try:
+                since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+                return False
+        if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have whole-second resolution
+        return last_modified.replace(microsecond=0) <= since
+
+
+class Policy:
+        """Conditional ``GET`` handling and ``Cache-Control`` for one router."""
+
+        def __init__(self, router: str):
+                self.cache_control = os.getenv(f"CACHE_CONTROL_{router.upper()}", CACHE_CONTROL)
+
+        def headers(self, validators: Validators) -> Dict[str, str]:
+                headers = {"ETag": validators.etag}
+                if validators.last_modified is not None:
+                        headers["Last-Modified"] = format_datetime(validators.last_modified, usegmt=True)
+                if self.cache_control:
+                        headers["Cache-Control"] = self.cache_control
+                return headers
+
+        def not_modified(self, request: Request, validators: Validators) -> Optional[Response]:
+                """A ``304`` response if the client's copy is current, else None."""
+                if_none_match = request.headers.get("if-none-match")
+                if if_none_match is not None:
+                        fresh = _matches(if_none_match, validators.etag)
+                else:
+                        if_modified_since = request.headers.get("if-modified-since")
+                        fresh = if_modified_since is not None and _not_modified_since(
+                                if_modified_since, validators.last_modified
+                        )
+                return Response(status_code=304, headers=self.headers(validators)) if fresh else None
+
+        def send(self, result, response: Response, validators: Validators):
+                """Attach the validators to ``result``, or to ``response`` if it is a model."""
+                target = result if isinstance(result, Response) else response
+                target.headers.update(self.headers(validators))
+                return result
+
+        def send_page(self, request: Request, result, response: Response):
+                """Send a list response with :func:`page_validators`, or ``304`` if the client has it."""
+                validators = page_validators(result)
+                not_modified = self.not_modified(request, validators)
+                if not_modified is not None:
+                        return not_modified
+                return self.send(result, response, validators)
@@ -0,0 +1,86 @@
+"""Total-count strategies for paginated list endpoints.
+
+``exact`` runs ``COUNT(*)`` but memoises the result for a short TTL, keyed by
+table and filter set, and is invalidated by the ``crud`` write functions.
+``estimate`` asks the PostgreSQL planner instead of scanning (``reltuples``
+for unfiltered lists, the plan's row estimate otherwise) and falls back to
+``exact`` on other backends. ``none`` skips counting; callers rely on the
+page's ``has_more`` flag.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from .schemas import TotalMode
+
+
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "5"))
+
+_cache: Dict[Tuple[str, str], Tuple[float, int]] = {}
+# Bumped on every invalidation so a count computed concurrently with a write
+# is not stored after the write has already cleared the cache.
+_generations: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def invalidate(*tables: str) -> None:
+        with _lock:
+                for table in tables:
+                        _generations[table] = _generations.get(table, 0) + 1
+                for key in [key for key in _cache if key[0] in tables]:
+                        del _cache[key]
+
+
+def total(db: Session, model, conditions: Sequence, mode: TotalMode = TotalMode.EXACT) -> Optional[int]:
+        if mode == TotalMode.NONE:
+                return None
+        if mode == TotalMode.ESTIMATE and db.get_bind().dialect.name == "postgresql":
+                estimate = _estimate(db, model, conditions)
+                if estimate is not None:
+                        return estimate
+        return _exact(db, model, conditions)
+
+
+def _exact(db: Session, model, conditions: Sequence) -> int:
+        table = model.__tablename__
+        count_stmt = select(func.count()).select_from(model).where(*conditions)
+        compiled = count_stmt.compile(dialect=db.get_bind().dialect)
+        key = (table, f"{compiled}|{sorted(compiled.params.items())!r}")
+        now = time.monotonic()
+        with _lock:
+                cached = _cache.get(key)
+                generation = _generations.get(table, 0)
+        if cached and cached[0] > now:
+                return cached[1]
+        value = int(db.execute(count_stmt).scalar_one())
+        if COUNT_CACHE_TTL > 0:
+                with _lock:
+                        if _generations.get(table, 0) == generation:
+                                _cache[key] = (now + COUNT_CACHE_TTL, value)
+        return value
+
+
+def _estimate(db: Session, model, conditions: Sequence) -> Optional[int]:
+        if not conditions:
+                reltuples = db.execute(
+                        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"),
+                        {"table": model.__tablename__},
+                ).scalar()
+                # -1 means the table has never been vacuumed or analyzed
+                if reltuples is None or reltuples < 0:
+                        return None
+                return int(reltuples)
+        stmt = select(model.id).where(*conditions)
+        compiled = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+        # Run through the driver directly: the literal SQL may contain colons
+        # (timestamps) that text() would mistake for bind parameters.
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+        if isinstance(plan, str):
+                plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
@@ -1,17 +1,149 @@
-from typing import Optional, List, Tuple
+from typing import Optional, List, Dict, FrozenSet, Iterable, Sequence, Tuple
 from decimal import Decimal
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import select, func
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from pydantic import ValidationError
+from sqlalchemy import select, func, insert, update, bindparam, DateTime
 
 from .models import CustomerCategory
 
-from . import models, schemas
+from . import cache, counting, events, filtering, models, reorder, schemas, search, stock, summaries
+from .database import upsert_insert
+from .pagination import Page, paginate
 
 
 def _to_decimal(value: float) -> Decimal:
         return Decimal(str(value))
 
 
+class BulkWriteError(ValueError):
+        """Raised when any line of a bulk request is invalid; nothing is written."""
+
+        def __init__(self, errors: List[dict]):
+                super().__init__("Bulk request contains invalid lines")
+                self.errors = errors
+
+
+def _existing_ids(db: Session, model, ids) -> set:
+        return set(db.scalars(select(model.id).where(model.id.in_(set(ids)))).all())
+
+
+def _insert_ids(db: Session, stmt, table, rows: List[dict]) -> List[int]:
+        """Run ``stmt`` (an ``insert(table)``) for ``rows`` as multi-row
+        ``INSERT ... RETURNING`` statements and return the new ids in input order.
+
+        ``sort_by_parameter_order`` does that on PostgreSQL, but SQLAlchemy has
+        no sentinel for SQLite and falls back to one ``INSERT`` per row there.
+        On SQLite the ids are sorted instead: a statement assigns increasing
+        rowids in ``VALUES`` order, and the transaction holds the write lock.
+        """
+        if db.get_bind().dialect.name == "sqlite":
+                return sorted(db.scalars(stmt.returning(table.c.id), rows).all())
+        return list(db.scalars(stmt.returning(table.c.id, sort_by_parameter_order=True), rows).all())
+
+
+def _apply_search(db: Session, model, q: str, stmt, conditions: list):
+        """Add the search filter for ``q`` and return ``(stmt, order_by)``.
+
+        ``order_by`` is the relevance ordering when the backend can rank, else None.
+        """
+        plan = search.plan(db, model, q)
+        conditions.append(plan.condition)
+        if plan.ranked is None:
+                return stmt, None
+        stmt = stmt.join(plan.ranked, plan.ranked.c.id == model.id)
+        return stmt, [plan.ranked.c.score.desc()]
+
+
+def _select(model, as_rows: bool):
+        """``SELECT`` of ``model`` as ORM objects, or of its bare columns with ``as_rows``.
+
+        Column rows (returned by ``paginate`` as dicts) skip identity-map
+        bookkeeping and object construction, and validate into the response
+        schemas faster than attribute reads do.
+        """
+        return select(*model.__table__.c) if as_rows else select(model)
+
+
+# Loader options per ``expand`` level: nothing for ids, just the name/title
+# columns (plus ``updated_at``, for ETags) for compact, whole related rows for
+# full. ``load`` picks the eager strategy used for full (selectin for pages,
+# joined for single rows).
+
+
+def _purchase_options(expand: schemas.Expand, load=selectinload) -> list:
+        if expand == schemas.Expand.IDS:
+                return []
+        if expand == schemas.Expand.COMPACT:
+                return [
+                        joinedload(models.Purchase.vendor).load_only(models.Vendor.name, models.Vendor.updated_at),
+                        joinedload(models.Purchase.book).load_only(models.Book.title, models.Book.updated_at),
+                ]
+        return [load(models.Purchase.vendor), load(models.Purchase.book)]
+
+
+def _purchase_rows(expand: schemas.Expand):
+        stmt = _select(models.Purchase, as_rows=True)
+        if expand == schemas.Expand.COMPACT:
+                stmt = (
+                        stmt.add_columns(models.Vendor.name.label("vendor_name"), models.Book.title.label("book_title"))
+                        .join(models.Vendor, models.Vendor.id == models.Purchase.vendor_id)
+                        .join(models.Book, models.Book.id == models.Purchase.book_id)
+                )
+        return stmt
+
+
+def _sale_options(expand: schemas.Expand, load=selectinload) -> list:
+        if expand == schemas.Expand.IDS:
+                return []
+        if expand == schemas.Expand.COMPACT:
+                return [
+                        joinedload(models.Sale.customer).load_only(models.Customer.name, models.Customer.updated_at),
+                        joinedload(models.Sale.book).load_only(models.Book.title, models.Book.updated_at),
+                ]
+        return [load(models.Sale.customer), load(models.Sale.book)]
+
+
+def _sale_rows(expand: schemas.Expand):
+        stmt = _select(models.Sale, as_rows=True)
+        if expand == schemas.Expand.COMPACT:
+                stmt = (
+                        stmt.add_columns(models.Customer.name.label("customer_name"), models.Book.title.label("book_title"))
+                        .join(models.Customer, models.Customer.id == models.Sale.customer_id)
+                        .join(models.Book, models.Book.id == models.Sale.book_id)
+                )
+        return stmt
+
+
+def _sales_return_options(expand: schemas.Expand, load=selectinload) -> list:
+        if expand == schemas.Expand.IDS:
+                return []
+        if expand == schemas.Expand.COMPACT:
+                sale = joinedload(models.SalesReturn.sale)
+                return [
+                        sale.load_only(models.Sale.book_id, models.Sale.customer_id),
+                        sale.joinedload(models.Sale.customer).load_only(models.Customer.name, models.Customer.updated_at),
+                        sale.joinedload(models.Sale.book).load_only(models.Book.title, models.Book.updated_at),
+                ]
+        return [load(models.SalesReturn.sale).options(load(models.Sale.customer), load(models.Sale.book))]
+
+
+def _sales_return_rows(expand: schemas.Expand):
+        stmt = _select(models.SalesReturn, as_rows=True)
+        if expand == schemas.Expand.COMPACT:
+                stmt = (
+                        stmt.add_columns(
+                                models.Sale.book_id,
+                                models.Book.title.label("book_title"),
+                                models.Customer.name.label("customer_name"),
+                        )
+                        .join(models.Sale, models.Sale.id == models.SalesReturn.sale_id)
+                        .join(models.Book, models.Book.id == models.Sale.book_id)
+                        .join(models.Customer, models.Customer.id == models.Sale.customer_id)
+                )
+        return stmt
+
+
 def create_book(db: Session, book_in: schemas.BookCreate) -> models.Book:
 	book = models.Book(
 		title=book_in.title,
@@ -21,13 +153,16 @@ def create_book(db: Session, book_in: schemas.BookCreate) -> models.Book:
 		price=book_in.price,
 	)
 	db.add(book)
+	db.flush()
+	stock.record(db, [(book.id, book.quantity, models.StockMovementKind.OPENING, None)])
+	events.record(db, "books", book.id, quantity=book.quantity, updated_at=book.updated_at)
 	db.commit()
-	db.refresh(book)
+	counting.invalidate("books")
 	return book
 
 
-def get_book(db: Session, book_id: int) -> Optional[models.Book]:
-	return db.get(models.Book, book_id)
+def get_book(db: Session, book_id: int, cached: bool = False) -> Optional[models.Book]:
+	return cache.get(db, models.Book, book_id) if cached else cache.load(db, models.Book, book_id)
 
 
 def get_book_by_isbn(db: Session, isbn: str) -> Optional[models.Book]:
@@ -40,48 +175,173 @@ def list_books(
 	skip: int = 0,
 	limit: int = 20,
 	q: Optional[str] = None,
-) -> Tuple[List[models.Book], int]:
-	stmt = select(models.Book)
-	count_stmt = select(func.count()).select_from(models.Book)
+	cursor: Optional[str] = None,
+	total_mode: schemas.TotalMode = schemas.TotalMode.EXACT,
+	as_rows: bool = False,
+	filters: Sequence[filtering.Filter] = (),
+	sort: Optional[filtering.Sort] = None,
+) -> Page:
+	conditions = filtering.conditions(models.Book, filters)
+	order_by = None
+	stmt = _select(models.Book, as_rows)
 	if q:
-		pattern = f"%{q}%"
-		stmt = stmt.where(
-			(models.Book.title.ilike(pattern)) | (models.Book.author.ilike(pattern)) | (models.Book.isbn.ilike(pattern))
-		)
-		count_stmt = count_stmt.where(
-			(models.Book.title.ilike(pattern)) | (models.Book.author.ilike(pattern)) | (models.Book.isbn.ilike(pattern))
-		)
-	stmt = stmt.offset(skip).limit(limit).order_by(models.Book.created_at.desc())
-	items = list(db.scalars(stmt).all())
-	total = db.execute(count_stmt).scalar_one()
-	return items, int(total)
+		book = search.find_by_isbn(db, q) if not filters else None
+		if book is not None:
+			total = None if total_mode == schemas.TotalMode.NONE else 1
+			return Page([book] if skip == 0 else [], total, None, False)
+		stmt, order_by = _apply_search(db, models.Book, q, stmt, conditions)
+	# An explicit sort replaces search relevance
+	if sort is not None:
+		order_by = None
+	sort_column, descending = filtering.sort_column(models.Book, "books", sort)
+	stmt = stmt.where(*conditions)
+	items, next_cursor, has_more = paginate(
+		db,
+		stmt,
+		sort_column,
+		skip=skip,
+		limit=limit,
+		cursor=cursor,
+		order_by=order_by,
+		as_rows=as_rows,
+		descending=descending,
+	)
+	total = counting.total(db, models.Book, conditions, total_mode)
+	return Page(items, total, next_cursor, has_more)
 
 
 def update_book(db: Session, book: models.Book, book_in: schemas.BookUpdate) -> models.Book:
 	data = book_in.model_dump(exclude_unset=True)
+	# Stock is only ever written through the ledger
+	quantity = data.pop("quantity", None)
+	if quantity is not None:
+		stock.adjust(db, book.id, quantity)
 	for key, value in data.items():
 		setattr(book, key, value)
 	db.add(book)
+	db.flush()
+	events.record(db, "books", book.id, quantity=book.quantity, updated_at=book.updated_at)
 	db.commit()
-	db.refresh(book)
+	counting.invalidate("books")
+	cache.invalidate(models.Book, book.id)
 	return book
 
 
 def delete_book(db: Session, book: models.Book) -> None:
+        summaries.forget_book(db, book.id)
+        stock.forget_book(db, book.id)
+        reorder.forget_book(db, book.id)
         db.delete(book)
+        events.record(db, "books", book.id, op="delete")
         db.commit()
+        counting.invalidate("books", "purchases", "sales", "sales_returns")
+        cache.invalidate(models.Book, book.id)
+
+
+def _validation_detail(exc: ValidationError) -> str:
+	return "; ".join(
+		f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+	)
+
+
+def _upsert_books(db: Session, books: List[schemas.BookCreate]) -> Tuple[int, int]:
+	by_isbn: Dict[str, Tuple[dict, FrozenSet[str]]] = {}
+	without_isbn = []
+	for book_in in books:
+		row = book_in.model_dump()
+		row["isbn"] = row["isbn"] or None
+		if row["isbn"] is None:
+			without_isbn.append(row)
+		else:
+			# Last occurrence wins; one statement may not touch a row twice
+			by_isbn[row["isbn"]] = (row, frozenset(book_in.model_fields_set) - {"isbn"})
+	existing = _existing_stock(db, by_isbn) if by_isbn else {}
+	table = models.Book.__table__
+	movements = []
+	# An existing book only gets the columns its record gave (a file without a
+	# price column keeps the stored prices), so rows are upserted per column set
+	by_columns: Dict[FrozenSet[str], List[dict]] = {}
+	for row, columns in by_isbn.values():
+		by_columns.setdefault(columns, []).append(row)
+	for columns, rows in by_columns.items():
+		stmt = upsert_insert(db, table)
+		stmt = stmt.on_conflict_do_update(
+			index_elements=[table.c.isbn],
+			set_={**{name: stmt.excluded[name] for name in sorted(columns)}, "updated_at": func.now()},
+		)
+		for book_id, isbn, quantity, updated_at in db.execute(
+			stmt.returning(table.c.id, table.c.isbn, table.c.quantity, table.c.updated_at), rows
+		):
+			events.record(db, "books", book_id, quantity=quantity, updated_at=updated_at)
+			if isbn in existing:
+				movements.append((book_id, quantity - existing[isbn], models.StockMovementKind.ADJUSTMENT, None))
+			else:
+				movements.append((book_id, quantity, models.StockMovementKind.OPENING, None))
+	if without_isbn:
+		returning = insert(table).returning(table.c.id, table.c.quantity, table.c.updated_at)
+		for book_id, quantity, updated_at in db.execute(returning, without_isbn):
+			events.record(db, "books", book_id, quantity=quantity, updated_at=updated_at)
+			movements.append((book_id, quantity, models.StockMovementKind.OPENING, None))
+	stock.record(db, movements)
+	db.commit()
+	return len(by_isbn) - len(existing) + len(without_isbn), len(existing)
+
+
+def _existing_stock(db: Session, isbns) -> Dict[str, int]:
+	"""``{isbn: quantity}`` for the books already stored, locked until commit."""
+	stmt = select(models.Book.isbn, models.Book.quantity).where(models.Book.isbn.in_(list(isbns))).with_for_update()
+	return dict(db.execute(stmt).all())
+
+
+def import_books(db: Session, records: Iterable[Optional[dict]], chunk_size: int = 1000) -> dict:
+	"""Create or update books from ``records``, upserting on ISBN.
+
+	Records are validated one by one and written in chunks of ``chunk_size``
+	with an ``INSERT ... ON CONFLICT (isbn) DO UPDATE`` per set of columns the
+	records give (one for a uniform file), committed per chunk. An existing
+	book keeps the columns its record leaves out. Invalid records (``None``
+	for unparseable ones) are skipped and reported by position; they do not
+	stop the import.
+	"""
+	created = updated = 0
+	errors = []
+	chunk: List[schemas.BookCreate] = []
+	# Earlier chunks are committed even if a later one fails
+	try:
+		for index, record in enumerate(records):
+			if record is None:
+				errors.append({"index": index, "detail": "Malformed record"})
+				continue
+			try:
+				chunk.append(schemas.BookCreate.model_validate(record))
+			except ValidationError as exc:
+				errors.append({"index": index, "detail": _validation_detail(exc)})
+				continue
+			if len(chunk) >= chunk_size:
+				chunk_created, chunk_updated = _upsert_books(db, chunk)
+				created, updated = created + chunk_created, updated + chunk_updated
+				chunk = []
+		if chunk:
+			chunk_created, chunk_updated = _upsert_books(db, chunk)
+			created, updated = created + chunk_created, updated + chunk_updated
+	finally:
+		counting.invalidate("books")
+		cache.invalidate(models.Book)
+	return {"created": created, "updated": updated, "errors": errors}
 
 
 def create_vendor(db: Session, vendor_in: schemas.VendorCreate) -> models.Vendor:
         vendor = models.Vendor(**vendor_in.model_dump())
         db.add(vendor)
+        db.flush()
+        events.record(db, "vendors", vendor.id, updated_at=vendor.updated_at)
         db.commit()
-        db.refresh(vendor)
+        counting.invalidate("vendors")
         return vendor
 
 
-def get_vendor(db: Session, vendor_id: int) -> Optional[models.Vendor]:
-        return db.get(models.Vendor, vendor_id)
+def get_vendor(db: Session, vendor_id: int, cached: bool = False) -> Optional[models.Vendor]:
+        return cache.get(db, models.Vendor, vendor_id) if cached else cache.load(db, models.Vendor, vendor_id)
 
 
 def get_vendor_by_name(db: Session, name: str) -> Optional[models.Vendor]:
@@ -94,17 +354,34 @@ def list_vendors(
         skip: int = 0,
         limit: int = 20,
         q: Optional[str] = None,
-) -> Tuple[List[models.Vendor], int]:
-        stmt = select(models.Vendor)
-        count_stmt = select(func.count()).select_from(models.Vendor)
+        cursor: Optional[str] = None,
+        total_mode: schemas.TotalMode = schemas.TotalMode.EXACT,
+        as_rows: bool = False,
+        filters: Sequence[filtering.Filter] = (),
+        sort: Optional[filtering.Sort] = None,
+) -> Page:
+        conditions = filtering.conditions(models.Vendor, filters)
+        order_by = None
+        stmt = _select(models.Vendor, as_rows)
         if q:
-                pattern = f"%{q}%"
-                stmt = stmt.where(models.Vendor.name.ilike(pattern))
-                count_stmt = count_stmt.where(models.Vendor.name.ilike(pattern))
-        stmt = stmt.order_by(models.Vendor.created_at.desc()).offset(skip).limit(limit)
-        items = list(db.scalars(stmt).all())
-        total = db.execute(count_stmt).scalar_one()
-        return items, int(total)
+                stmt, order_by = _apply_search(db, models.Vendor, q, stmt, conditions)
+        if sort is not None:
+                order_by = None
+        sort_column, descending = filtering.sort_column(models.Vendor, "vendors", sort)
+        stmt = stmt.where(*conditions)
+        items, next_cursor, has_more = paginate(
+                db,
+                stmt,
+                sort_column,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                order_by=order_by,
+                as_rows=as_rows,
+                descending=descending,
+        )
+        total = counting.total(db, models.Vendor, conditions, total_mode)
+        return Page(items, total, next_cursor, has_more)
 
 
 def update_vendor(db: Session, vendor: models.Vendor, vendor_in: schemas.VendorUpdate) -> models.Vendor:
@@ -112,8 +389,11 @@ def update_vendor(db: Session, vendor: models.Vendor, vendor_in: schemas.VendorU
         for key, value in data.items():
                 setattr(vendor, key, value)
         db.add(vendor)
+        db.flush()
+        events.record(db, "vendors", vendor.id, updated_at=vendor.updated_at)
         db.commit()
-        db.refresh(vendor)
+        counting.invalidate("vendors")
+        cache.invalidate(models.Vendor, vendor.id)
         return vendor
 
 
@@ -126,20 +406,27 @@ def delete_vendor(db: Session, vendor: models.Vendor) -> None:
         )
         if has_purchases:
                 raise ValueError("Cannot delete vendor with existing purchase records")
+        if db.execute(select(models.PurchaseOrder.id).where(models.PurchaseOrder.vendor_id == vendor.id).limit(1)).first():
+                raise ValueError("Cannot delete vendor with existing purchase orders")
         db.delete(vendor)
+        events.record(db, "vendors", vendor.id, op="delete")
         db.commit()
+        counting.invalidate("vendors")
+        cache.invalidate(models.Vendor, vendor.id)
 
 
 def create_customer(db: Session, customer_in: schemas.CustomerCreate) -> models.Customer:
         customer = models.Customer(**customer_in.model_dump())
         db.add(customer)
+        db.flush()
+        events.record(db, "customers", customer.id, updated_at=customer.updated_at)
         db.commit()
-        db.refresh(customer)
+        counting.invalidate("customers")
         return customer
 
 
-def get_customer(db: Session, customer_id: int) -> Optional[models.Customer]:
-        return db.get(models.Customer, customer_id)
+def get_customer(db: Session, customer_id: int, cached: bool = False) -> Optional[models.Customer]:
+        return cache.get(db, models.Customer, customer_id) if cached else cache.load(db, models.Customer, customer_id)
 
 
 def get_customer_by_name(db: Session, name: str) -> Optional[models.Customer]:
@@ -153,20 +440,36 @@ def list_customers(
         limit: int = 20,
         q: Optional[str] = None,
         category: Optional[CustomerCategory] = None,
-) -> Tuple[List[models.Customer], int]:
-        stmt = select(models.Customer)
-        count_stmt = select(func.count()).select_from(models.Customer)
+        cursor: Optional[str] = None,
+        total_mode: schemas.TotalMode = schemas.TotalMode.EXACT,
+        as_rows: bool = False,
+        filters: Sequence[filtering.Filter] = (),
+        sort: Optional[filtering.Sort] = None,
+) -> Page:
+        conditions = filtering.conditions(models.Customer, filters)
+        order_by = None
+        stmt = _select(models.Customer, as_rows)
         if q:
-                pattern = f"%{q}%"
-                stmt = stmt.where(models.Customer.name.ilike(pattern))
-                count_stmt = count_stmt.where(models.Customer.name.ilike(pattern))
+                stmt, order_by = _apply_search(db, models.Customer, q, stmt, conditions)
         if category:
-                stmt = stmt.where(models.Customer.category == category)
-                count_stmt = count_stmt.where(models.Customer.category == category)
-        stmt = stmt.order_by(models.Customer.created_at.desc()).offset(skip).limit(limit)
-        items = list(db.scalars(stmt).all())
-        total = db.execute(count_stmt).scalar_one()
-        return items, int(total)
+                conditions.append(models.Customer.category == category)
+        if sort is not None:
+                order_by = None
+        sort_column, descending = filtering.sort_column(models.Customer, "customers", sort)
+        stmt = stmt.where(*conditions)
+        items, next_cursor, has_more = paginate(
+                db,
+                stmt,
+                sort_column,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                order_by=order_by,
+                as_rows=as_rows,
+                descending=descending,
+        )
+        total = counting.total(db, models.Customer, conditions, total_mode)
+        return Page(items, total, next_cursor, has_more)
 
 
 def update_customer(db: Session, customer: models.Customer, customer_in: schemas.CustomerUpdate) -> models.Customer:
@@ -174,8 +477,11 @@ def update_customer(db: Session, customer: models.Customer, customer_in: schemas
         for key, value in data.items():
                 setattr(customer, key, value)
         db.add(customer)
+        db.flush()
+        events.record(db, "customers", customer.id, updated_at=customer.updated_at)
         db.commit()
-        db.refresh(customer)
+        counting.invalidate("customers")
+        cache.invalidate(models.Customer, customer.id)
         return customer
 
 
@@ -188,8 +494,13 @@ def delete_customer(db: Session, customer: models.Customer) -> None:
         )
         if has_sales:
                 raise ValueError("Cannot delete customer with existing sales records")
+        if db.execute(select(models.SalesOrder.id).where(models.SalesOrder.customer_id == customer.id).limit(1)).first():
+                raise ValueError("Cannot delete customer with existing sales orders")
         db.delete(customer)
+        events.record(db, "customers", customer.id, op="delete")
         db.commit()
+        counting.invalidate("customers")
+        cache.invalidate(models.Customer, customer.id)
 
 
 def create_purchase(
@@ -201,8 +512,8 @@ def create_purchase(
 ) -> models.Purchase:
         total_cost = _to_decimal(purchase_in.unit_cost) * purchase_in.quantity
         purchase = models.Purchase(
-                vendor_id=vendor.id,
-                book_id=book.id,
+                vendor=vendor,
+                book=book,
                 quantity=purchase_in.quantity,
                 unit_cost=_to_decimal(purchase_in.unit_cost),
                 total_cost=total_cost,
@@ -210,17 +521,103 @@ def create_purchase(
         )
         if purchase_in.purchased_at:
                 purchase.purchased_at = purchase_in.purchased_at
-        book.quantity += purchase_in.quantity
+        stock.put(db, book.id, purchase_in.quantity)
+        summaries.record_purchases(db, [(vendor.id, purchase_in.quantity, total_cost, purchase_in.purchased_at)])
+        reorder.record_purchases(db, [(book.id, vendor.id)])
         db.add(purchase)
-        db.add(book)
+        db.flush()
+        stock.record(db, [(book.id, purchase_in.quantity, models.StockMovementKind.PURCHASE, purchase.id)])
+        events.record(db, "purchases", purchase.id, book_id=book.id)
         db.commit()
-        db.refresh(purchase)
-        db.refresh(book)
+        counting.invalidate("purchases", "books")
+        cache.invalidate(models.Book, book.id)
         return purchase
 
 
-def get_purchase(db: Session, purchase_id: int) -> Optional[models.Purchase]:
-        return db.get(models.Purchase, purchase_id)
+def create_purchases_bulk(db: Session, purchases_in: List[schemas.PurchaseCreate]) -> List[int]:
+        """Insert many purchase lines in one transaction and return their ids in input order.
+
+        Vendor and book ids are checked with one ``IN`` query each, stock is
+        raised with one ``UPDATE`` per distinct book and the lines go in as a
+        single multi-row ``INSERT``. Any invalid line aborts the whole batch.
+        """
+        vendor_ids = _existing_ids(db, models.Vendor, [p.vendor_id for p in purchases_in])
+        book_ids = _existing_ids(db, models.Book, [p.book_id for p in purchases_in])
+        errors = []
+        for index, line in enumerate(purchases_in):
+                if line.vendor_id not in vendor_ids:
+                        errors.append({"index": index, "detail": "Vendor not found"})
+                if line.book_id not in book_ids:
+                        errors.append({"index": index, "detail": "Book not found"})
+        if errors:
+                raise BulkWriteError(errors)
+
+        rows = [
+                _purchase_row(line.vendor_id, line.book_id, line.quantity, line.unit_cost, line.purchased_at, line.notes)
+                for line in purchases_in
+        ]
+        ids = _insert_purchases(db, rows)
+        db.commit()
+        counting.invalidate("purchases", "books")
+        cache.invalidate(models.Book, *{row["book_id"] for row in rows})
+        return ids
+
+
+def _purchase_row(vendor_id: int, book_id: int, quantity: int, unit_cost, purchased_at, notes) -> dict:
+        unit_cost = _to_decimal(unit_cost)
+        return {
+                "vendor_id": vendor_id,
+                "book_id": book_id,
+                "quantity": quantity,
+                "unit_cost": unit_cost,
+                "total_cost": unit_cost * quantity,
+                "purchased_at_in": purchased_at,
+                "notes": notes,
+        }
+
+
+def _insert_purchases(db: Session, rows: List[dict], order_id: Optional[int] = None) -> List[int]:
+        """Add stock and insert purchase lines (``_purchase_row`` dicts) with one
+        multi-row ``INSERT``, plus their ledger, summary and reorder updates.
+        Returns the ids in input order; the caller commits.
+        """
+        deltas: Dict[int, int] = {}
+        for row in rows:
+                deltas[row["book_id"]] = deltas.get(row["book_id"], 0) + row["quantity"]
+                row["order_id"] = order_id
+        # Lock book rows in id order so concurrent bulk writes cannot deadlock
+        for book_id, delta in sorted(deltas.items()):
+                stock.put(db, book_id, delta)
+        table = models.Purchase.__table__
+        stmt = (
+                insert(table)
+                # Lines without an explicit purchased_at get the server default
+                .values(
+                        purchased_at=func.coalesce(bindparam("purchased_at_in", type_=DateTime(timezone=True)), func.now())
+                )
+        )
+        ids = _insert_ids(db, stmt, table, rows)
+        stock.record(
+                db, [(r["book_id"], r["quantity"], models.StockMovementKind.PURCHASE, id_) for r, id_ in zip(rows, ids)]
+        )
+        for row, purchase_id in zip(rows, ids):
+                events.record(db, "purchases", purchase_id, book_id=row["book_id"])
+        summaries.record_purchases(
+                db, [(r["vendor_id"], r["quantity"], r["total_cost"], r["purchased_at_in"]) for r in rows]
+        )
+        reorder.record_purchases(db, [(r["book_id"], r["vendor_id"]) for r in rows])
+        return ids
+
+
+def get_purchase(
+        db: Session, purchase_id: int, expand: schemas.Expand = schemas.Expand.FULL
+) -> Optional[models.Purchase]:
+        stmt = (
+                select(models.Purchase)
+                .options(*_purchase_options(expand, joinedload))
+                .where(models.Purchase.id == purchase_id)
+        )
+        return db.scalars(stmt).first()
 
 
 def list_purchases(
@@ -229,26 +626,37 @@ def list_purchases(
         limit: int = 20,
         vendor_id: Optional[int] = None,
         book_id: Optional[int] = None,
-) -> Tuple[List[models.Purchase], int]:
-        stmt = (
-                select(models.Purchase)
-                .options(
-                        selectinload(models.Purchase.vendor),
-                        selectinload(models.Purchase.book),
-                )
-                .order_by(models.Purchase.purchased_at.desc())
-        )
-        count_stmt = select(func.count()).select_from(models.Purchase)
+        cursor: Optional[str] = None,
+        total_mode: schemas.TotalMode = schemas.TotalMode.EXACT,
+        expand: schemas.Expand = schemas.Expand.FULL,
+        as_rows: bool = False,
+        filters: Sequence[filtering.Filter] = (),
+        sort: Optional[filtering.Sort] = None,
+) -> Page:
+        conditions = filtering.conditions(models.Purchase, filters)
         if vendor_id:
-                stmt = stmt.where(models.Purchase.vendor_id == vendor_id)
-                count_stmt = count_stmt.where(models.Purchase.vendor_id == vendor_id)
+                conditions.append(models.Purchase.vendor_id == vendor_id)
         if book_id:
-                stmt = stmt.where(models.Purchase.book_id == book_id)
-                count_stmt = count_stmt.where(models.Purchase.book_id == book_id)
-        stmt = stmt.offset(skip).limit(limit)
-        items = list(db.scalars(stmt).all())
-        total = db.execute(count_stmt).scalar_one()
-        return items, int(total)
+                conditions.append(models.Purchase.book_id == book_id)
+        # Nested objects need the ORM; the flatter views can be read as rows
+        as_rows = as_rows and expand != schemas.Expand.FULL
+        if as_rows:
+                stmt = _purchase_rows(expand)
+        else:
+                stmt = select(models.Purchase).options(*_purchase_options(expand))
+        sort_column, descending = filtering.sort_column(models.Purchase, "purchases", sort)
+        items, next_cursor, has_more = paginate(
+                db,
+                stmt.where(*conditions),
+                sort_column,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                as_rows=as_rows,
+                descending=descending,
+        )
+        total = counting.total(db, models.Purchase, conditions, total_mode)
+        return Page(items, total, next_cursor, has_more)
 
 
 def create_sale(
@@ -258,12 +666,10 @@ def create_sale(
         book: models.Book,
         sale_in: schemas.SaleCreate,
 ) -> models.Sale:
-        if book.quantity < sale_in.quantity:
-                raise ValueError("Insufficient stock for sale")
         total_amount = _to_decimal(sale_in.unit_price) * sale_in.quantity
         sale = models.Sale(
-                customer_id=customer.id,
-                book_id=book.id,
+                customer=customer,
+                book=book,
                 quantity=sale_in.quantity,
                 unit_price=_to_decimal(sale_in.unit_price),
                 total_amount=total_amount,
@@ -271,17 +677,115 @@ def create_sale(
         )
         if sale_in.sold_at:
                 sale.sold_at = sale_in.sold_at
-        book.quantity -= sale_in.quantity
+        try:
+                stock.take(db, book.id, sale_in.quantity)
+        except stock.InsufficientStockError:
+                db.rollback()
+                raise
+        summaries.record_sales(db, [(book.id, customer.id, sale_in.quantity, total_amount, sale_in.sold_at)])
+        reorder.record_sales(db, [(book.id, sale_in.quantity, sale_in.sold_at)])
         db.add(sale)
-        db.add(book)
+        db.flush()
+        stock.record(db, [(book.id, -sale_in.quantity, models.StockMovementKind.SALE, sale.id)])
+        events.record(db, "sales", sale.id, book_id=book.id)
         db.commit()
-        db.refresh(sale)
-        db.refresh(book)
+        counting.invalidate("sales", "books")
+        cache.invalidate(models.Book, book.id)
         return sale
 
 
-def get_sale(db: Session, sale_id: int) -> Optional[models.Sale]:
-        return db.get(models.Sale, sale_id)
+def create_sales_bulk(db: Session, sales_in: List[schemas.SaleCreate]) -> List[int]:
+        """Insert many sale lines in one transaction and return their ids in input order.
+
+        Customer and book ids are checked with one ``IN`` query each and stock
+        is taken with one conditional ``UPDATE`` per distinct book for the
+        summed quantity. Any invalid line, including insufficient stock for
+        its book, rolls the whole batch back.
+        """
+        customer_ids = _existing_ids(db, models.Customer, [s.customer_id for s in sales_in])
+        book_ids = _existing_ids(db, models.Book, [s.book_id for s in sales_in])
+        errors = []
+        for index, line in enumerate(sales_in):
+                if line.customer_id not in customer_ids:
+                        errors.append({"index": index, "detail": "Customer not found"})
+                if line.book_id not in book_ids:
+                        errors.append({"index": index, "detail": "Book not found"})
+        if errors:
+                raise BulkWriteError(errors)
+
+        rows = [
+                _sale_row(line.customer_id, line.book_id, line.quantity, line.unit_price, line.sold_at, line.notes)
+                for line in sales_in
+        ]
+        ids = _insert_sales(db, rows)
+        db.commit()
+        counting.invalidate("sales", "books")
+        cache.invalidate(models.Book, *{row["book_id"] for row in rows})
+        return ids
+
+
+def _sale_row(customer_id: int, book_id: int, quantity: int, unit_price, sold_at, notes) -> dict:
+        unit_price = _to_decimal(unit_price)
+        return {
+                "customer_id": customer_id,
+                "book_id": book_id,
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "total_amount": unit_price * quantity,
+                "sold_at_in": sold_at,
+                "notes": notes,
+        }
+
+
+def _insert_sales(db: Session, rows: List[dict], order_id: Optional[int] = None) -> List[int]:
+        """Take stock for and insert sale lines (``_sale_row`` dicts) with one
+        multi-row ``INSERT``, plus their ledger, summary and reorder updates.
+
+        Stock is taken with one conditional ``UPDATE`` per distinct book for
+        the summed quantity; if any book is short the transaction is rolled
+        back and ``BulkWriteError`` names its lines. Returns the ids in input
+        order; the caller commits.
+        """
+        deltas: Dict[int, int] = {}
+        for row in rows:
+                deltas[row["book_id"]] = deltas.get(row["book_id"], 0) + row["quantity"]
+                row["order_id"] = order_id
+        short_books = set()
+        # Lock book rows in id order so concurrent bulk writes cannot deadlock
+        for book_id, delta in sorted(deltas.items()):
+                try:
+                        stock.take(db, book_id, delta)
+                except stock.InsufficientStockError:
+                        short_books.add(book_id)
+        if short_books:
+                db.rollback()
+                raise BulkWriteError(
+                        [
+                                {"index": index, "detail": "Insufficient stock for sale"}
+                                for index, row in enumerate(rows)
+                                if row["book_id"] in short_books
+                        ]
+                )
+        table = models.Sale.__table__
+        stmt = (
+                insert(table)
+                # Lines without an explicit sold_at get the server default
+                .values(sold_at=func.coalesce(bindparam("sold_at_in", type_=DateTime(timezone=True)), func.now()))
+        )
+        ids = _insert_ids(db, stmt, table, rows)
+        stock.record(db, [(r["book_id"], -r["quantity"], models.StockMovementKind.SALE, id_) for r, id_ in zip(rows, ids)])
+        for row, sale_id in zip(rows, ids):
+                events.record(db, "sales", sale_id, book_id=row["book_id"])
+        summaries.record_sales(
+                db, [(r["book_id"], r["customer_id"], r["quantity"], r["total_amount"], r["sold_at_in"]) for r in rows]
+        )
+        reorder.record_sales(db, [(r["book_id"], r["quantity"], r["sold_at_in"]) for r in rows])
+        return ids
+
+
+def get_sale(db: Session, sale_id: int, expand: schemas.Expand = schemas.Expand.FULL) -> Optional[models.Sale]:
+        stmt = select(models.Sale).options(*_sale_options(expand, joinedload)).where(models.Sale.id == sale_id)
+        return db.scalars(stmt).first()
 
 
 def list_sales(
@@ -290,27 +794,37 @@ def list_sales(
         limit: int = 20,
         customer_id: Optional[int] = None,
         book_id: Optional[int] = None,
-) -> Tuple[List[models.Sale], int]:
-        stmt = (
-                select(models.Sale)
-                .options(
-                        selectinload(models.Sale.customer),
-                        selectinload(models.Sale.book),
-                        selectinload(models.Sale.returns),
-                )
-                .order_by(models.Sale.sold_at.desc())
-        )
-        count_stmt = select(func.count()).select_from(models.Sale)
+        cursor: Optional[str] = None,
+        total_mode: schemas.TotalMode = schemas.TotalMode.EXACT,
+        expand: schemas.Expand = schemas.Expand.FULL,
+        as_rows: bool = False,
+        filters: Sequence[filtering.Filter] = (),
+        sort: Optional[filtering.Sort] = None,
+) -> Page:
+        conditions = filtering.conditions(models.Sale, filters)
         if customer_id:
-                stmt = stmt.where(models.Sale.customer_id == customer_id)
-                count_stmt = count_stmt.where(models.Sale.customer_id == customer_id)
+                conditions.append(models.Sale.customer_id == customer_id)
         if book_id:
-                stmt = stmt.where(models.Sale.book_id == book_id)
-                count_stmt = count_stmt.where(models.Sale.book_id == book_id)
-        stmt = stmt.offset(skip).limit(limit)
-        items = list(db.scalars(stmt).all())
-        total = db.execute(count_stmt).scalar_one()
-        return items, int(total)
+                conditions.append(models.Sale.book_id == book_id)
+        # Nested objects need the ORM; the flatter views can be read as rows
+        as_rows = as_rows and expand != schemas.Expand.FULL
+        if as_rows:
+                stmt = _sale_rows(expand)
+        else:
+                stmt = select(models.Sale).options(*_sale_options(expand))
+        sort_column, descending = filtering.sort_column(models.Sale, "sales", sort)
+        items, next_cursor, has_more = paginate(
+                db,
+                stmt.where(*conditions),
+                sort_column,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                as_rows=as_rows,
+                descending=descending,
+        )
+        total = counting.total(db, models.Sale, conditions, total_mode)
+        return Page(items, total, next_cursor, has_more)
 
 
 def create_sales_return(
@@ -319,36 +833,59 @@ def create_sales_return(
         sale: models.Sale,
         sales_return_in: schemas.SalesReturnCreate,
 ) -> models.SalesReturn:
-        returned_qty = (
-                db.execute(
-                        select(func.coalesce(func.sum(models.SalesReturn.quantity), 0)).where(
-                                models.SalesReturn.sale_id == sale.id
-                        )
-                ).scalar_one()
-        )
-        if returned_qty + sales_return_in.quantity > sale.quantity:
+        # Check and bump the counter in one conditional UPDATE so concurrent
+        # returns against the same sale can never exceed what was sold
+        returned_quantity = db.scalars(
+                update(models.Sale)
+                .where(
+                        models.Sale.id == sale.id,
+                        models.Sale.returned_quantity + sales_return_in.quantity <= models.Sale.quantity,
+                )
+                .values(returned_quantity=models.Sale.returned_quantity + sales_return_in.quantity)
+                .returning(models.Sale.returned_quantity),
+                execution_options={"synchronize_session": False},
+        ).first()
+        if returned_quantity is None:
+                db.rollback()
                 raise ValueError("Return quantity exceeds sold quantity")
-        book = sale.book
-        if book is None:
-                book = db.get(models.Book, sale.book_id)
-        if book is None:
-                raise ValueError("Book not found for sale")
-        book.quantity += sales_return_in.quantity
+        # Not a pending change: the UPDATE above already wrote it
+        set_committed_value(sale, "returned_quantity", returned_quantity)
+        try:
+                stock.put(db, sale.book_id, sales_return_in.quantity)
+        except ValueError:
+                db.rollback()
+                raise
         sales_return = models.SalesReturn(
-                sale_id=sale.id,
+                sale=sale,
                 quantity=sales_return_in.quantity,
                 reason=sales_return_in.reason,
         )
+        summaries.record_returns(
+                db,
+                [(sale.book_id, sale.customer_id, sales_return_in.quantity, sales_return_in.quantity * sale.unit_price, None)],
+        )
+        reorder.record_returns(db, [(sale.book_id, sales_return_in.quantity, sale.sold_at)])
         db.add(sales_return)
-        db.add(book)
+        db.flush()
+        stock.record(db, [(sale.book_id, sales_return_in.quantity, models.StockMovementKind.RETURN, sales_return.id)])
+        events.record(db, "sales", sale.id, book_id=sale.book_id, returned_quantity=returned_quantity)
+        events.record(db, "sales_returns", sales_return.id, book_id=sale.book_id)
         db.commit()
-        db.refresh(sales_return)
-        db.refresh(book)
+        # The sale row changed too (returned_quantity)
+        counting.invalidate("sales_returns", "sales", "books")
+        cache.invalidate(models.Book, sale.book_id)
         return sales_return
 
 
-def get_sales_return(db: Session, sales_return_id: int) -> Optional[models.SalesReturn]:
-        return db.get(models.SalesReturn, sales_return_id)
+def get_sales_return(
+        db: Session, sales_return_id: int, expand: schemas.Expand = schemas.Expand.FULL
+) -> Optional[models.SalesReturn]:
+        stmt = (
+                select(models.SalesReturn)
+                .options(*_sales_return_options(expand, joinedload))
+                .where(models.SalesReturn.id == sales_return_id)
+        )
+        return db.scalars(stmt).first()
 
 
 def list_sales_returns(
@@ -356,22 +893,220 @@ def list_sales_returns(
         skip: int = 0,
         limit: int = 20,
         sale_id: Optional[int] = None,
-) -> Tuple[List[models.SalesReturn], int]:
+        cursor: Optional[str] = None,
+        total_mode: schemas.TotalMode = schemas.TotalMode.EXACT,
+        expand: schemas.Expand = schemas.Expand.FULL,
+        as_rows: bool = False,
+        filters: Sequence[filtering.Filter] = (),
+        sort: Optional[filtering.Sort] = None,
+) -> Page:
+        conditions = filtering.conditions(models.SalesReturn, filters)
+        if sale_id:
+                conditions.append(models.SalesReturn.sale_id == sale_id)
+        # Nested objects need the ORM; the flatter views can be read as rows
+        as_rows = as_rows and expand != schemas.Expand.FULL
+        if as_rows:
+                stmt = _sales_return_rows(expand)
+        else:
+                stmt = select(models.SalesReturn).options(*_sales_return_options(expand))
+        sort_column, descending = filtering.sort_column(models.SalesReturn, "sales_returns", sort)
+        items, next_cursor, has_more = paginate(
+                db,
+                stmt.where(*conditions),
+                sort_column,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                as_rows=as_rows,
+                descending=descending,
+        )
+        total = counting.total(db, models.SalesReturn, conditions, total_mode)
+        return Page(items, total, next_cursor, has_more)
+
+
+
+
+def _check_books(db: Session, lines) -> None:
+        book_ids = _existing_ids(db, models.Book, [line.book_id for line in lines])
+        errors = [
+                {"index": index, "detail": "Book not found"}
+                for index, line in enumerate(lines)
+                if line.book_id not in book_ids
+        ]
+        if errors:
+                raise BulkWriteError(errors)
+
+
+def _sales_order_rows():
+        order = models.SalesOrder
+        return select(
+                *order.__table__.c,
+                order.line_count.label("line_count"),
+                order.total_quantity.label("total_quantity"),
+                order.total_amount.label("total_amount"),
+                models.Customer.name.label("customer_name"),
+        ).join(models.Customer, models.Customer.id == order.customer_id)
+
+
+def create_sales_order(db: Session, *, customer: models.Customer, order_in: schemas.SalesOrderCreate) -> int:
+        """Insert a sales order and all its lines in one transaction; returns the order id.
+
+        Every line is a ``Sale`` for the order's customer and ``sold_at``,
+        inserted and stocked like ``create_sales_bulk``. Any invalid line,
+        including insufficient stock, rolls back the whole order.
+        """
+        _check_books(db, order_in.lines)
+        order = models.SalesOrder(customer_id=customer.id, notes=order_in.notes)
+        if order_in.sold_at:
+                order.sold_at = order_in.sold_at
+        db.add(order)
+        db.flush()
+        rows = [
+                _sale_row(customer.id, line.book_id, line.quantity, line.unit_price, order.sold_at, None)
+                for line in order_in.lines
+        ]
+        _insert_sales(db, rows, order_id=order.id)
+        events.record(db, "sales_orders", order.id, updated_at=order.updated_at)
+        db.commit()
+        counting.invalidate("sales_orders", "sales", "books")
+        cache.invalidate(models.Book, *{row["book_id"] for row in rows})
+        return order.id
+
+
+def get_sales_order(db: Session, order_id: int) -> Optional[models.SalesOrder]:
         stmt = (
-                select(models.SalesReturn)
+                select(models.SalesOrder)
                 .options(
-                        selectinload(models.SalesReturn.sale).selectinload(models.Sale.customer),
-                        selectinload(models.SalesReturn.sale).selectinload(models.Sale.book),
+                        joinedload(models.SalesOrder.customer).load_only(models.Customer.name, models.Customer.updated_at),
+                        selectinload(models.SalesOrder.lines)
+                        .joinedload(models.Sale.book)
+                        .load_only(models.Book.title, models.Book.updated_at),
                 )
-                .order_by(models.SalesReturn.processed_at.desc())
+                .where(models.SalesOrder.id == order_id)
+                # Totals and lines may have changed since the header was loaded
+                .execution_options(populate_existing=True)
         )
-        count_stmt = select(func.count()).select_from(models.SalesReturn)
-        if sale_id:
-                stmt = stmt.where(models.SalesReturn.sale_id == sale_id)
-                count_stmt = count_stmt.where(models.SalesReturn.sale_id == sale_id)
-        stmt = stmt.offset(skip).limit(limit)
-        items = list(db.scalars(stmt).all())
-        total = db.execute(count_stmt).scalar_one()
-        return items, int(total)
+        return db.scalars(stmt).first()
+
+
+def list_sales_orders(
+        db: Session,
+        skip: int = 0,
+        limit: int = 20,
+        customer_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        total_mode: schemas.TotalMode = schemas.TotalMode.EXACT,
+        as_rows: bool = False,
+        filters: Sequence[filtering.Filter] = (),
+        sort: Optional[filtering.Sort] = None,
+) -> Page:
+        """Order headers with their totals, summed per order by the database."""
+        conditions = filtering.conditions(models.SalesOrder, filters)
+        if customer_id:
+                conditions.append(models.SalesOrder.customer_id == customer_id)
+        if as_rows:
+                stmt = _sales_order_rows()
+        else:
+                stmt = select(models.SalesOrder).options(
+                        joinedload(models.SalesOrder.customer).load_only(models.Customer.name, models.Customer.updated_at)
+                )
+        sort_column, descending = filtering.sort_column(models.SalesOrder, "sales_orders", sort)
+        items, next_cursor, has_more = paginate(
+                db,
+                stmt.where(*conditions),
+                sort_column,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                as_rows=as_rows,
+                descending=descending,
+        )
+        total = counting.total(db, models.SalesOrder, conditions, total_mode)
+        return Page(items, total, next_cursor, has_more)
+
+
+def _purchase_order_rows():
+        order = models.PurchaseOrder
+        return select(
+                *order.__table__.c,
+                order.line_count.label("line_count"),
+                order.total_quantity.label("total_quantity"),
+                order.total_cost.label("total_cost"),
+                models.Vendor.name.label("vendor_name"),
+        ).join(models.Vendor, models.Vendor.id == order.vendor_id)
 
 
+def create_purchase_order(db: Session, *, vendor: models.Vendor, order_in: schemas.PurchaseOrderCreate) -> int:
+        """Insert a purchase order and all its lines in one transaction; returns the order id.
+
+        Every line is a ``Purchase`` from the order's vendor at its
+        ``purchased_at``, inserted and stocked like ``create_purchases_bulk``.
+        """
+        _check_books(db, order_in.lines)
+        order = models.PurchaseOrder(vendor_id=vendor.id, notes=order_in.notes)
+        if order_in.purchased_at:
+                order.purchased_at = order_in.purchased_at
+        db.add(order)
+        db.flush()
+        rows = [
+                _purchase_row(vendor.id, line.book_id, line.quantity, line.unit_cost, order.purchased_at, None)
+                for line in order_in.lines
+        ]
+        _insert_purchases(db, rows, order_id=order.id)
+        events.record(db, "purchase_orders", order.id, updated_at=order.updated_at)
+        db.commit()
+        counting.invalidate("purchase_orders", "purchases", "books")
+        cache.invalidate(models.Book, *{row["book_id"] for row in rows})
+        return order.id
+
+
+def get_purchase_order(db: Session, order_id: int) -> Optional[models.PurchaseOrder]:
+        stmt = (
+                select(models.PurchaseOrder)
+                .options(
+                        joinedload(models.PurchaseOrder.vendor).load_only(models.Vendor.name, models.Vendor.updated_at),
+                        selectinload(models.PurchaseOrder.lines)
+                        .joinedload(models.Purchase.book)
+                        .load_only(models.Book.title, models.Book.updated_at),
+                )
+                .where(models.PurchaseOrder.id == order_id)
+                # Totals and lines may have changed since the header was loaded
+                .execution_options(populate_existing=True)
+        )
+        return db.scalars(stmt).first()
+
+
+def list_purchase_orders(
+        db: Session,
+        skip: int = 0,
+        limit: int = 20,
+        vendor_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        total_mode: schemas.TotalMode = schemas.TotalMode.EXACT,
+        as_rows: bool = False,
+        filters: Sequence[filtering.Filter] = (),
+        sort: Optional[filtering.Sort] = None,
+) -> Page:
+        """Order headers with their totals, summed per order by the database."""
+        conditions = filtering.conditions(models.PurchaseOrder, filters)
+        if vendor_id:
+                conditions.append(models.PurchaseOrder.vendor_id == vendor_id)
+        if as_rows:
+                stmt = _purchase_order_rows()
+        else:
+                stmt = select(models.PurchaseOrder).options(
+                        joinedload(models.PurchaseOrder.vendor).load_only(models.Vendor.name, models.Vendor.updated_at)
+                )
+        sort_column, descending = filtering.sort_column(models.PurchaseOrder, "purchase_orders", sort)
+        items, next_cursor, has_more = paginate(
+                db,
+                stmt.where(*conditions),
+                sort_column,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+                as_rows=as_rows,
+                descending=descending,
+        )
+        total = counting.total(db, models.PurchaseOrder, conditions, total_mode)
+        return Page(items, total, next_cursor, has_more)
@@ -1,8 +1,13 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool
+from typing import Union
 import os
 
+from . import instrumentation, pooling
+
 
 def _normalize_database_url(url: str) -> str:
 	# Heroku/Supabase sometimes provide postgres://; SQLAlchemy requires postgresql://
@@ -11,32 +16,94 @@ def _normalize_database_url(url: str) -> str:
 	return url
 
 
+def _async_database_url(url: str) -> str:
+	# Same database, async driver: aiosqlite for dev, asyncpg for PostgreSQL
+	scheme, rest = url.split("://", 1)
+	dialect = scheme.split("+", 1)[0]
+	driver = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}[dialect]
+	return f"{dialect}+{driver}://{rest}"
+
+
 DATABASE_URL = _normalize_database_url(
 	os.getenv("DATABASE_URL", "sqlite:///./inventory.db")
 )
 
-_engine_kwargs: dict = {}
+# DB_ASYNC=1 serves requests through an AsyncSession on an async driver;
+# otherwise each request's queries run on the threadpool with a sync Session.
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in {"1", "true", "yes"}
+
+_is_supabase_pooler = ":6543" in DATABASE_URL or "pooler.supabase.com" in DATABASE_URL
+
+# Pool class, sizing, recycle and pre-ping come from DB_POOL_* (see pooling.py)
+_engine_kwargs: dict = pooling.engine_kwargs(DATABASE_URL, behind_pgbouncer=_is_supabase_pooler)
 
 if DATABASE_URL.startswith("sqlite"):
 	_engine_kwargs["connect_args"] = {"check_same_thread": False}
 elif DATABASE_URL.startswith("postgresql"):
-	# Supabase requires SSL; pool_pre_ping keeps connections healthy across deploys
+	# Supabase requires SSL
 	_engine_kwargs["connect_args"] = {"sslmode": "require"}
-	_engine_kwargs["pool_pre_ping"] = True
-	# Supabase pooler (port 6543) works best with NullPool for serverless-style hosts
-	if ":6543" in DATABASE_URL or "pooler.supabase.com" in DATABASE_URL:
-		_engine_kwargs["poolclass"] = NullPool
 
+# The sync engine is always created: schema bootstrap and scripts use it.
 engine = create_engine(DATABASE_URL, **_engine_kwargs)
+pooling.instrument(engine, "sync")
+instrumentation.instrument(engine)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Write paths fetch server-generated columns with RETURNING (see the models'
+# eager_defaults), so objects stay valid after commit without a refresh.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+	from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+	_async_engine_kwargs: dict = pooling.engine_kwargs(
+		DATABASE_URL, is_async=True, behind_pgbouncer=_is_supabase_pooler
+	)
+	if DATABASE_URL.startswith("postgresql"):
+		_async_engine_kwargs.setdefault("connect_args", {})["ssl"] = "require"
+	async_engine = create_async_engine(_async_database_url(DATABASE_URL), **_async_engine_kwargs)
+	pooling.instrument(async_engine.sync_engine, "async")
+	instrumentation.instrument(async_engine.sync_engine)
+	AsyncSessionLocal = async_sessionmaker(
+		async_engine, autocommit=False, autoflush=False, expire_on_commit=False
+	)
 
 Base = declarative_base()
 
 
-def get_db():
+def get_sync_db():
 	db = SessionLocal()
 	try:
 		yield db
 	finally:
 		db.close()
+
+
+async def get_async_db():
+	async with AsyncSessionLocal() as db:
+		yield db
+
+
+# Routers depend on get_db; which session it yields follows DB_ASYNC.
+get_db = get_async_db if DB_ASYNC else get_sync_db
+DbSession = Union[Session, AsyncSession]
+
+
+async def run_db(db, fn, *args, **kwargs):
+	"""Await the sync ``crud`` function ``fn(session, *args, **kwargs)``.
+
+	With an AsyncSession it runs via ``run_sync`` on the async driver; with a
+	sync Session it runs on the threadpool so the event loop is never blocked.
+	"""
+	if isinstance(db, Session):
+		return await run_in_threadpool(fn, db, *args, **kwargs)
+	return await db.run_sync(fn, *args, **kwargs)
+
+
+def upsert_insert(db: Session, table):
+	"""``INSERT`` for the session's backend that supports ``on_conflict_do_update``."""
+	if db.get_bind().dialect.name == "postgresql":
+		return postgresql.insert(table)
+	return sqlite.insert(table)
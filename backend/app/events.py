@@ -0,0 +1,199 @@
+"""Change feed: compact records of every committed write, pushed to clients.
+
+``crud`` (and :mod:`app.stock`, for every stock change) calls :func:`record`
+with the entity, id and, for books, the new quantity and ``updated_at``.
+Records are queued on the session (``Session.info``) and only published once
+the transaction commits. A rollback drops them. Subscribers (``GET /events``
+as Server-Sent Events, or the ``/events/ws`` WebSocket) each get a bounded
+queue on the in-process :class:`Broadcaster`. A client that falls
+``EVENTS_QUEUE_SIZE`` records behind gets a ``reset`` and is disconnected, so
+it re-fetches instead of silently missing changes.
+
+On PostgreSQL the records go out with ``pg_notify`` inside the committing
+transaction, which the server delivers only on commit, to every worker. Each
+worker with subscribers holds one ``LISTEN`` connection that feeds its
+broadcaster. ``LISTEN`` needs a session, which a transaction-mode PgBouncer
+(the Supabase pooler on 6543) cannot provide. Set ``EVENTS_LISTEN_URL`` to a
+direct or session-mode URL in that case. Elsewhere (SQLite) records are
+published in-process after commit.
+
+``EVENTS=0`` stops recording and publishing.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+EVENTS = os.getenv("EVENTS", "1").lower() in {"1", "true", "yes"}
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+CHANNEL = "inventory_events"
+# NOTIFY payloads are capped at 8000 bytes
+_MAX_PAYLOAD = 7000
+
+logger = logging.getLogger(__name__)
+
+
+def record(db: Session, entity: str, entity_id: int, op: str = "upsert", **fields) -> None:
+        """Queue a change record on ``db``; it is published when ``db`` commits.
+
+        Records for the same row within one transaction merge into one, in the
+        position of the latest.
+        """
+        if not EVENTS:
+                return
+        pending: Dict[Tuple[str, int], dict] = db.info.setdefault("events", {})
+        change = pending.pop((entity, entity_id), {"entity": entity, "id": entity_id})
+        change["op"] = op
+        for name, value in fields.items():
+                change[name] = value.isoformat() if isinstance(value, datetime) else value
+        pending[(entity, entity_id)] = change
+
+
+class Subscription:
+        def __init__(self, entities: Optional[Set[str]]):
+                self.entities = entities
+                self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+        def offer(self, changes: List[dict]) -> bool:
+                """Queue ``changes``; False (with a ``None`` reset marker queued) on overflow."""
+                for change in changes:
+                        if self.entities is not None and change["entity"] not in self.entities:
+                                continue
+                        try:
+                                self.queue.put_nowait(change)
+                        except asyncio.QueueFull:
+                                while not self.queue.empty():
+                                        self.queue.get_nowait()
+                                self.queue.put_nowait(None)
+                                return False
+                return True
+
+        async def get(self, timeout: float) -> Optional[dict]:
+                """Next change; ``None`` means the client fell behind. Raises ``TimeoutError``."""
+                return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broadcaster:
+        """Fans published changes out to this process's subscribers."""
+
+        def __init__(self) -> None:
+                self._subscribers: Set[Subscription] = set()
+                self._loop: Optional[asyncio.AbstractEventLoop] = None
+                self._listener: Optional[threading.Thread] = None
+                self._lock = threading.Lock()
+
+        def subscribe(self, entities: Optional[Set[str]] = None) -> Subscription:
+                self._loop = asyncio.get_running_loop()
+                subscription = Subscription(entities)
+                self._subscribers.add(subscription)
+                self._ensure_listener()
+                return subscription
+
+        def unsubscribe(self, subscription: Subscription) -> None:
+                self._subscribers.discard(subscription)
+
+        def publish(self, changes: List[dict]) -> None:
+                """Deliver ``changes`` to every subscriber; safe to call from any thread."""
+                loop = self._loop
+                if not changes or loop is None or not self._subscribers:
+                        return
+                try:
+                        loop.call_soon_threadsafe(self._deliver, changes)
+                except RuntimeError:
+                        # Event loop already closed (shutdown)
+                        pass
+
+        def _deliver(self, changes: List[dict]) -> None:
+                for subscription in list(self._subscribers):
+                        if not subscription.offer(changes):
+                                self._subscribers.discard(subscription)
+
+        def _ensure_listener(self) -> None:
+                from .database import DATABASE_URL
+
+                if not DATABASE_URL.startswith("postgresql"):
+                        return
+                with self._lock:
+                        if self._listener is None or not self._listener.is_alive():
+                                url = os.getenv("EVENTS_LISTEN_URL") or DATABASE_URL
+                                self._listener = threading.Thread(
+                                        target=self._listen, args=(url,), name="events-listener", daemon=True
+                                )
+                                self._listener.start()
+
+        def _listen(self, url: str) -> None:
+                # Runs for the life of the process once anyone has subscribed
+                engine = create_engine(url, poolclass=NullPool)
+                backoff = 1.0
+                while True:
+                        try:
+                                connection = engine.raw_connection()
+                                try:
+                                        dbapi = connection.driver_connection
+                                        dbapi.autocommit = True
+                                        dbapi.cursor().execute(f"LISTEN {CHANNEL}")
+                                        backoff = 1.0
+                                        while True:
+                                                if select.select([dbapi], [], [], 5.0) == ([], [], []):
+                                                        continue
+                                                dbapi.poll()
+                                                while dbapi.notifies:
+                                                        self.publish(json.loads(dbapi.notifies.pop(0).payload))
+                                finally:
+                                        connection.close()
+                        except Exception:
+                                logger.exception("Change feed listener lost its connection; retrying in %.0fs", backoff)
+                                time.sleep(backoff)
+                                backoff = min(backoff * 2, 60.0)
+
+
+broadcaster = Broadcaster()
+
+
+def _payloads(changes: List[dict]) -> List[str]:
+        """JSON arrays of ``changes``, split to fit in NOTIFY payloads."""
+        payloads, batch, size = [], [], 2
+        for change in changes:
+                encoded = json.dumps(change, separators=(",", ":"))
+                if batch and size + len(encoded) + 1 > _MAX_PAYLOAD:
+                        payloads.append(f"[{','.join(batch)}]")
+                        batch, size = [], 2
+                batch.append(encoded)
+                size += len(encoded) + 1
+        if batch:
+                payloads.append(f"[{','.join(batch)}]")
+        return payloads
+
+
+@event.listens_for(Session, "before_commit")
+def _notify(session: Session) -> None:
+        pending = session.info.get("events")
+        if not pending or session.get_bind().dialect.name != "postgresql":
+                return
+        connection = session.connection()
+        for payload in _payloads(list(pending.values())):
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+        # Delivered by NOTIFY, to this worker's listener as well
+        session.info.pop("events")
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session: Session) -> None:
+        pending = session.info.pop("events", None)
+        if pending:
+                broadcaster.publish(list(pending.values()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+        session.info.pop("events", None)
@@ -0,0 +1,121 @@
+"""Streaming CSV / NDJSON exports.
+
+Rows are read with a server-side cursor (``yield_per``) as plain column
+tuples and written out in chunks, so an export of any size runs in constant
+memory without building ORM objects or Pydantic models. Each export opens its
+own session because the response body is produced after the request's
+dependency-managed session has been closed.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import AsyncIterator, Dict, Iterable, Iterator, Optional, Sequence
+
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session
+
+from . import database, filtering, models, search
+
+
+CHUNK_ROWS = 1000
+
+COLUMNS: Dict[str, Sequence[str]] = {
+        "books": ("id", "title", "author", "isbn", "quantity", "price", "created_at", "updated_at"),
+        "sales": (
+                "id",
+                "customer_id",
+                "book_id",
+                "quantity",
+                "returned_quantity",
+                "unit_price",
+                "total_amount",
+                "sold_at",
+                "notes",
+        ),
+        "purchases": ("id", "vendor_id", "book_id", "quantity", "unit_cost", "total_cost", "purchased_at", "notes"),
+}
+
+_MODELS = {"books": models.Book, "sales": models.Sale, "purchases": models.Purchase}
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def statement(db: Session, entity: str, where: Sequence[filtering.Filter] = (), **filters) -> Select:
+        """Column-tuple ``SELECT`` for ``entity`` with the list endpoint's filters, in id order.
+
+        ``where`` holds the parsed ``field[op]`` filters (see :mod:`app.filtering`).
+        """
+        model = _MODELS[entity]
+        stmt = select(*(getattr(model, name) for name in COLUMNS[entity])).where(*filtering.conditions(model, where))
+        q: Optional[str] = filters.pop("q", None)
+        if q:
+                stmt = stmt.where(search.plan(db, model, q).condition)
+        for name, value in filters.items():
+                if value:
+                        stmt = stmt.where(getattr(model, name) == value)
+        return stmt.order_by(model.id).execution_options(yield_per=CHUNK_ROWS)
+
+
+def _plain(value):
+        if isinstance(value, Decimal):
+                return float(value)
+        if isinstance(value, (datetime, date)):
+                return value.isoformat()
+        if isinstance(value, Enum):
+                return value.value
+        return value
+
+
+class _Encoder:
+        """Turns batches of row tuples into CSV or NDJSON text."""
+
+        def __init__(self, fmt: str, columns: Sequence[str]):
+                self.fmt = fmt
+                self.columns = columns
+
+        def header(self) -> str:
+                return self._csv([self.columns]) if self.fmt == "csv" else ""
+
+        def rows(self, rows: Iterable[Sequence]) -> str:
+                if self.fmt == "csv":
+                        return self._csv([[_plain(v) for v in row] for row in rows])
+                return "".join(
+                        json.dumps(dict(zip(self.columns, map(_plain, row))), separators=(",", ":")) + "\n"
+                        for row in rows
+                )
+
+        @staticmethod
+        def _csv(rows) -> str:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                return buffer.getvalue()
+
+
+def stream_sync(entity: str, fmt: str, **filters) -> Iterator[str]:
+        encoder = _Encoder(fmt, COLUMNS[entity])
+        with database.SessionLocal() as db:
+                result = db.execute(statement(db, entity, **filters))
+                yield encoder.header()
+                for rows in result.partitions():
+                        yield encoder.rows(rows)
+
+
+async def stream_async(entity: str, fmt: str, **filters) -> AsyncIterator[str]:
+        encoder = _Encoder(fmt, COLUMNS[entity])
+        async with database.AsyncSessionLocal() as db:
+                stmt = await db.run_sync(statement, entity, **filters)
+                result = await db.stream(stmt)
+                yield encoder.header()
+                async for rows in result.partitions():
+                        yield encoder.rows(rows)
+
+
+def stream(entity: str, fmt: str, **filters):
+        """Chunks of ``fmt`` text for ``entity``; async iterator when ``DB_ASYNC`` is set."""
+        if database.DB_ASYNC:
+                return stream_async(entity, fmt, **filters)
+        return stream_sync(entity, fmt, **filters)
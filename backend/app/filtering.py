@@ -0,0 +1,231 @@
+"""Filter and sort query parameters shared by the list endpoints.
+
+Filters are ``field[op]=value`` query parameters, combined with AND::
+
+    GET /sales/?sold_at[gte]=2026-01-01&sold_at[lt]=2026-02-01&total_amount[gte]=50
+    GET /sales/?customer_id[in]=3,7,12&sort=-total_amount
+    GET /books/?quantity[lte]=5&sort=quantity
+
+``op`` is ``eq``, ``in`` (comma-separated, at most ``MAX_IN`` values) or a
+range bound: ``gt``, ``gte``, ``lt``, ``lte``. Dates are ISO 8601; a bare date
+is midnight UTC and an offset-less time is UTC. ``sort`` names one column of
+the entity's whitelist, ascending, or descending with a leading ``-``. The
+default is newest first. Unknown fields, operators or sort columns are
+rejected with 400.
+
+Only fields and sorts that an index can serve are listed in ``FIELDS`` and
+``SORTS``. Each sort column has a ``(column, id)`` index for keyset
+pagination, and each filter column leads an index. ``benchmarks/explain.py``
+checks every combination against the database's query plans. Add the index
+(in a migration and in ``models``) before listing a new field here.
+"""
+
+import re
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from . import models
+
+MAX_IN = 100
+
+EQ = "eq"
+IN = "in"
+RANGE_OPS = ("gt", "gte", "lt", "lte")
+
+_IDS = frozenset({EQ, IN})
+_RANGE = frozenset({EQ, *RANGE_OPS})
+_PARAM = re.compile(r"^([a-z_]+)\[([a-z]+)\]$")
+
+
+def _integer(value: str) -> int:
+        number = int(value)
+        # Databases store 64-bit integers; a wider value would fail in the driver
+        if not -(2**63) <= number < 2**63:
+                raise ValueError(value)
+        return number
+
+
+def _datetime(value: str) -> datetime:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+                return moment.replace(tzinfo=timezone.utc)
+        return moment.astimezone(timezone.utc)
+
+
+def _decimal(value: str) -> Decimal:
+        try:
+                number = Decimal(value)
+        except InvalidOperation as exc:
+                raise ValueError(value) from exc
+        if not number.is_finite():
+                raise ValueError(value)
+        return number
+
+
+def _category(value: str) -> models.CustomerCategory:
+        return models.CustomerCategory(value)
+
+
+class Field(NamedTuple):
+        parse: Callable[[str], Any]
+        ops: FrozenSet[str]
+
+
+FIELDS: Dict[str, Dict[str, Field]] = {
+        "books": {
+                "id": Field(_integer, _IDS),
+                "quantity": Field(_integer, _RANGE),
+                "price": Field(_decimal, _RANGE),
+                "created_at": Field(_datetime, _RANGE),
+        },
+        "vendors": {
+                "id": Field(_integer, _IDS),
+                "created_at": Field(_datetime, _RANGE),
+        },
+        "customers": {
+                "id": Field(_integer, _IDS),
+                "category": Field(_category, _IDS),
+                "created_at": Field(_datetime, _RANGE),
+        },
+        "purchases": {
+                "id": Field(_integer, _IDS),
+                "vendor_id": Field(_integer, _IDS),
+                "book_id": Field(_integer, _IDS),
+                "purchased_at": Field(_datetime, _RANGE),
+                "total_cost": Field(_decimal, _RANGE),
+        },
+        "sales": {
+                "id": Field(_integer, _IDS),
+                "customer_id": Field(_integer, _IDS),
+                "book_id": Field(_integer, _IDS),
+                "sold_at": Field(_datetime, _RANGE),
+                "total_amount": Field(_decimal, _RANGE),
+        },
+        "sales_returns": {
+                "id": Field(_integer, _IDS),
+                "sale_id": Field(_integer, _IDS),
+                "processed_at": Field(_datetime, _RANGE),
+        },
+        "sales_orders": {
+                "id": Field(_integer, _IDS),
+                "customer_id": Field(_integer, _IDS),
+                "sold_at": Field(_datetime, _RANGE),
+        },
+        "purchase_orders": {
+                "id": Field(_integer, _IDS),
+                "vendor_id": Field(_integer, _IDS),
+                "purchased_at": Field(_datetime, _RANGE),
+        },
+}
+
+# The first column is the default sort (descending)
+SORTS: Dict[str, Tuple[str, ...]] = {
+        "books": ("created_at", "title", "price", "quantity"),
+        "vendors": ("created_at", "name"),
+        "customers": ("created_at", "name"),
+        "purchases": ("purchased_at", "total_cost"),
+        "sales": ("sold_at", "total_amount"),
+        "sales_returns": ("processed_at",),
+        "sales_orders": ("sold_at",),
+        "purchase_orders": ("purchased_at",),
+}
+
+
+class Filter(NamedTuple):
+        field: str
+        op: str
+        value: Any
+
+
+class Sort(NamedTuple):
+        field: str
+        descending: bool = True
+
+
+class ListQuery(NamedTuple):
+        filters: Tuple[Filter, ...] = ()
+        sort: Optional[Sort] = None
+
+
+def _sort(entity: str, value: str) -> Sort:
+        descending = value.startswith("-")
+        name = value.lstrip("-+")
+        if name not in SORTS[entity]:
+                raise ValueError(f"Cannot sort by '{name}'; use one of: {', '.join(SORTS[entity])}")
+        return Sort(name, descending)
+
+
+def _filter(entity: str, name: str, op: str, raw: str) -> Filter:
+        field = FIELDS[entity].get(name)
+        if field is None:
+                raise ValueError(f"Cannot filter by '{name}'; use one of: {', '.join(FIELDS[entity])}")
+        if op not in field.ops:
+                raise ValueError(f"'{name}' does not support '{op}'; use one of: {', '.join(sorted(field.ops))}")
+        parts = [part.strip() for part in raw.split(",") if part.strip()] if op == IN else [raw]
+        if len(parts) > MAX_IN:
+                raise ValueError(f"{name}[in] takes at most {MAX_IN} values")
+        try:
+                values = tuple(dict.fromkeys(field.parse(part) for part in parts))
+        except ValueError as exc:
+                raise ValueError(f"Invalid value for {name}[{op}]: '{raw}'") from exc
+        if not values:
+                raise ValueError(f"{name}[{op}] needs a value")
+        return Filter(name, op, values if op == IN else values[0])
+
+
+def parse(entity: str, params: Mapping[str, str], sort: Optional[str] = None) -> ListQuery:
+        """Read the ``field[op]`` filters out of ``params`` (a request's query
+        parameters) and validate ``sort``. Raises ``ValueError``.
+        """
+        filters = []
+        items = params.multi_items() if hasattr(params, "multi_items") else params.items()
+        for key, raw in items:
+                match = _PARAM.match(key)
+                if match:
+                        filters.append(_filter(entity, match.group(1), match.group(2), raw))
+        return ListQuery(tuple(filters), _sort(entity, sort) if sort else None)
+
+
+def conditions(model, filters: Sequence[Filter]) -> List:
+        """SQL conditions for ``filters`` on ``model``."""
+        clauses = []
+        for name, op, value in filters:
+                column = getattr(model, name)
+                if op == IN:
+                        clauses.append(column.in_(value))
+                elif op == EQ:
+                        clauses.append(column == value)
+                elif op == "gt":
+                        clauses.append(column > value)
+                elif op == "gte":
+                        clauses.append(column >= value)
+                elif op == "lt":
+                        clauses.append(column < value)
+                else:
+                        clauses.append(column <= value)
+        return clauses
+
+
+def sort_column(model, entity: str, sort: Optional[Sort]):
+        """``(column, descending)`` to paginate ``model`` by; newest first by default."""
+        if sort is None:
+                return getattr(model, SORTS[entity][0]), True
+        return getattr(model, sort.field), sort.descending
+
+
+def filter_help(entity: str) -> str:
+        """Description of the ``field[op]`` filters for the OpenAPI docs."""
+        return (
+                f"Filter with field[op]=value on {', '.join(FIELDS[entity])}; "
+                "op is eq, in (comma-separated), gt, gte, lt or lte"
+        )
+
+
+def sort_help(entity: str) -> str:
+        """``sort`` parameter description for the OpenAPI docs."""
+        columns = SORTS[entity]
+        return (
+                f"Sort by {' or '.join(columns)}, '-' first for descending (default -{columns[0]}). "
+                + filter_help(entity)
+        )
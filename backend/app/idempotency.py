@@ -0,0 +1,248 @@
+"""``Idempotency-Key`` support for the create endpoints.
+
+A ``POST`` carrying an ``Idempotency-Key`` header runs at most once per key.
+:class:`Middleware` first reserves the key in ``idempotency_keys`` (one
+``INSERT ... ON CONFLICT DO NOTHING``), runs the endpoint, then stores its
+status and body. A retry with the same key and the same request gets the
+stored response back, marked ``Idempotent-Replayed: true``, without touching
+stock or any other table. The same key with a different method, path or body
+is rejected with 422. While the first request is still running, a retry
+gets 409 with ``Retry-After``.
+
+Only complete successful (2xx) responses are kept, including one whose
+sending failed after the body was produced. On an error, an exception or no
+response at all the write was rolled back, so the reservation is released
+and a retry runs the request again; so is a 2xx that breaks off mid-body,
+which only a streaming response can do (no create endpoint streams). If the
+process dies mid-request, the key stays reserved (409) until it expires.
+That is deliberate: the write may already have committed.
+
+The body is hashed as it is read and, past ``BODY_SPOOL_SIZE`` (1 MiB),
+spooled to a temporary file before it is handed on, so a keyed
+``/books/import`` upload is not held in memory.
+
+Keys expire after ``IDEMPOTENCY_TTL_HOURS`` (default 24). Expired rows are
+purged at most once a minute by whichever request reserves a key. Requests
+without the header are passed straight through.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+from . import models
+from .database import SessionLocal, upsert_insert
+
+IDEMPOTENCY_TTL = timedelta(hours=float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+MAX_KEY_LENGTH = 255
+PURGE_INTERVAL = 60.0
+# Request bodies past this size (e.g. a /books/import upload) are spooled to disk
+BODY_SPOOL_SIZE = 1024 * 1024
+BODY_CHUNK_SIZE = 64 * 1024
+
+_last_purge = 0.0
+
+
+class Stored(NamedTuple):
+        fingerprint: str
+        status_code: Optional[int]
+        content_type: Optional[str]
+        body: Optional[bytes]
+
+
+def fingerprint(method: str, path: str, query: bytes, body_digest: str) -> str:
+        """Hash of the request; ``body_digest`` is the hex SHA-256 of the body (see :func:`_read_body`)."""
+        digest = hashlib.sha256()
+        for part in (method.encode(), path.encode(), query, body_digest.encode()):
+                digest.update(len(part).to_bytes(8, "big"))
+                digest.update(part)
+        return digest.hexdigest()
+
+
+def reserve(key: str, request_fingerprint: str) -> Optional[Stored]:
+        """Claim ``key`` for a new request; returns None if claimed, else the existing entry."""
+        global _last_purge
+        now = datetime.now(timezone.utc)
+        table = models.IdempotencyKey.__table__
+        with SessionLocal() as db, db.begin():
+                if time.monotonic() - _last_purge >= PURGE_INTERVAL:
+                        _last_purge = time.monotonic()
+                        db.execute(delete(table).where(table.c.expires_at < now))
+                else:
+                        db.execute(delete(table).where(table.c.key == key, table.c.expires_at < now))
+                stmt = (
+                        upsert_insert(db, table)
+                        .values(key=key, fingerprint=request_fingerprint, expires_at=now + IDEMPOTENCY_TTL)
+                        .on_conflict_do_nothing(index_elements=[table.c.key])
+                        .returning(table.c.key)
+                )
+                if db.execute(stmt).first() is not None:
+                        return None
+                row = db.execute(
+                        select(table.c.fingerprint, table.c.status_code, table.c.content_type, table.c.body).where(
+                                table.c.key == key
+                        )
+                ).first()
+        # Purged between the two statements; treat as still in progress
+        return Stored(*row) if row else Stored(request_fingerprint, None, None, None)
+
+
+def complete(key: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+        table = models.IdempotencyKey.__table__
+        with SessionLocal() as db, db.begin():
+                db.execute(
+                        update(table)
+                        .where(table.c.key == key)
+                        .values(status_code=status_code, content_type=content_type, body=body)
+                )
+
+
+def release(key: str) -> None:
+        table = models.IdempotencyKey.__table__
+        with SessionLocal() as db, db.begin():
+                db.execute(delete(table).where(table.c.key == key, table.c.status_code.is_(None)))
+
+
+class Middleware:
+        """ASGI middleware that makes ``POST`` requests with an ``Idempotency-Key`` retry-safe."""
+
+        def __init__(self, app):
+                self.app = app
+
+        async def __call__(self, scope, receive, send):
+                if scope["type"] != "http" or scope["method"] != "POST":
+                        await self.app(scope, receive, send)
+                        return
+                key = dict(scope["headers"]).get(b"idempotency-key")
+                if key is None:
+                        await self.app(scope, receive, send)
+                        return
+                key = key.decode("latin-1").strip()
+                if not key or len(key) > MAX_KEY_LENGTH:
+                        response = JSONResponse(
+                                {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400
+                        )
+                        await response(scope, receive, send)
+                        return
+
+                body, body_digest = await _read_body(receive)
+                try:
+                        await self._handle(key, body, body_digest, scope, receive, send)
+                finally:
+                        body.close()
+
+        async def _handle(self, key: str, body: "_SpooledBody", body_digest: str, scope, receive, send):
+                request_fingerprint = fingerprint(scope["method"], scope["path"], scope["query_string"], body_digest)
+                stored = await run_in_threadpool(reserve, key, request_fingerprint)
+                if stored is not None:
+                        await _existing(stored, request_fingerprint)(scope, receive, send)
+                        return
+
+                replayed = False
+
+                async def receive_body():
+                        nonlocal replayed
+                        if not replayed:
+                                chunk = await body.read(BODY_CHUNK_SIZE)
+                                replayed = body.exhausted
+                                return {"type": "http.request", "body": chunk, "more_body": not replayed}
+                        return await receive()
+
+                status = None
+                content_type = None
+                chunks = []
+                finished = False
+
+                async def send_and_capture(message):
+                        nonlocal status, content_type, finished
+                        if message["type"] == "http.response.start":
+                                status = message["status"]
+                                content_type = dict(message.get("headers", [])).get(b"content-type")
+                        elif message["type"] == "http.response.body":
+                                chunks.append(message.get("body", b""))
+                                finished = not message.get("more_body", False)
+                        await send(message)
+
+                try:
+                        await self.app(scope, receive_body, send_and_capture)
+                finally:
+                        # A failure while sending (e.g. the client went away) still keeps a
+                        # complete 2xx: the write committed before the response started
+                        if status is not None and 200 <= status < 300 and finished:
+                                await run_in_threadpool(
+                                        complete,
+                                        key,
+                                        status,
+                                        content_type.decode("latin-1") if content_type else None,
+                                        b"".join(chunks),
+                                )
+                        else:
+                                await run_in_threadpool(release, key)
+
+
+class _SpooledBody:
+        """A request body kept in memory up to ``BODY_SPOOL_SIZE``, then in a temporary file."""
+
+        def __init__(self) -> None:
+                self.file = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_SIZE)
+                self.size = 0
+
+        async def _run(self, fn, *args):
+                # File I/O off the event loop once the body has spilled to disk
+                if self.file._rolled:
+                        return await run_in_threadpool(fn, *args)
+                return fn(*args)
+
+        async def write(self, chunk: bytes) -> None:
+                self.size += len(chunk)
+                await self._run(self.file.write, chunk)
+
+        async def read(self, size: int) -> bytes:
+                return await self._run(self.file.read, size)
+
+        @property
+        def exhausted(self) -> bool:
+                return self.file.tell() >= self.size
+
+        def close(self) -> None:
+                self.file.close()
+
+
+async def _read_body(receive) -> Tuple[_SpooledBody, str]:
+        """Read the whole body, hashing it on the way, so uploads are never held in memory whole."""
+        body = _SpooledBody()
+        digest = hashlib.sha256()
+        while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                        break
+                chunk = message.get("body", b"")
+                digest.update(chunk)
+                await body.write(chunk)
+                if not message.get("more_body"):
+                        break
+        body.file.seek(0)
+        return body, digest.hexdigest()
+
+
+def _existing(stored: Stored, request_fingerprint: str) -> Response:
+        if stored.fingerprint != request_fingerprint:
+                return JSONResponse(
+                        {"detail": "Idempotency-Key was already used for a different request"}, status_code=422
+                )
+        if stored.status_code is None:
+                return JSONResponse(
+                        {"detail": "A request with this Idempotency-Key is still in progress"},
+                        status_code=409,
+                        headers={"Retry-After": "1"},
+                )
+        response = Response(stored.body, status_code=stored.status_code, media_type=stored.content_type)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
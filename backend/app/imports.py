@@ -0,0 +1,71 @@
+"""Incremental parsing of uploaded CSV / NDJSON files.
+
+Uploads are read line by line from the (spooled) upload file, so a large
+catalog is never held in memory as a whole; validation and writes happen in
+chunks downstream (see :func:`app.crud.import_books`).
+"""
+
+import csv
+import json
+from typing import BinaryIO, Iterator, List, Optional
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+        """Guess ``csv`` or ``ndjson`` from the upload's name or media type."""
+        name = (filename or "").lower()
+        if name.endswith((".ndjson", ".jsonl", ".json")) or "json" in (content_type or ""):
+                return "ndjson"
+        return "csv"
+
+
+def _lines(file: BinaryIO, undecodable: List[int]) -> Iterator[str]:
+        """Decode ``file`` line by line as UTF-8 (a leading BOM is dropped).
+
+        A line that is not valid UTF-8 is counted in ``undecodable[0]`` and
+        replaced by an empty line, so the rest of the file still parses.
+        """
+        for number, raw in enumerate(file):
+                try:
+                        yield raw.decode("utf-8-sig" if number == 0 else "utf-8")
+                except UnicodeDecodeError:
+                        undecodable[0] += 1
+                        yield "\n"
+
+
+def rows(file: BinaryIO, fmt: str) -> Iterator[Optional[dict]]:
+        """Yield one dict per record; a record that cannot be read or parsed yields ``None``."""
+        undecodable = [0]
+        lines = _lines(file, undecodable)
+        if fmt == "csv":
+                reader = csv.DictReader(lines)
+                while True:
+                        try:
+                                record = next(reader)
+                        except StopIteration:
+                                break
+                        except csv.Error:
+                                record = None
+                        # Lines skipped while reading this record come first
+                        for _ in range(undecodable[0]):
+                                yield None
+                        undecodable[0] = 0
+                        if record is not None:
+                                # Empty cells mean "not given" so schema defaults apply
+                                record = {key: value for key, value in record.items() if key and value not in ("", None)}
+                        yield record
+                for _ in range(undecodable[0]):
+                        yield None
+                return
+        for line in lines:
+                if undecodable[0]:
+                        undecodable[0] = 0
+                        yield None
+                        continue
+                if not line.strip():
+                        continue
+                try:
+                        record = json.loads(line)
+                except ValueError:
+                        yield None
+                        continue
+                yield record if isinstance(record, dict) else None
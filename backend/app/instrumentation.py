@@ -0,0 +1,277 @@
+"""Per-request timing, SQL instrumentation and Prometheus metrics.
+
+:class:`Middleware` measures each request's wall time and, through
+``before_cursor_execute`` / ``after_cursor_execute`` listeners on the engines
+(:func:`instrument`), its database time and statement count. Serialization
+time covers encoding response bodies (``serialization.respond`` and the JSON
+response classes). Results go to:
+
+* a ``Server-Timing`` header (``db``, ``ser``, ``total``) on every response;
+* ``GET /metrics`` in Prometheus text format, labelled by route template;
+* the ``app.instrumentation`` logger: statements slower than
+  ``SLOW_QUERY_MS`` (default 200), requests slower than ``SLOW_REQUEST_MS``
+  (default 1000), and requests that run the same ``SELECT`` shape at least
+  ``N_PLUS_ONE_THRESHOLD`` times (default 5), the usual sign of an N+1 loop.
+
+``INSTRUMENTATION=0`` leaves the middleware and ``/metrics`` out of the app.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import pooling
+
+
+INSTRUMENTATION = os.getenv("INSTRUMENTATION", "1").lower() in {"1", "true", "yes"}
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+# psycopg2 / asyncpg / sqlite placeholders, and expanded IN lists of them
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+class RequestStats:
+        __slots__ = ("db_seconds", "statements", "serialization_seconds", "selects")
+
+        def __init__(self) -> None:
+                self.db_seconds = 0.0
+                self.statements = 0
+                self.serialization_seconds = 0.0
+                self.selects: Counter = Counter()
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _fingerprint(statement: str) -> str:
+        return _PLACEHOLDER_LIST.sub("?", _PLACEHOLDER.sub("?", statement))
+
+
+def instrument(engine: Engine) -> None:
+        """Time every statement on ``engine`` (pass ``.sync_engine`` for async)."""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+                # Per execution, so a statement that raises leaves nothing behind
+                context._query_started = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+                _record(statement, context)
+
+        @event.listens_for(engine, "handle_error")
+        def _error(exception_context):
+                # Failed statements (constraint violations, lost connections) still took the time
+                if exception_context.execution_context is not None and exception_context.statement is not None:
+                        _record(exception_context.statement, exception_context.execution_context)
+
+
+def _record(statement: str, context) -> None:
+        started = getattr(context, "_query_started", None)
+        if started is None:
+                return
+        context._query_started = None
+        elapsed = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+                stats.db_seconds += elapsed
+                stats.statements += 1
+                if statement.lstrip()[:6].upper() == "SELECT":
+                        stats.selects[_fingerprint(statement)] += 1
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+                _metrics.count("slow_queries")
+                logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement[:1000])
+
+
+@contextmanager
+def serializing():
+        """Count the enclosed block as serialization time of the current request."""
+        started = time.perf_counter()
+        try:
+                yield
+        finally:
+                stats = _current.get()
+                if stats is not None:
+                        stats.serialization_seconds += time.perf_counter() - started
+
+
+class _RouteMetrics:
+        __slots__ = ("count", "seconds", "db_seconds", "serialization_seconds", "statements", "buckets")
+
+        def __init__(self) -> None:
+                self.count = 0
+                self.seconds = 0.0
+                self.db_seconds = 0.0
+                self.serialization_seconds = 0.0
+                self.statements = 0
+                self.buckets = [0] * len(BUCKETS)
+
+
+class Metrics:
+        """Process-wide counters, rendered by :meth:`render` for ``/metrics``."""
+
+        def __init__(self) -> None:
+                self._lock = threading.Lock()
+                self.routes: Dict[Tuple[str, str, str], _RouteMetrics] = {}
+                self.counters: Counter = Counter()
+
+        def count(self, name: str, route: str = "") -> None:
+                with self._lock:
+                        self.counters[(name, route)] += 1
+
+        def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+                with self._lock:
+                        entry = self.routes.setdefault((method, route, str(status)), _RouteMetrics())
+                        entry.count += 1
+                        entry.seconds += seconds
+                        entry.db_seconds += stats.db_seconds
+                        entry.serialization_seconds += stats.serialization_seconds
+                        entry.statements += stats.statements
+                        for index, bound in enumerate(BUCKETS):
+                                if seconds <= bound:
+                                        entry.buckets[index] += 1
+
+        def render(self) -> str:
+                lines = []
+                with self._lock:
+                        routes = sorted(self.routes.items())
+                        counters = sorted(self.counters.items())
+
+                def family(name: str, kind: str, help_text: str) -> None:
+                        lines.append(f"# HELP {name} {help_text}")
+                        lines.append(f"# TYPE {name} {kind}")
+
+                family("http_requests_total", "counter", "Requests by method, route template and status.")
+                for (method, route, status), entry in routes:
+                        lines.append(f"http_requests_total{_labels(method, route, status)} {entry.count}")
+                family("http_request_duration_seconds", "histogram", "Wall time per request.")
+                for (method, route, status), entry in routes:
+                        labels = _labels(method, route, status)
+                        for bound, cumulative in zip(BUCKETS, entry.buckets):
+                                lines.append(
+                                        f"http_request_duration_seconds_bucket{labels[:-1]},le=\"{bound}\"}} {cumulative}"
+                                )
+                        lines.append(f"http_request_duration_seconds_bucket{labels[:-1]},le=\"+Inf\"}} {entry.count}")
+                        lines.append(f"http_request_duration_seconds_sum{labels} {entry.seconds:.6f}")
+                        lines.append(f"http_request_duration_seconds_count{labels} {entry.count}")
+                for name, attribute, help_text in (
+                        ("http_request_db_seconds_total", "db_seconds", "Time spent executing SQL."),
+                        ("http_request_serialization_seconds_total", "serialization_seconds", "Time spent encoding bodies."),
+                        ("http_request_sql_statements_total", "statements", "SQL statements executed."),
+                ):
+                        family(name, "counter", help_text)
+                        for (method, route, status), entry in routes:
+                                value = getattr(entry, attribute)
+                                value = f"{value:.6f}" if isinstance(value, float) else value
+                                lines.append(f"{name}{_labels(method, route, status)} {value}")
+                family("sql_slow_queries_total", "counter", f"Statements slower than {SLOW_QUERY_MS:g} ms.")
+                lines.append(f"sql_slow_queries_total {sum(n for (name, _), n in counters if name == 'slow_queries')}")
+                family("http_n_plus_one_total", "counter", "Requests repeating one SELECT shape.")
+                for (name, route), value in counters:
+                        if name == "n_plus_one":
+                                lines.append(f'http_n_plus_one_total{{route="{_escape(route)}"}} {value}')
+                family("db_pool_checkouts_total", "counter", "Connection checkouts per engine.")
+                pools = pooling.snapshot()
+                for engine, stats in pools.items():
+                        lines.append(f'db_pool_checkouts_total{{engine="{engine}"}} {stats["checkouts"]}')
+                family("db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection.")
+                for engine, stats in pools.items():
+                        lines.append(f'db_pool_wait_seconds_total{{engine="{engine}"}} {stats["wait_seconds_total"]}')
+                return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _labels(method: str, route: str, status: str) -> str:
+        return f'{{method="{method}",route="{_escape(route)}",status="{status}"}}'
+
+
+_metrics = Metrics()
+
+
+def render_metrics() -> str:
+        return _metrics.render()
+
+
+class Middleware:
+        """ASGI middleware that collects :class:`RequestStats` for each HTTP request."""
+
+        def __init__(self, app):
+                self.app = app
+
+        async def __call__(self, scope, receive, send):
+                if scope["type"] != "http":
+                        await self.app(scope, receive, send)
+                        return
+                stats = RequestStats()
+                token = _current.set(stats)
+                started = time.perf_counter()
+                status = 500
+
+                async def send_with_timing(message):
+                        nonlocal status
+                        if message["type"] == "http.response.start":
+                                status = message["status"]
+                                total = (time.perf_counter() - started) * 1000
+                                timing = (
+                                        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statements} queries", '
+                                        f"ser;dur={stats.serialization_seconds * 1000:.2f}, total;dur={total:.2f}"
+                                )
+                                message["headers"] = list(message.get("headers", [])) + [
+                                        (b"server-timing", timing.encode("latin-1"))
+                                ]
+                        await send(message)
+
+                try:
+                        await self.app(scope, receive, send_with_timing)
+                finally:
+                        _current.reset(token)
+                        self._finish(scope, status, time.perf_counter() - started, stats)
+
+        @staticmethod
+        def _finish(scope, status: int, seconds: float, stats: RequestStats) -> None:
+                route = scope.get("route")
+                # Unmatched paths share one label so scanners cannot blow up cardinality
+                template = getattr(route, "path", None) or "unmatched"
+                # Scrapes, and event streams that stay open for minutes
+                if template in ("/metrics", "/events"):
+                        return
+                _metrics.observe(scope["method"], template, status, seconds, stats)
+                if seconds * 1000 >= SLOW_REQUEST_MS:
+                        logger.warning(
+                                "Slow request (%.1f ms, %.1f ms in %d queries): %s %s",
+                                seconds * 1000,
+                                stats.db_seconds * 1000,
+                                stats.statements,
+                                scope["method"],
+                                template,
+                        )
+                repeated = [(shape, n) for shape, n in stats.selects.items() if n >= N_PLUS_ONE_THRESHOLD]
+                if repeated:
+                        _metrics.count("n_plus_one", template)
+                        shape, n = max(repeated, key=lambda item: item[1])
+                        logger.warning(
+                                "Possible N+1: %s %s ran the same SELECT %d times: %s",
+                                scope["method"],
+                                template,
+                                n,
+                                shape[:500],
+                        )
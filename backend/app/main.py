@@ -1,20 +1,36 @@
 import os
+from typing import Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import Base, engine
-from .routers import books, vendors, customers, purchases, sales, sales_returns
-
-# 1. Create database tables if they do not exist
-Base.metadata.create_all(bind=engine)
+from fastapi.responses import PlainTextResponse
+from .database import engine
+from . import cache, idempotency, instrumentation, migrations, pooling, search, serialization
+from .routers import (
+    books, vendors, customers, purchases, sales, sales_returns, sales_orders, purchase_orders, reports, export, events, reorder
+)
 
 def _cors_origins() -> list[str]:
     default = "http://localhost:3000,http://127.0.0.1:3000"
     raw = os.getenv("CORS_ORIGINS", default)
     return [origin.strip() for origin in raw.split(",") if origin.strip()]
 
-def create_app() -> FastAPI:
-    app = FastAPI(title="Book Inventory API", version="1.0.0")
+def create_app(fast_json: Optional[bool] = None) -> FastAPI:
+    # 1. Schema changes run as a release step (python -m app.migrations upgrade);
+    # startup only checks the version, or migrates SQLite dev databases
+    migrations.ensure_current(engine)
+    search.install(engine)
+
+    # Fast JSON (see serialization.py) defaults to the FAST_JSON env var
+    serialization.configure(fast_json)
+    app = FastAPI(
+        title="Book Inventory API",
+        version="1.0.0",
+        default_response_class=serialization.DefaultResponse if serialization.fast() else serialization.StandardResponse,
+    )
     
+    # Idempotency-Key on POSTs: retries replay the stored response (see idempotency.py)
+    app.add_middleware(idempotency.Middleware)
+
     # Configure CORS middleware
     origins = _cors_origins()
     app.add_middleware(
@@ -24,6 +40,10 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+
+    # Per-route timings, SQL counts and slow/N+1 query logs (see instrumentation.py)
+    if instrumentation.INSTRUMENTATION:
+        app.add_middleware(instrumentation.Middleware)
     
     # Include all entity routers
     app.include_router(books.router)
@@ -32,11 +52,33 @@ def create_app() -> FastAPI:
     app.include_router(purchases.router)
     app.include_router(sales.router)
     app.include_router(sales_returns.router)
+    app.include_router(sales_orders.router)
+    app.include_router(purchase_orders.router)
+    app.include_router(reports.router)
+    app.include_router(reorder.router)
+    app.include_router(export.router)
+    app.include_router(events.router)
     
     # Application health check endpoint
     @app.get("/health")
     def health():
         return {"status": "ok"}
+
+    # Connection pool state and checkout wait times, for tuning DB_POOL_*
+    @app.get("/health/db-pool")
+    def db_pool():
+        return pooling.snapshot()
+
+    # Entity cache backend and hit/miss counters, for tuning ENTITY_CACHE_*
+    @app.get("/health/cache")
+    def entity_cache():
+        return cache.stats()
+
+    if instrumentation.INSTRUMENTATION:
+        # Prometheus text exposition of the middleware's counters
+        @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+        def metrics():
+            return PlainTextResponse(instrumentation.render_metrics(), media_type="text/plain; version=0.0.4")
         
     return app
 
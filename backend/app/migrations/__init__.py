@@ -0,0 +1,120 @@
+"""Versioned schema migrations.
+
+Each ``vNNN_<name>.py`` module in this package has an ``upgrade(conn)``
+function; applied versions are recorded in ``schema_migrations``. Migrations
+run as a release step, not at app startup::
+
+    python -m app.migrations upgrade     # apply pending migrations
+    python -m app.migrations status      # applied / latest version
+
+Every migration runs in its own transaction, which on PostgreSQL first takes
+a transaction-scoped advisory lock (safe behind PgBouncer) and re-reads the
+version, so concurrent release commands apply each migration once.
+
+At startup ``create_app`` only calls :func:`ensure_current`: one
+``SELECT max(version)`` that refuses to serve an out-of-date schema. With
+``DB_AUTO_MIGRATE`` (default on for SQLite, off otherwise) it upgrades
+instead, so local development needs no extra step.
+"""
+
+import importlib
+import os
+import pkgutil
+import re
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+
+class Migration(NamedTuple):
+        version: int
+        name: str
+        upgrade: Callable[[Connection], None]
+
+
+class SchemaOutdatedError(RuntimeError):
+        pass
+
+
+_metadata = MetaData()
+schema_migrations = Table(
+        "schema_migrations",
+        _metadata,
+        Column("version", Integer, primary_key=True),
+        Column("name", String(255), nullable=False),
+        Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+# Arbitrary constant identifying this app's migration lock
+_LOCK_KEY = 0x1B00C5
+
+
+def _discover() -> List[Migration]:
+        migrations = []
+        for module in pkgutil.iter_modules(__path__):
+                match = re.fullmatch(r"v(\d+)_(\w+)", module.name)
+                if match:
+                        loaded = importlib.import_module(f"{__name__}.{module.name}")
+                        migrations.append(Migration(int(match.group(1)), match.group(2), loaded.upgrade))
+        return sorted(migrations)
+
+
+MIGRATIONS = _discover()
+LATEST = MIGRATIONS[-1].version
+
+
+def applied_version(conn: Connection) -> int:
+        """Highest applied version; 0 for a database that has never been migrated."""
+        if not conn.dialect.has_table(conn, "schema_migrations"):
+                return 0
+        return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+        """Apply pending migrations up to ``target`` (default: all); returns those applied."""
+        with engine.begin() as conn:
+                _metadata.create_all(conn, checkfirst=True)
+        applied = []
+        for migration in MIGRATIONS:
+                if target is not None and migration.version > target:
+                        break
+                with engine.begin() as conn:
+                        if conn.dialect.name == "postgresql":
+                                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+                        if migration.version <= applied_version(conn):
+                                continue
+                        migration.upgrade(conn)
+                        conn.execute(insert(schema_migrations).values(version=migration.version, name=migration.name))
+                applied.append(migration)
+        return applied
+
+
+def _auto_migrate(engine: Engine) -> bool:
+        raw = os.getenv("DB_AUTO_MIGRATE")
+        if raw in (None, ""):
+                return engine.dialect.name == "sqlite"
+        return raw.lower() in {"1", "true", "yes"}
+
+
+def ensure_current(engine: Engine) -> None:
+        """Startup check: raise :class:`SchemaOutdatedError` if migrations are pending.
+
+        A schema newer than this code is accepted, so old workers keep serving
+        while a release rolls out.
+        """
+        if _auto_migrate(engine):
+                upgrade(engine)
+                return
+        try:
+                with engine.connect() as conn:
+                        version = conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+        except DBAPIError:
+                # No schema_migrations table yet
+                version = 0
+        if version < LATEST:
+                raise SchemaOutdatedError(
+                        f"Database schema is at version {version}, this release needs {LATEST}; "
+                        "run `python -m app.migrations upgrade`"
+                )
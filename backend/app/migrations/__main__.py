@@ -0,0 +1,31 @@
+"""``python -m app.migrations {upgrade,status}``."""
+
+import argparse
+
+from . import LATEST, MIGRATIONS, applied_version, upgrade
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description="Apply or inspect the versioned schema migrations")
+        parser.add_argument("command", choices=["upgrade", "status"])
+        parser.add_argument("--target", type=int, help="stop after this version (upgrade only)")
+        args = parser.parse_args()
+
+        from ..database import engine
+
+        if args.command == "upgrade":
+                applied = upgrade(engine, target=args.target)
+                for migration in applied:
+                        print(f"applied {migration.version:03d} {migration.name}")
+                if not applied:
+                        print("Schema already up to date")
+        with engine.connect() as conn:
+                version = applied_version(conn)
+        print(f"schema version {version}, latest {LATEST}")
+        for migration in MIGRATIONS:
+                if migration.version > version:
+                        print(f"  pending {migration.version:03d} {migration.name}")
+
+
+if __name__ == "__main__":
+        main()
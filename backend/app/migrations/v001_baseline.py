@@ -0,0 +1,115 @@
+"""Baseline: the six entity tables as the API first created them.
+
+Tables are defined here rather than taken from ``models`` so this migration
+keeps producing the same schema as the models evolve. Existing tables are left
+alone, which brings databases created by the old ``create_all`` (or by
+``supabase/migrations/001_initial_schema.sql``) under version control.
+"""
+
+from sqlalchemy import (
+        Column,
+        DateTime,
+        Enum,
+        ForeignKey,
+        Integer,
+        MetaData,
+        Numeric,
+        String,
+        Table,
+        func,
+)
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+
+def _timestamps():
+        return (
+                Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+                Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        )
+
+
+def _contact():
+        return (
+                Column("contact_address", String(512)),
+                Column("contact_person", String(255)),
+                Column("contact_number", String(64)),
+                Column("email", String(255)),
+                Column("tax_number", String(64)),
+        )
+
+
+Table(
+        "books",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("title", String(255), nullable=False, index=True),
+        Column("author", String(255), nullable=False, index=True),
+        Column("isbn", String(64), unique=True, index=True),
+        Column("quantity", Integer, nullable=False),
+        Column("price", Numeric(10, 2), nullable=False),
+        *_timestamps(),
+)
+
+Table(
+        "vendors",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String(255), nullable=False, unique=True, index=True),
+        *_contact(),
+        *_timestamps(),
+)
+
+Table(
+        "customers",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String(255), nullable=False, unique=True, index=True),
+        *_contact(),
+        Column("category", Enum("SCHOOL", "STATIONERY_SHOP", "DEALER", name="customercategory"), nullable=False),
+        *_timestamps(),
+)
+
+Table(
+        "purchases",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("vendor_id", Integer, ForeignKey("vendors.id"), nullable=False, index=True),
+        Column("book_id", Integer, ForeignKey("books.id"), nullable=False, index=True),
+        Column("quantity", Integer, nullable=False),
+        Column("unit_cost", Numeric(10, 2), nullable=False),
+        Column("total_cost", Numeric(12, 2), nullable=False),
+        Column("purchased_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Column("notes", String(512)),
+        *_timestamps(),
+)
+
+Table(
+        "sales",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("customer_id", Integer, ForeignKey("customers.id"), nullable=False, index=True),
+        Column("book_id", Integer, ForeignKey("books.id"), nullable=False, index=True),
+        Column("quantity", Integer, nullable=False),
+        Column("unit_price", Numeric(10, 2), nullable=False),
+        Column("total_amount", Numeric(12, 2), nullable=False),
+        Column("sold_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Column("notes", String(512)),
+        *_timestamps(),
+)
+
+Table(
+        "sales_returns",
+        metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("sale_id", Integer, ForeignKey("sales.id"), nullable=False, index=True),
+        Column("quantity", Integer, nullable=False),
+        Column("reason", String(512)),
+        Column("processed_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        *_timestamps(),
+)
+
+
+def upgrade(conn: Connection) -> None:
+        metadata.create_all(conn, checkfirst=True)
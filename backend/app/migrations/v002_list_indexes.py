@@ -0,0 +1,29 @@
+"""Composite indexes behind the list endpoints.
+
+``(sort column, id)`` serves keyset pagination of each unfiltered list, and
+``(filter column, sort column, id)`` the filtered ones (sales by customer or
+book, purchases by vendor or book, returns by sale), so a page is an index
+range scan instead of a filter plus sort.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+INDEXES = (
+        ("ix_books_created_at_id", "books", "created_at, id"),
+        ("ix_vendors_created_at_id", "vendors", "created_at, id"),
+        ("ix_customers_created_at_id", "customers", "created_at, id"),
+        ("ix_purchases_purchased_at_id", "purchases", "purchased_at, id"),
+        ("ix_purchases_vendor_id_purchased_at_id", "purchases", "vendor_id, purchased_at, id"),
+        ("ix_purchases_book_id_purchased_at_id", "purchases", "book_id, purchased_at, id"),
+        ("ix_sales_sold_at_id", "sales", "sold_at, id"),
+        ("ix_sales_customer_id_sold_at_id", "sales", "customer_id, sold_at, id"),
+        ("ix_sales_book_id_sold_at_id", "sales", "book_id, sold_at, id"),
+        ("ix_sales_returns_processed_at_id", "sales_returns", "processed_at, id"),
+        ("ix_sales_returns_sale_id_processed_at_id", "sales_returns", "sale_id, processed_at, id"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+        for name, table, columns in INDEXES:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
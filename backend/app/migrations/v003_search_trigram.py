@@ -0,0 +1,23 @@
+"""Trigram GIN indexes for ``ILIKE`` search on PostgreSQL (see ``search.py``).
+
+SQLite gets its FTS5 tables from ``search.install`` at startup instead.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+INDEXES = (
+        ("ix_books_title_trgm", "books", "title"),
+        ("ix_books_author_trgm", "books", "author"),
+        ("ix_books_isbn_trgm", "books", "isbn"),
+        ("ix_vendors_name_trgm", "vendors", "name"),
+        ("ix_customers_name_trgm", "customers", "name"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+        if conn.dialect.name != "postgresql":
+                return
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for name, table, column in INDEXES:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"))
@@ -0,0 +1,16 @@
+"""``sales.returned_quantity``, backfilled from ``sales_returns``."""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def upgrade(conn: Connection) -> None:
+        if "returned_quantity" in {column["name"] for column in inspect(conn).get_columns("sales")}:
+                return
+        conn.execute(text("ALTER TABLE sales ADD COLUMN returned_quantity INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(
+                text(
+                        "UPDATE sales SET returned_quantity = ("
+                        "SELECT COALESCE(SUM(r.quantity), 0) FROM sales_returns r WHERE r.sale_id = sales.id)"
+                )
+        )
@@ -0,0 +1,55 @@
+"""Daily summary tables behind ``/reports``.
+
+They start empty; on a database that already has sales, backfill them with
+``python -m app.summaries rebuild``.
+"""
+
+from sqlalchemy import Column, Date, ForeignKey, Integer, MetaData, Numeric, Table
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+# Referenced tables, only so the foreign keys resolve
+for _name in ("books", "customers", "vendors"):
+        Table(_name, metadata, Column("id", Integer, primary_key=True))
+
+
+def _measures():
+        return (
+                Column("units_sold", Integer, nullable=False),
+                Column("units_returned", Integer, nullable=False),
+                Column("revenue", Numeric(14, 2), nullable=False),
+                Column("refunds", Numeric(14, 2), nullable=False),
+        )
+
+
+SUMMARIES = (
+        Table(
+                "book_sales_daily",
+                metadata,
+                Column("day", Date, primary_key=True),
+                Column("book_id", Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True, index=True),
+                *_measures(),
+        ),
+        Table(
+                "customer_sales_daily",
+                metadata,
+                Column("day", Date, primary_key=True),
+                Column(
+                        "customer_id", Integer, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True, index=True
+                ),
+                *_measures(),
+        ),
+        Table(
+                "vendor_purchases_daily",
+                metadata,
+                Column("day", Date, primary_key=True),
+                Column("vendor_id", Integer, ForeignKey("vendors.id", ondelete="CASCADE"), primary_key=True, index=True),
+                Column("units", Integer, nullable=False),
+                Column("spend", Numeric(14, 2), nullable=False),
+        ),
+)
+
+
+def upgrade(conn: Connection) -> None:
+        metadata.create_all(conn, tables=SUMMARIES, checkfirst=True)
@@ -0,0 +1,30 @@
+"""Database-side ``updated_at`` maintenance on PostgreSQL.
+
+The ORM already sets ``updated_at`` on its own writes; the trigger also
+covers SQL run outside the API (Supabase editor, scripts). SQLite relies on
+the ORM only.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+TABLES = ("books", "vendors", "customers", "purchases", "sales", "sales_returns")
+
+
+def upgrade(conn: Connection) -> None:
+        if conn.dialect.name != "postgresql":
+                return
+        conn.execute(
+                text(
+                        "CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$ "
+                        "BEGIN NEW.updated_at = now(); RETURN NEW; END; $$ LANGUAGE plpgsql"
+                )
+        )
+        for table in TABLES:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_set_updated_at ON {table}"))
+                conn.execute(
+                        text(
+                                f"CREATE TRIGGER {table}_set_updated_at BEFORE UPDATE ON {table} "
+                                "FOR EACH ROW EXECUTE FUNCTION set_updated_at()"
+                        )
+                )
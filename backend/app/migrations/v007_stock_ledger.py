@@ -0,0 +1,49 @@
+"""Stock ledger: ``stock_movements`` and ``stock_checkpoints``.
+
+History starts here: every book's current quantity is recorded as one
+``OPENING`` movement at upgrade time, so stock as of an earlier moment is not
+known.
+"""
+
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, MetaData, Table, func, insert, literal, select
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+books = Table("books", metadata, Column("id", Integer, primary_key=True), Column("quantity", Integer))
+
+kind = Enum("OPENING", "PURCHASE", "SALE", "RETURN", "ADJUSTMENT", name="stockmovementkind")
+
+movements = Table(
+        "stock_movements",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("book_id", Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False),
+        Column("delta", Integer, nullable=False),
+        Column("kind", kind, nullable=False),
+        Column("reference_id", Integer),
+        Column("moved_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Index("ix_stock_movements_book_id_moved_at", "book_id", "moved_at"),
+        Index("ix_stock_movements_moved_at", "moved_at"),
+)
+
+checkpoints = Table(
+        "stock_checkpoints",
+        metadata,
+        Column("taken_at", DateTime(timezone=True), primary_key=True),
+        Column("book_id", Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True),
+        Column("quantity", Integer, nullable=False),
+        Index("ix_stock_checkpoints_book_id_taken_at", "book_id", "taken_at"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+        metadata.create_all(conn, tables=[movements, checkpoints], checkfirst=True)
+        if conn.execute(select(movements.c.id).limit(1)).first() is not None:
+                return
+        conn.execute(
+                insert(movements).from_select(
+                        ["book_id", "delta", "kind"],
+                        select(books.c.id, books.c.quantity, literal("OPENING", kind)).where(books.c.quantity != 0),
+                )
+        )
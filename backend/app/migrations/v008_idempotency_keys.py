@@ -0,0 +1,22 @@
+"""``idempotency_keys``: claimed keys and stored responses for retried POSTs."""
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, MetaData, String, Table, func
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+idempotency_keys = Table(
+        "idempotency_keys",
+        metadata,
+        Column("key", String(255), primary_key=True),
+        Column("fingerprint", String(64), nullable=False),
+        Column("status_code", Integer),
+        Column("content_type", String(255)),
+        Column("body", LargeBinary),
+        Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+)
+
+
+def upgrade(conn: Connection) -> None:
+        metadata.create_all(conn, checkfirst=True)
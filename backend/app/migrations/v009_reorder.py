@@ -0,0 +1,28 @@
+"""Reorder points: ``vendors.lead_time_days`` and the ``book_demand`` table.
+
+``book_demand`` starts empty; on a database that already has sales, fill it
+with ``python -m app.reorder rebuild``.
+"""
+
+from sqlalchemy import Column, Float, ForeignKey, Integer, MetaData, Table, inspect, text
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+# Referenced tables, only so the foreign keys resolve
+for _name in ("books", "vendors"):
+        Table(_name, metadata, Column("id", Integer, primary_key=True))
+
+book_demand = Table(
+        "book_demand",
+        metadata,
+        Column("book_id", Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True),
+        Column("decayed_units", Float, nullable=False),
+        Column("last_vendor_id", Integer, ForeignKey("vendors.id", ondelete="SET NULL")),
+)
+
+
+def upgrade(conn: Connection) -> None:
+        if "lead_time_days" not in {column["name"] for column in inspect(conn).get_columns("vendors")}:
+                conn.execute(text("ALTER TABLE vendors ADD COLUMN lead_time_days INTEGER"))
+        metadata.create_all(conn, tables=[book_demand], checkfirst=True)
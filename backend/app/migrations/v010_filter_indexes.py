@@ -0,0 +1,38 @@
+"""Indexes behind the list endpoints' ``field[op]`` filters and ``sort``.
+
+Every whitelisted sort column (see ``app/filtering.py``) gets a
+``(column, id)`` index for keyset pagination, and customers a
+``(category, created_at, id)`` one for the category filter. The single-column
+indexes on ``books.title`` and the sale, purchase and return foreign keys are
+dropped. Each is the leading column of a composite index, which serves the
+same lookups, so keeping both only slows writes.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+INDEXES = (
+        ("ix_books_title_id", "books", "title, id"),
+        ("ix_books_price_id", "books", "price, id"),
+        ("ix_books_quantity_id", "books", "quantity, id"),
+        ("ix_customers_category_created_at_id", "customers", "category, created_at, id"),
+        ("ix_purchases_total_cost_id", "purchases", "total_cost, id"),
+        ("ix_sales_total_amount_id", "sales", "total_amount, id"),
+)
+
+# Each is a prefix of an index above or from v002
+REDUNDANT = (
+        "ix_books_title",
+        "ix_purchases_vendor_id",
+        "ix_purchases_book_id",
+        "ix_sales_customer_id",
+        "ix_sales_book_id",
+        "ix_sales_returns_sale_id",
+)
+
+
+def upgrade(conn: Connection) -> None:
+        for name, table, columns in INDEXES:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+        for name in REDUNDANT:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
@@ -0,0 +1,61 @@
+"""Order headers: ``sales_orders`` and ``purchase_orders``, and ``order_id``
+on ``sales`` and ``purchases`` linking lines to them.
+
+Existing sales and purchases stay standalone (``order_id`` null).
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, func, inspect, text
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+# Referenced tables, only so the foreign keys resolve
+for _name in ("customers", "vendors"):
+        Table(_name, metadata, Column("id", Integer, primary_key=True))
+
+sales_orders = Table(
+        "sales_orders",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("customer_id", Integer, ForeignKey("customers.id"), nullable=False),
+        Column("sold_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Column("notes", String(512)),
+        Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Index("ix_sales_orders_sold_at_id", "sold_at", "id"),
+        Index("ix_sales_orders_customer_id_sold_at_id", "customer_id", "sold_at", "id"),
+)
+
+purchase_orders = Table(
+        "purchase_orders",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("vendor_id", Integer, ForeignKey("vendors.id"), nullable=False),
+        Column("purchased_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Column("notes", String(512)),
+        Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+        Index("ix_purchase_orders_purchased_at_id", "purchased_at", "id"),
+        Index("ix_purchase_orders_vendor_id_purchased_at_id", "vendor_id", "purchased_at", "id"),
+)
+
+# line table -> header table
+LINES = (("sales", "sales_orders"), ("purchases", "purchase_orders"))
+
+
+def upgrade(conn: Connection) -> None:
+        metadata.create_all(conn, tables=[sales_orders, purchase_orders], checkfirst=True)
+        for table, orders in LINES:
+                if "order_id" not in {column["name"] for column in inspect(conn).get_columns(table)}:
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN order_id INTEGER REFERENCES {orders}(id)"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_order_id ON {table} (order_id)"))
+        if conn.dialect.name == "postgresql":
+                # Same trigger as v006
+                for table in ("sales_orders", "purchase_orders"):
+                        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_set_updated_at ON {table}"))
+                        conn.execute(
+                                text(
+                                        f"CREATE TRIGGER {table}_set_updated_at BEFORE UPDATE ON {table} "
+                                        "FOR EACH ROW EXECUTE FUNCTION set_updated_at()"
+                                )
+                        )
@@ -1,16 +1,26 @@
 from enum import Enum as PyEnum
-from sqlalchemy import Column, Integer, String, DateTime, Numeric, Enum, ForeignKey
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Numeric, Enum, ForeignKey, Index, LargeBinary
+from sqlalchemy.orm import column_property, relationship
+from sqlalchemy.sql import func, select
 
 from .database import Base
 
+# The schema itself is created and changed by app.migrations; keep new columns
+# and indexes here in step with a migration.
+
 
 class Book(Base):
         __tablename__ = "books"
+        __table_args__ = (
+                Index("ix_books_created_at_id", "created_at", "id"),
+                Index("ix_books_title_id", "title", "id"),
+                Index("ix_books_price_id", "price", "id"),
+                Index("ix_books_quantity_id", "quantity", "id"),
+        )
+        __mapper_args__ = {"eager_defaults": True}
 
         id = Column(Integer, primary_key=True, index=True)
-        title = Column(String(255), nullable=False, index=True)
+        title = Column(String(255), nullable=False)
         author = Column(String(255), nullable=False, index=True)
         isbn = Column(String(64), unique=True, nullable=True, index=True)
         quantity = Column(Integer, nullable=False, default=0)
@@ -32,6 +42,8 @@ class CustomerCategory(PyEnum):
 
 class Vendor(Base):
         __tablename__ = "vendors"
+        __table_args__ = (Index("ix_vendors_created_at_id", "created_at", "id"),)
+        __mapper_args__ = {"eager_defaults": True}
 
         id = Column(Integer, primary_key=True, index=True)
         name = Column(String(255), nullable=False, unique=True, index=True)
@@ -40,6 +52,8 @@ class Vendor(Base):
         contact_number = Column(String(64), nullable=True)
         email = Column(String(255), nullable=True)
         tax_number = Column(String(64), nullable=True)
+        # Days from order to delivery, for reorder points (reorder.py)
+        lead_time_days = Column(Integer, nullable=True)
         created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
         updated_at = Column(
                 DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
@@ -50,6 +64,11 @@ class Vendor(Base):
 
 class Customer(Base):
         __tablename__ = "customers"
+        __table_args__ = (
+                Index("ix_customers_created_at_id", "created_at", "id"),
+                Index("ix_customers_category_created_at_id", "category", "created_at", "id"),
+        )
+        __mapper_args__ = {"eager_defaults": True}
 
         id = Column(Integer, primary_key=True, index=True)
         name = Column(String(255), nullable=False, unique=True, index=True)
@@ -69,15 +88,25 @@ class Customer(Base):
 
 class Purchase(Base):
         __tablename__ = "purchases"
+        __table_args__ = (
+                Index("ix_purchases_purchased_at_id", "purchased_at", "id"),
+                Index("ix_purchases_vendor_id_purchased_at_id", "vendor_id", "purchased_at", "id"),
+                Index("ix_purchases_book_id_purchased_at_id", "book_id", "purchased_at", "id"),
+                Index("ix_purchases_total_cost_id", "total_cost", "id"),
+                Index("ix_purchases_order_id", "order_id"),
+        )
+        __mapper_args__ = {"eager_defaults": True}
 
         id = Column(Integer, primary_key=True, index=True)
-        vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False, index=True)
-        book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index=True)
+        vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
+        book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
         quantity = Column(Integer, nullable=False)
         unit_cost = Column(Numeric(10, 2), nullable=False)
         total_cost = Column(Numeric(12, 2), nullable=False)
         purchased_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
         notes = Column(String(512), nullable=True)
+        # Set when the purchase is a line of a purchase order
+        order_id = Column(Integer, ForeignKey("purchase_orders.id"), nullable=True)
         created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
         updated_at = Column(
                 DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
@@ -85,19 +114,32 @@ class Purchase(Base):
 
         vendor = relationship("Vendor", back_populates="purchases")
         book = relationship("Book", back_populates="purchases")
+        order = relationship("PurchaseOrder", back_populates="lines")
 
 
 class Sale(Base):
         __tablename__ = "sales"
+        __table_args__ = (
+                Index("ix_sales_sold_at_id", "sold_at", "id"),
+                Index("ix_sales_customer_id_sold_at_id", "customer_id", "sold_at", "id"),
+                Index("ix_sales_book_id_sold_at_id", "book_id", "sold_at", "id"),
+                Index("ix_sales_total_amount_id", "total_amount", "id"),
+                Index("ix_sales_order_id", "order_id"),
+        )
+        __mapper_args__ = {"eager_defaults": True}
 
         id = Column(Integer, primary_key=True, index=True)
-        customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False, index=True)
-        book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index=True)
+        customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+        book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
         quantity = Column(Integer, nullable=False)
         unit_price = Column(Numeric(10, 2), nullable=False)
         total_amount = Column(Numeric(12, 2), nullable=False)
+        # Sum of sales_returns.quantity, maintained by crud.create_sales_return
+        returned_quantity = Column(Integer, nullable=False, default=0, server_default="0")
         sold_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
         notes = Column(String(512), nullable=True)
+        # Set when the sale is a line of a sales order
+        order_id = Column(Integer, ForeignKey("sales_orders.id"), nullable=True)
         created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
         updated_at = Column(
                 DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
@@ -106,13 +148,19 @@ class Sale(Base):
         customer = relationship("Customer", back_populates="sales")
         book = relationship("Book", back_populates="sales")
         returns = relationship("SalesReturn", back_populates="sale", cascade="all, delete-orphan")
+        order = relationship("SalesOrder", back_populates="lines")
 
 
 class SalesReturn(Base):
         __tablename__ = "sales_returns"
+        __table_args__ = (
+                Index("ix_sales_returns_processed_at_id", "processed_at", "id"),
+                Index("ix_sales_returns_sale_id_processed_at_id", "sale_id", "processed_at", "id"),
+        )
+        __mapper_args__ = {"eager_defaults": True}
 
         id = Column(Integer, primary_key=True, index=True)
-        sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False, index=True)
+        sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
         quantity = Column(Integer, nullable=False)
         reason = Column(String(512), nullable=True)
         processed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -124,3 +172,171 @@ class SalesReturn(Base):
         sale = relationship("Sale", back_populates="returns")
 
 
+# Order headers (invoices): one customer or vendor, date and note for many
+# sale or purchase lines, which keep their own copy of those columns so the
+# line-level indexes, reports and returns work unchanged. Totals are summed
+# from the lines in SQL whenever an order is read.
+
+
+class SalesOrder(Base):
+        __tablename__ = "sales_orders"
+        __table_args__ = (
+                Index("ix_sales_orders_sold_at_id", "sold_at", "id"),
+                Index("ix_sales_orders_customer_id_sold_at_id", "customer_id", "sold_at", "id"),
+        )
+        __mapper_args__ = {"eager_defaults": True}
+
+        id = Column(Integer, primary_key=True)
+        customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+        sold_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+        notes = Column(String(512), nullable=True)
+        created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+        updated_at = Column(
+                DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+        )
+
+        customer = relationship("Customer")
+        lines = relationship("Sale", back_populates="order", order_by="Sale.id")
+
+
+class PurchaseOrder(Base):
+        __tablename__ = "purchase_orders"
+        __table_args__ = (
+                Index("ix_purchase_orders_purchased_at_id", "purchased_at", "id"),
+                Index("ix_purchase_orders_vendor_id_purchased_at_id", "vendor_id", "purchased_at", "id"),
+        )
+        __mapper_args__ = {"eager_defaults": True}
+
+        id = Column(Integer, primary_key=True)
+        vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=False)
+        purchased_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+        notes = Column(String(512), nullable=True)
+        created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+        updated_at = Column(
+                DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+        )
+
+        vendor = relationship("Vendor")
+        lines = relationship("Purchase", back_populates="order", order_by="Purchase.id")
+
+
+def _over_lines(order, line, aggregate):
+        """Correlated ``aggregate`` over ``order``'s lines, served by the ``order_id`` index."""
+        stmt = select(func.coalesce(aggregate, 0)).where(line.order_id == order.id).correlate_except(line)
+        return column_property(stmt.scalar_subquery())
+
+
+SalesOrder.line_count = _over_lines(SalesOrder, Sale, func.count(Sale.id))
+SalesOrder.total_quantity = _over_lines(SalesOrder, Sale, func.sum(Sale.quantity))
+SalesOrder.total_amount = _over_lines(SalesOrder, Sale, func.sum(Sale.total_amount))
+PurchaseOrder.line_count = _over_lines(PurchaseOrder, Purchase, func.count(Purchase.id))
+PurchaseOrder.total_quantity = _over_lines(PurchaseOrder, Purchase, func.sum(Purchase.quantity))
+PurchaseOrder.total_cost = _over_lines(PurchaseOrder, Purchase, func.sum(Purchase.total_cost))
+
+
+class StockMovementKind(PyEnum):
+        OPENING = "opening"
+        PURCHASE = "purchase"
+        SALE = "sale"
+        RETURN = "return"
+        ADJUSTMENT = "adjustment"
+
+
+# Append-only stock ledger (see stock.py): one row per change to
+# books.quantity, written in the same transaction as the change, plus
+# periodic per-book checkpoints derived from it.
+
+
+class StockMovement(Base):
+        __tablename__ = "stock_movements"
+        __table_args__ = (
+                Index("ix_stock_movements_book_id_moved_at", "book_id", "moved_at"),
+                Index("ix_stock_movements_moved_at", "moved_at"),
+        )
+
+        id = Column(Integer, primary_key=True)
+        book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
+        delta = Column(Integer, nullable=False)
+        kind = Column(Enum(StockMovementKind), nullable=False)
+        # Id of the purchase, sale or sales return behind the movement, if any
+        reference_id = Column(Integer, nullable=True)
+        moved_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class StockCheckpoint(Base):
+        __tablename__ = "stock_checkpoints"
+        __table_args__ = (Index("ix_stock_checkpoints_book_id_taken_at", "book_id", "taken_at"),)
+
+        taken_at = Column(DateTime(timezone=True), primary_key=True)
+        book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+        quantity = Column(Integer, nullable=False)
+
+
+
+
+# Daily summary tables behind the /reports endpoints. They are maintained in
+# the same transaction as each sale, return and purchase (see summaries.py), so
+# reports scan one row per day and entity instead of the raw line tables.
+
+
+class BookSalesDaily(Base):
+        __tablename__ = "book_sales_daily"
+
+        day = Column(Date, primary_key=True)
+        book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True, index=True)
+        units_sold = Column(Integer, nullable=False, default=0)
+        units_returned = Column(Integer, nullable=False, default=0)
+        revenue = Column(Numeric(14, 2), nullable=False, default=0)
+        refunds = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class CustomerSalesDaily(Base):
+        __tablename__ = "customer_sales_daily"
+
+        day = Column(Date, primary_key=True)
+        customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True, index=True)
+        units_sold = Column(Integer, nullable=False, default=0)
+        units_returned = Column(Integer, nullable=False, default=0)
+        revenue = Column(Numeric(14, 2), nullable=False, default=0)
+        refunds = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class VendorPurchasesDaily(Base):
+        __tablename__ = "vendor_purchases_daily"
+
+        day = Column(Date, primary_key=True)
+        vendor_id = Column(Integer, ForeignKey("vendors.id", ondelete="CASCADE"), primary_key=True, index=True)
+        units = Column(Integer, nullable=False, default=0)
+        spend = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+# Per-book sales velocity and supplier behind /reorder-suggestions, maintained
+# in the same transaction as each sale, return and purchase (see reorder.py)
+
+
+class BookDemand(Base):
+        __tablename__ = "book_demand"
+
+        book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+        # Net units sold, forward-decayed: sum of quantity * exp(age since epoch / window)
+        decayed_units = Column(Float, nullable=False, default=0)
+        # Vendor of the latest purchase; its lead time applies to the book
+        last_vendor_id = Column(Integer, ForeignKey("vendors.id", ondelete="SET NULL"), nullable=True)
+
+
+# Claimed Idempotency-Key headers and, once the request succeeded, its
+# response (see idempotency.py)
+
+
+class IdempotencyKey(Base):
+        __tablename__ = "idempotency_keys"
+
+        key = Column(String(255), primary_key=True)
+        # sha256 of method, path, query string and body
+        fingerprint = Column(String(64), nullable=False)
+        # Null while the first request is still running
+        status_code = Column(Integer, nullable=True)
+        content_type = Column(String(255), nullable=True)
+        body = Column(LargeBinary, nullable=True)
+        created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+        expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,113 @@
+"""Keyset (cursor) pagination shared by the ``crud.list_*`` functions.
+
+A cursor is an opaque, URL-safe token over the ``(sort value, id)`` pair of the
+last row of a page, and the name of the sort column. The next page is fetched
+with a row-value comparison against that pair, which the composite
+``(sort column, id)`` indexes serve directly, so page N costs the same as
+page 1.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+
+class Page(NamedTuple):
+        items: List[Any]
+        total: Optional[int]
+        next_cursor: Optional[str]
+        has_more: bool
+
+
+def encode_cursor(sort_value: Any, row_id: int, sort_key: Optional[str] = None) -> str:
+        if isinstance(sort_value, datetime):
+                sort_value = sort_value.isoformat()
+        elif isinstance(sort_value, Decimal):
+                sort_value = str(sort_value)
+        token = [sort_value, row_id] if sort_key is None else [sort_value, row_id, sort_key]
+        raw = json.dumps(token, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, python_type: type = datetime) -> Tuple[Any, int, Optional[str]]:
+        """``(sort value, id, sort column name)``; cursors issued before sorting
+        was configurable carry no column name.
+        """
+        try:
+                padded = token + "=" * (-len(token) % 4)
+                sort_value, row_id, *sort_key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+                if python_type is datetime:
+                        sort_value = datetime.fromisoformat(sort_value)
+                elif not isinstance(sort_value, python_type):
+                        sort_value = python_type(sort_value)
+                return sort_value, int(row_id), sort_key[0] if sort_key else None
+        except (binascii.Error, ValueError, TypeError, ArithmeticError) as exc:
+                raise ValueError("Invalid cursor") from exc
+
+
+def paginate(
+        db: Session,
+        stmt: Select,
+        sort_column,
+        *,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        order_by: Optional[Sequence] = None,
+        as_rows: bool = False,
+        descending: bool = True,
+) -> Tuple[List[Any], Optional[str], bool]:
+        """Run ``stmt`` ordered by ``(sort_column, id)`` and return one page,
+        newest (largest) first unless ``descending`` is false.
+
+        When ``cursor`` is given the page starts right after the row it encodes;
+        ``skip`` is still honoured relative to that position. One extra row is
+        fetched to decide whether there is a next page.
+
+        ``order_by`` replaces the keyset ordering (e.g. search relevance); such
+        pages are offset-only and never emit a ``next_cursor``.
+
+        ``as_rows`` returns each result row as a plain dict (for column selects)
+        instead of the first entity of each row.
+        """
+        id_column = sort_column.class_.id
+        if order_by is not None:
+                if cursor:
+                        raise ValueError("Cursor pagination is not supported for ranked search results")
+                stmt = stmt.order_by(*order_by, id_column.desc())
+        else:
+                if cursor:
+                        sort_value, row_id, sort_key = decode_cursor(cursor, sort_column.type.python_type)
+                        if sort_key is not None and sort_key != sort_column.key:
+                                raise ValueError("Cursor was issued for a different sort order")
+                        # Compare against the anchor row's stored value so the keyset is
+                        # exact regardless of how the backend renders timestamps; fall
+                        # back to the encoded value if the anchor row has been deleted.
+                        anchor = select(sort_column).where(id_column == row_id).scalar_subquery()
+                        key = tuple_(sort_column, id_column)
+                        after = tuple_(func.coalesce(anchor, sort_value), row_id)
+                        stmt = stmt.where(key < after if descending else key > after)
+                if descending:
+                        stmt = stmt.order_by(sort_column.desc(), id_column.desc())
+                else:
+                        stmt = stmt.order_by(sort_column.asc(), id_column.asc())
+        result = db.execute(stmt.offset(skip).limit(limit + 1))
+        items = [dict(row) for row in result.mappings()] if as_rows else list(result.scalars().all())
+        has_more = len(items) > limit
+        next_cursor = None
+        if has_more:
+                items = items[:limit]
+                if order_by is None:
+                        last = items[-1]
+                        if as_rows:
+                                next_cursor = encode_cursor(last[sort_column.key], last["id"], sort_column.key)
+                        else:
+                                next_cursor = encode_cursor(getattr(last, sort_column.key), last.id, sort_column.key)
+        return items, next_cursor, has_more
@@ -0,0 +1,169 @@
+"""Connection pool configuration and metrics.
+
+Pool behaviour is driven by environment variables so each deployment can be
+tuned without code changes:
+
+``DB_POOL_CLASS``
+    ``queue`` (a real client-side pool), ``null`` (open/close per checkout) or
+    ``static`` (one shared connection). Defaults to ``null`` behind the
+    Supabase transaction pooler, as before, and to ``queue`` otherwise.
+``DB_POOL_SIZE`` / ``DB_MAX_OVERFLOW`` / ``DB_POOL_TIMEOUT``
+    Persistent connections, extra burst connections, and seconds to wait for
+    a free connection (``queue`` only; defaults 5 / 10 / 30).
+``DB_POOL_RECYCLE``
+    Seconds after which a pooled connection is replaced (default 1800 on
+    PostgreSQL so idle server-side timeouts never hand out dead connections).
+``DB_POOL_PRE_PING``
+    Ping before each checkout. Defaults on for pooled PostgreSQL connections
+    and off for ``null``; with a recycled ``queue`` pool it can usually be
+    turned off too, saving a round trip per request.
+``DB_STATEMENT_CACHE_SIZE``
+    asyncpg prepared statement cache. Defaults to 0 behind the Supabase pooler
+    because PgBouncer transaction mode cannot keep server-side statements.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+        raw = os.getenv(name)
+        return default if raw in (None, "") else int(raw)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+        raw = os.getenv(name)
+        return default if raw in (None, "") else raw.lower() in {"1", "true", "yes"}
+
+
+class PoolMetrics:
+        """Counters for one engine's pool; read via :func:`snapshot`."""
+
+        def __init__(self) -> None:
+                self._lock = threading.Lock()
+                self.checkouts = 0
+                self.connects = 0
+                self.wait_seconds_total = 0.0
+                self.wait_seconds_max = 0.0
+
+        def record_wait(self, seconds: float) -> None:
+                with self._lock:
+                        self.checkouts += 1
+                        self.wait_seconds_total += seconds
+                        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+        def record_connect(self) -> None:
+                with self._lock:
+                        self.connects += 1
+
+
+class _TimedPoolMixin:
+        """Times how long each checkout waits for a connection."""
+
+        _metrics: Optional[PoolMetrics] = None
+
+        def _do_get(self):
+                started = time.perf_counter()
+                try:
+                        return super()._do_get()
+                finally:
+                        if self._metrics is not None:
+                                self._metrics.record_wait(time.perf_counter() - started)
+
+        def recreate(self):
+                pool = super().recreate()
+                pool._metrics = self._metrics
+                return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+        pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+        pass
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+        pass
+
+
+class TimedStaticPool(_TimedPoolMixin, StaticPool):
+        pass
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+_engines: Dict[str, Engine] = {}
+
+
+def engine_kwargs(database_url: str, *, is_async: bool = False, behind_pgbouncer: bool = False) -> dict:
+        """Pool-related ``create_engine`` keyword arguments for this deployment."""
+        is_postgres = database_url.startswith("postgresql")
+        in_memory = database_url.startswith("sqlite") and (":memory:" in database_url or database_url == "sqlite://")
+        default_class = "null" if behind_pgbouncer else None if in_memory else "queue"
+        pool_class = os.getenv("DB_POOL_CLASS", "").lower() or default_class
+        kwargs: dict = {}
+        if pool_class == "queue":
+                kwargs["poolclass"] = TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool
+                kwargs["pool_size"] = _env_int("DB_POOL_SIZE", 5)
+                kwargs["max_overflow"] = _env_int("DB_MAX_OVERFLOW", 10)
+                kwargs["pool_timeout"] = _env_int("DB_POOL_TIMEOUT", 30)
+                kwargs["pool_recycle"] = _env_int("DB_POOL_RECYCLE", 1800 if is_postgres else -1)
+        elif pool_class == "null":
+                kwargs["poolclass"] = TimedNullPool
+        elif pool_class == "static":
+                kwargs["poolclass"] = TimedStaticPool
+        elif pool_class is not None:
+                raise ValueError(f"Unknown DB_POOL_CLASS: {pool_class}")
+        # A NullPool connection is brand new, so pinging it is a wasted round trip
+        kwargs["pool_pre_ping"] = _env_bool("DB_POOL_PRE_PING", is_postgres and pool_class != "null")
+        if is_async and is_postgres:
+                cache_size = _env_int("DB_STATEMENT_CACHE_SIZE", 0 if behind_pgbouncer else None)
+                if cache_size is not None:
+                        kwargs["connect_args"] = {
+                                "statement_cache_size": cache_size,
+                                "prepared_statement_cache_size": cache_size,
+                        }
+        return kwargs
+
+
+def instrument(engine: Engine, name: str) -> None:
+        """Attach metrics collection to ``engine`` (pass ``.sync_engine`` for async)."""
+        metrics = _metrics.setdefault(name, PoolMetrics())
+        _engines[name] = engine
+        if isinstance(engine.pool, _TimedPoolMixin):
+                engine.pool._metrics = metrics
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+                metrics.record_connect()
+
+
+def snapshot() -> Dict[str, dict]:
+        """Current pool state and cumulative counters per instrumented engine."""
+        result = {}
+        for name, engine in _engines.items():
+                pool = engine.pool
+                metrics = _metrics[name]
+                stats = {
+                        "pool_class": type(pool).__name__,
+                        "checkouts": metrics.checkouts,
+                        "connects": metrics.connects,
+                        "wait_seconds_total": round(metrics.wait_seconds_total, 6),
+                        "wait_seconds_max": round(metrics.wait_seconds_max, 6),
+                }
+                if isinstance(pool, QueuePool):
+                        stats.update(
+                                size=pool.size(),
+                                checked_out=pool.checkedout(),
+                                checked_in=pool.checkedin(),
+                                overflow=max(pool.overflow(), 0),
+                        )
+                result[name] = stats
+        return result
@@ -0,0 +1,254 @@
+"""Sales velocity and reorder points.
+
+``book_demand`` keeps one row per book with its net units sold (sales minus
+returns) under *forward decay*. A line of ``q`` units at time ``t`` adds
+``q * exp((t - EPOCH) / window)``, where ``window`` is
+``REORDER_VELOCITY_DAYS`` (default 28). The decayed rate in units per day at
+``now`` is that sum times ``exp(-(now - EPOCH) / window) / window``, an
+exponentially weighted average of daily sales over roughly the last window.
+Every update is a plain addition, so sales and returns bump the row with an
+``INSERT ... ON CONFLICT DO UPDATE`` in their own transaction, like the daily
+summaries. Out-of-order and concurrent writes are safe, and reads never
+rescan history: one multiplication per book. A return takes its units back
+at the weight of the sale it cancels (its ``sold_at``, not the return date),
+so a book's sum is its unreturned units sold and never drops below zero.
+
+A book's lead time is the ``lead_time_days`` of the vendor it was last
+purchased from, else ``REORDER_LEAD_TIME_DAYS`` (default 14). Purchases
+record no order date, so lead times cannot be measured from them. Then::
+
+    reorder point  = velocity * (lead time + REORDER_SAFETY_DAYS)
+    suggested qty  = velocity * (lead time + safety + REORDER_COVER_DAYS) - stock
+
+The weights grow with time and overflow a float about 700 windows after
+``EPOCH`` (54 years at the default). Changing ``REORDER_VELOCITY_DAYS``
+invalidates the stored sums. Recompute them for the whole catalog from
+``book_sales_daily`` and ``sales.returned_quantity`` from ``backend/``::
+
+    python -m app.reorder rebuild
+"""
+
+import argparse
+import math
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import upsert_insert
+
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+VELOCITY_DAYS = float(os.getenv("REORDER_VELOCITY_DAYS", "28"))
+DEFAULT_LEAD_TIME_DAYS = int(os.getenv("REORDER_LEAD_TIME_DAYS", "14"))
+SAFETY_DAYS = float(os.getenv("REORDER_SAFETY_DAYS", "7"))
+COVER_DAYS = float(os.getenv("REORDER_COVER_DAYS", "30"))
+
+# Days older than this many windows weigh under exp(-10) and are skipped by rebuild
+_HORIZON_WINDOWS = 10
+_CHUNK_ROWS = 1000
+
+
+def _days(moment: Optional[datetime]) -> float:
+        if moment is None:
+                moment = datetime.now(timezone.utc)
+        elif moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+        return (moment - EPOCH).total_seconds() / 86400
+
+
+def _utc_day(moment: datetime) -> date:
+        if moment.tzinfo is not None:
+                moment = moment.astimezone(timezone.utc)
+        return moment.date()
+
+
+def _weight(moment: Optional[datetime]) -> float:
+        return math.exp(_days(moment) / VELOCITY_DAYS)
+
+
+def _bump(db: Session, deltas: Dict[int, float]) -> None:
+        if not deltas:
+                return
+        table = models.BookDemand.__table__
+        stmt = upsert_insert(db, table)
+        stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.book_id],
+                set_={"decayed_units": table.c.decayed_units + stmt.excluded.decayed_units},
+        )
+        # In book order, like the stock updates, so concurrent writers cannot deadlock
+        db.execute(stmt, [{"book_id": book_id, "decayed_units": amount} for book_id, amount in sorted(deltas.items())])
+
+
+def _decayed(lines: Iterable[Tuple[int, int, Optional[datetime]]], sign: int) -> Dict[int, float]:
+        deltas: Dict[int, float] = {}
+        for book_id, quantity, moment in lines:
+                deltas[book_id] = deltas.get(book_id, 0.0) + sign * quantity * _weight(moment)
+        return deltas
+
+
+def record_sales(db: Session, lines: Iterable[Tuple[int, int, Optional[datetime]]]) -> None:
+        """Count sale lines given as ``(book_id, quantity, sold_at)``."""
+        _bump(db, _decayed(lines, 1))
+
+
+def record_returns(db: Session, lines: Iterable[Tuple[int, int, Optional[datetime]]]) -> None:
+        """Take back returned units given as ``(book_id, quantity, sold_at)``.
+
+        ``sold_at`` is the returned sale's, so the units come off at the weight
+        they were added with.
+        """
+        _bump(db, _decayed(lines, -1))
+
+
+def record_purchases(db: Session, lines: Iterable[Tuple[int, int]]) -> None:
+        """Remember the vendor of each ``(book_id, vendor_id)`` purchase line (last one wins)."""
+        vendors = dict(lines)
+        if not vendors:
+                return
+        table = models.BookDemand.__table__
+        stmt = upsert_insert(db, table)
+        stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.book_id], set_={"last_vendor_id": stmt.excluded.last_vendor_id}
+        )
+        db.execute(
+                stmt,
+                [
+                        {"book_id": book_id, "decayed_units": 0.0, "last_vendor_id": vendor_id}
+                        for book_id, vendor_id in sorted(vendors.items())
+                ],
+        )
+
+
+def forget_book(db: Session, book_id: int) -> None:
+        db.execute(delete(models.BookDemand).where(models.BookDemand.book_id == book_id))
+
+
+def _rate_factor(now: datetime) -> float:
+        """Multiplier turning ``decayed_units`` into units per day at ``now``."""
+        return math.exp(-_days(now) / VELOCITY_DAYS) / VELOCITY_DAYS
+
+
+def suggestions(
+        db: Session, limit: int = 50, book_id: Optional[int] = None, include_all: bool = False
+) -> List[dict]:
+        """Books at or below their reorder point, fewest days of stock first.
+
+        ``include_all`` lists every book that is selling, whatever its stock.
+        """
+        velocity = models.BookDemand.decayed_units * _rate_factor(datetime.now(timezone.utc))
+        lead_time = func.coalesce(models.Vendor.lead_time_days, DEFAULT_LEAD_TIME_DAYS)
+        reorder_point = velocity * (lead_time + SAFETY_DAYS)
+        stmt = (
+                select(
+                        models.Book.id.label("book_id"),
+                        models.Book.title,
+                        models.Book.quantity,
+                        velocity.label("velocity"),
+                        lead_time.label("lead_time_days"),
+                        reorder_point.label("reorder_point"),
+                        models.Vendor.id.label("vendor_id"),
+                        models.Vendor.name.label("vendor_name"),
+                )
+                .join(models.BookDemand, models.BookDemand.book_id == models.Book.id)
+                .outerjoin(models.Vendor, models.Vendor.id == models.BookDemand.last_vendor_id)
+                .where(models.BookDemand.decayed_units > 0)
+                .order_by(models.Book.quantity / velocity, models.Book.id)
+                .limit(limit)
+        )
+        if book_id is not None:
+                stmt = stmt.where(models.Book.id == book_id)
+        if not include_all:
+                stmt = stmt.where(models.Book.quantity <= reorder_point)
+        items = []
+        for row in db.execute(stmt):
+                item = row._asdict()
+                target = item["velocity"] * (item["lead_time_days"] + SAFETY_DAYS + COVER_DAYS)
+                item["days_of_cover"] = item["quantity"] / item["velocity"]
+                item["reorder_point"] = math.ceil(item["reorder_point"])
+                item["suggested_quantity"] = max(math.ceil(target - item["quantity"]), 0)
+                items.append(item)
+        return items
+
+
+def rebuild(db: Session, today: Optional[date] = None) -> int:
+        """Recompute ``book_demand`` for every book in one pass (not committed).
+
+        Reads the units sold per day from the recent ``book_sales_daily`` rows
+        and the units returned per sale day from ``sales.returned_quantity``
+        (the daily rows file returns under the day they were processed), each
+        day counted at noon. Also reads the latest purchase per book. Returns
+        the number of books.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        since = today - timedelta(days=int(VELOCITY_DAYS * _HORIZON_WINDOWS))
+        daily = models.BookSalesDaily
+        demand: Dict[int, float] = {}
+        weights: Dict[date, float] = {}
+
+        def add(book_id: int, day: date, units: int) -> None:
+                if day not in weights:
+                        weights[day] = _weight(datetime.combine(day, time(12), timezone.utc))
+                demand[book_id] = demand.get(book_id, 0.0) + units * weights[day]
+
+        rows = db.execute(
+                select(daily.book_id, daily.day, daily.units_sold)
+                .where(daily.day >= since)
+                .execution_options(yield_per=_CHUNK_ROWS)
+        )
+        for book_id, day, units_sold in rows:
+                add(book_id, day, units_sold)
+        returned = db.execute(
+                select(models.Sale.book_id, models.Sale.sold_at, models.Sale.returned_quantity)
+                .where(
+                        models.Sale.sold_at >= datetime.combine(since, time(0), timezone.utc),
+                        models.Sale.returned_quantity > 0,
+                )
+                .execution_options(yield_per=_CHUNK_ROWS)
+        )
+        for book_id, sold_at, quantity in returned:
+                add(book_id, _utc_day(sold_at), -quantity)
+
+        latest = (
+                select(
+                        models.Purchase.book_id,
+                        models.Purchase.vendor_id,
+                        func.row_number()
+                        .over(
+                                partition_by=models.Purchase.book_id,
+                                order_by=(models.Purchase.purchased_at.desc(), models.Purchase.id.desc()),
+                        )
+                        .label("rank"),
+                )
+        ).subquery()
+        vendors = dict(db.execute(select(latest.c.book_id, latest.c.vendor_id).where(latest.c.rank == 1)).all())
+
+        db.execute(delete(models.BookDemand))
+        rows = [
+                {"book_id": book_id, "decayed_units": demand.get(book_id, 0.0), "last_vendor_id": vendors.get(book_id)}
+                for book_id in sorted(demand.keys() | vendors.keys())
+        ]
+        for start in range(0, len(rows), _CHUNK_ROWS):
+                db.execute(insert(models.BookDemand), rows[start : start + _CHUNK_ROWS])
+        return len(rows)
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description="Maintain the sales velocity behind /reorder-suggestions")
+        parser.add_argument("command", choices=["rebuild"])
+        parser.parse_args()
+
+        from . import migrations
+        from .database import SessionLocal, engine
+
+        migrations.upgrade(engine)
+        with SessionLocal() as db:
+                books = rebuild(db)
+                db.commit()
+        print(f"Sales velocity rebuilt for {books} books")
+
+
+if __name__ == "__main__":
+        main()
@@ -0,0 +1,158 @@
+"""Read-side aggregates behind the ``/reports`` endpoints.
+
+Sales, returns and purchase figures come from the daily summary tables kept
+by :mod:`app.summaries`, so each query touches one row per day and entity in
+the requested range. Stock valuation is a single aggregate over ``books``,
+which already holds the current state.
+"""
+
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import Date, cast, func, literal_column, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .models import CustomerCategory
+
+
+PERIODS = ("day", "week", "month")
+
+
+def _bucket(db: Session, day_column, period: str):
+        """Truncate ``day_column`` to the first day of its week (Monday) or month."""
+        if period == "day":
+                return day_column
+        if db.get_bind().dialect.name == "postgresql":
+                return cast(func.date_trunc(period, day_column), Date)
+        if period == "week":
+                # 'weekday 0' moves forward to Sunday; six days back is that week's Monday
+                return func.date(day_column, "weekday 0", "-6 days", type_=Date)
+        return func.date(day_column, "start of month", type_=Date)
+
+
+def _in_range(day_column, start: Optional[date], end: Optional[date]) -> list:
+        conditions = []
+        if start:
+                conditions.append(day_column >= start)
+        if end:
+                conditions.append(day_column <= end)
+        return conditions
+
+
+def revenue(db: Session, period: str = "day", start: Optional[date] = None, end: Optional[date] = None) -> List[dict]:
+        if period not in PERIODS:
+                raise ValueError(f"Unknown period: {period}")
+        s = models.BookSalesDaily
+        bucket = _bucket(db, s.day, period).label("period")
+        stmt = (
+                select(
+                        bucket,
+                        func.sum(s.units_sold).label("units_sold"),
+                        func.sum(s.units_returned).label("units_returned"),
+                        func.sum(s.revenue).label("revenue"),
+                        func.sum(s.refunds).label("refunds"),
+                )
+                .where(*_in_range(s.day, start, end))
+                .group_by(literal_column("period"))
+                .order_by(literal_column("period"))
+        )
+        return [
+                {**row._asdict(), "net_revenue": row.revenue - row.refunds}
+                for row in db.execute(stmt)
+        ]
+
+
+def book_net_units(
+        db: Session, start: Optional[date] = None, end: Optional[date] = None, limit: int = 20
+) -> List[dict]:
+        s = models.BookSalesDaily
+        net_units = (func.sum(s.units_sold) - func.sum(s.units_returned)).label("net_units")
+        totals = (
+                select(
+                        s.book_id,
+                        func.sum(s.units_sold).label("units_sold"),
+                        func.sum(s.units_returned).label("units_returned"),
+                        net_units,
+                        (func.sum(s.revenue) - func.sum(s.refunds)).label("net_revenue"),
+                )
+                .where(*_in_range(s.day, start, end))
+                .group_by(s.book_id)
+                .order_by(net_units.desc(), s.book_id)
+                .limit(limit)
+                .subquery()
+        )
+        stmt = (
+                select(totals, models.Book.title, models.Book.author)
+                .join(models.Book, models.Book.id == totals.c.book_id)
+                .order_by(totals.c.net_units.desc(), totals.c.book_id)
+        )
+        return [row._asdict() for row in db.execute(stmt)]
+
+
+def stock_valuation(db: Session, limit: int = 10) -> dict:
+        value = models.Book.quantity * models.Book.price
+        summary = db.execute(
+                select(
+                        func.count().label("titles"),
+                        func.coalesce(func.sum(models.Book.quantity), 0).label("units"),
+                        func.coalesce(func.sum(value), 0).label("value"),
+                )
+        ).one()
+        top = db.execute(
+                select(
+                        models.Book.id.label("book_id"),
+                        models.Book.title,
+                        models.Book.quantity,
+                        models.Book.price,
+                        value.label("value"),
+                )
+                .order_by(value.desc(), models.Book.id)
+                .limit(limit)
+        )
+        return {**summary._asdict(), "top_books": [row._asdict() for row in top]}
+
+
+def top_customers(
+        db: Session,
+        category: Optional[CustomerCategory] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        limit: int = 10,
+) -> List[dict]:
+        s = models.CustomerSalesDaily
+        net_revenue = (func.sum(s.revenue) - func.sum(s.refunds)).label("net_revenue")
+        stmt = (
+                select(
+                        s.customer_id,
+                        models.Customer.name,
+                        models.Customer.category,
+                        (func.sum(s.units_sold) - func.sum(s.units_returned)).label("net_units"),
+                        net_revenue,
+                )
+                .join(models.Customer, models.Customer.id == s.customer_id)
+                .where(*_in_range(s.day, start, end))
+                .group_by(s.customer_id, models.Customer.name, models.Customer.category)
+                .order_by(net_revenue.desc(), s.customer_id)
+                .limit(limit)
+        )
+        if category:
+                # Accept the API enum too; the column stores the model enum
+                stmt = stmt.where(models.Customer.category == CustomerCategory(category.value))
+        return [{**row._asdict(), "category": row.category.value} for row in db.execute(stmt)]
+
+
+def vendor_spend(
+        db: Session, start: Optional[date] = None, end: Optional[date] = None, limit: int = 10
+) -> List[dict]:
+        p = models.VendorPurchasesDaily
+        spend = func.sum(p.spend).label("spend")
+        stmt = (
+                select(p.vendor_id, models.Vendor.name, func.sum(p.units).label("units"), spend)
+                .join(models.Vendor, models.Vendor.id == p.vendor_id)
+                .where(*_in_range(p.day, start, end))
+                .group_by(p.vendor_id, models.Vendor.name)
+                .order_by(spend.desc(), p.vendor_id)
+                .limit(limit)
+        )
+        return [row._asdict() for row in db.execute(stmt)]
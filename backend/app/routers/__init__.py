@@ -1,4 +1,4 @@
-from . import books, vendors, customers, purchases, sales, sales_returns
+from . import books, vendors, customers, purchases, sales, sales_returns, reports, export
 
 __all__ = [
         "books",
@@ -7,4 +7,6 @@ __all__ = [
         "purchases",
         "sales",
         "sales_returns",
+        "reports",
+        "export",
 ]
@@ -1,60 +1,131 @@
+from datetime import datetime, timezone
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 
-from ..database import get_db
-from .. import crud, schemas, models
+from ..database import DbSession, get_db, run_db
+from .. import async_crud, conditional, filtering, imports, schemas, models, serialization, stock
 
 
 router = APIRouter(prefix="/books", tags=["books"])
+http_cache = conditional.Policy("books")
+SORT_HELP = filtering.sort_help("books")
 
 
 @router.get("/", response_model=schemas.PaginatedBooks)
-def list_books(
+async def list_books(
+	request: Request,
+	response: Response,
 	skip: int = Query(0, ge=0),
 	limit: int = Query(20, ge=1, le=100),
 	q: Optional[str] = Query(None, description="Search by title, author, or ISBN"),
-	db: Session = Depends(get_db),
+	cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+	sort: Optional[str] = Query(None, description=SORT_HELP),
+	total_mode: schemas.TotalMode = Query(
+		schemas.TotalMode.EXACT, description="How to compute total: exact, estimate, or none"
+	),
+	db: DbSession = Depends(get_db),
 ):
-	items, total = crud.list_books(db, skip=skip, limit=limit, q=q)
-	return schemas.PaginatedBooks(items=items, total=total, skip=skip, limit=limit)
+	try:
+		query = filtering.parse("books", request.query_params, sort)
+	except ValueError as exc:
+		raise HTTPException(status_code=400, detail=str(exc)) from exc
+	try:
+		page = await async_crud.list_books(
+			db,
+			skip=skip,
+			limit=limit,
+			q=q,
+			cursor=cursor,
+			total_mode=total_mode,
+			as_rows=serialization.fast(),
+			filters=query.filters,
+			sort=query.sort,
+		)
+	except ValueError as exc:
+		raise HTTPException(status_code=400, detail=str(exc)) from exc
+	result = serialization.respond(
+		schemas.PaginatedBooks(
+			items=page.items,
+			total=page.total,
+			skip=skip,
+			limit=limit,
+			next_cursor=page.next_cursor,
+			has_more=page.has_more,
+		)
+	)
+	return http_cache.send_page(request, result, response)
 
 
 @router.post("/", response_model=schemas.Book, status_code=201)
-def create_book(payload: schemas.BookCreate, db: Session = Depends(get_db)):
+async def create_book(payload: schemas.BookCreate, db: DbSession = Depends(get_db)):
 	if payload.isbn:
-		existing = crud.get_book_by_isbn(db, payload.isbn)
+		existing = await async_crud.get_book_by_isbn(db, payload.isbn)
 		if existing:
 			raise HTTPException(status_code=400, detail="ISBN already exists")
-	return crud.create_book(db, payload)
+	return await async_crud.create_book(db, payload)
+
+
+@router.post("/import", response_model=schemas.BookImportResult)
+async def import_books(
+	file: UploadFile = File(..., description="CSV with a header row, or NDJSON with one book per line"),
+	format: Optional[schemas.FileFormat] = Query(None, description="csv or ndjson; guessed from the file if omitted"),
+	db: DbSession = Depends(get_db),
+):
+	fmt = format.value if format else imports.detect_format(file.filename, file.content_type)
+	return await async_crud.import_books(db, imports.rows(file.file, fmt))
+
+
+@router.get("/stock", response_model=schemas.StockSnapshot)
+async def stock_snapshot(
+	as_of: Optional[datetime] = Query(None, description="Moment to report stock at (default: now)"),
+	db: DbSession = Depends(get_db),
+):
+	return (await run_db(db, stock.snapshot, as_of))._asdict()
 
 
 @router.get("/{book_id}", response_model=schemas.Book)
-def get_book(book_id: int, db: Session = Depends(get_db)):
-	book = crud.get_book(db, book_id)
+async def get_book(book_id: int, request: Request, response: Response, db: DbSession = Depends(get_db)):
+	book = await async_crud.get_book(db, book_id, cached=True)
+	if not book:
+		raise HTTPException(status_code=404, detail="Book not found")
+	validators = conditional.object_validators(book)
+	not_modified = http_cache.not_modified(request, validators)
+	if not_modified is not None:
+		return not_modified
+	return http_cache.send(book, response, validators)
+
+
+@router.get("/{book_id}/stock", response_model=schemas.BookStock)
+async def get_book_stock(
+	book_id: int,
+	as_of: Optional[datetime] = Query(None, description="Moment to report stock at (default: now)"),
+	db: DbSession = Depends(get_db),
+):
+	book = await async_crud.get_book(db, book_id, cached=True)
 	if not book:
 		raise HTTPException(status_code=404, detail="Book not found")
-	return book
+	as_of = as_of or datetime.now(timezone.utc)
+	return {"book_id": book_id, "quantity": await run_db(db, stock.level, book_id, as_of), "as_of": as_of}
 
 
 @router.put("/{book_id}", response_model=schemas.Book)
-def update_book(book_id: int, payload: schemas.BookUpdate, db: Session = Depends(get_db)):
-	book = crud.get_book(db, book_id)
+async def update_book(book_id: int, payload: schemas.BookUpdate, db: DbSession = Depends(get_db)):
+	book = await async_crud.get_book(db, book_id)
 	if not book:
 		raise HTTPException(status_code=404, detail="Book not found")
 	if payload.isbn:
-		existing = crud.get_book_by_isbn(db, payload.isbn)
+		existing = await async_crud.get_book_by_isbn(db, payload.isbn)
 		if existing and existing.id != book_id:
 			raise HTTPException(status_code=400, detail="ISBN already exists")
-	return crud.update_book(db, book, payload)
+	return await async_crud.update_book(db, book, payload)
 
 
 @router.delete("/{book_id}", status_code=204)
-def delete_book(book_id: int, db: Session = Depends(get_db)):
-	book = crud.get_book(db, book_id)
+async def delete_book(book_id: int, db: DbSession = Depends(get_db)):
+	book = await async_crud.get_book(db, book_id)
 	if not book:
 		raise HTTPException(status_code=404, detail="Book not found")
-	crud.delete_book(db, book)
+	await async_crud.delete_book(db, book)
 	return None
 
 
@@ -1,61 +1,101 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from ..database import get_db
-from .. import crud, schemas
+from ..database import DbSession, get_db
+from .. import async_crud, conditional, filtering, schemas, serialization
 
 router = APIRouter(prefix="/customers", tags=["customers"])
+http_cache = conditional.Policy("customers")
+SORT_HELP = filtering.sort_help("customers")
 
 
 @router.get("/", response_model=schemas.PaginatedCustomers)
-def list_customers(
+async def list_customers(
+        request: Request,
+        response: Response,
         skip: int = Query(0, ge=0),
         limit: int = Query(20, ge=1, le=100),
         q: Optional[str] = Query(None, description="Search by customer name"),
         category: Optional[schemas.CustomerCategory] = Query(None, description="Filter by customer category"),
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+        sort: Optional[str] = Query(None, description=SORT_HELP),
+        total_mode: schemas.TotalMode = Query(
+                schemas.TotalMode.EXACT, description="How to compute total: exact, estimate, or none"
+        ),
+        db: DbSession = Depends(get_db),
 ):
-        items, total = crud.list_customers(db, skip=skip, limit=limit, q=q, category=category)
-        return schemas.PaginatedCustomers(items=items, total=total, skip=skip, limit=limit)
+        try:
+                query = filtering.parse("customers", request.query_params, sort)
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+                page = await async_crud.list_customers(
+                        db,
+                        skip=skip,
+                        limit=limit,
+                        q=q,
+                        category=category,
+                        cursor=cursor,
+                        total_mode=total_mode,
+                        as_rows=serialization.fast(),
+                        filters=query.filters,
+                        sort=query.sort,
+                )
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        result = serialization.respond(
+                schemas.PaginatedCustomers(
+                        items=page.items,
+                        total=page.total,
+                        skip=skip,
+                        limit=limit,
+                        next_cursor=page.next_cursor,
+                        has_more=page.has_more,
+                )
+        )
+        return http_cache.send_page(request, result, response)
 
 
 @router.post("/", response_model=schemas.Customer, status_code=201)
-def create_customer(payload: schemas.CustomerCreate, db: Session = Depends(get_db)):
-        existing = crud.get_customer_by_name(db, payload.name)
+async def create_customer(payload: schemas.CustomerCreate, db: DbSession = Depends(get_db)):
+        existing = await async_crud.get_customer_by_name(db, payload.name)
         if existing:
                 raise HTTPException(status_code=400, detail="Customer name already exists")
-        return crud.create_customer(db, payload)
+        return await async_crud.create_customer(db, payload)
 
 
 @router.get("/{customer_id}", response_model=schemas.Customer)
-def get_customer(customer_id: int, db: Session = Depends(get_db)):
-        customer = crud.get_customer(db, customer_id)
+async def get_customer(customer_id: int, request: Request, response: Response, db: DbSession = Depends(get_db)):
+        customer = await async_crud.get_customer(db, customer_id, cached=True)
         if not customer:
                 raise HTTPException(status_code=404, detail="Customer not found")
-        return customer
+        validators = conditional.object_validators(customer)
+        not_modified = http_cache.not_modified(request, validators)
+        if not_modified is not None:
+                return not_modified
+        return http_cache.send(customer, response, validators)
 
 
 @router.put("/{customer_id}", response_model=schemas.Customer)
-def update_customer(customer_id: int, payload: schemas.CustomerUpdate, db: Session = Depends(get_db)):
-        customer = crud.get_customer(db, customer_id)
+async def update_customer(customer_id: int, payload: schemas.CustomerUpdate, db: DbSession = Depends(get_db)):
+        customer = await async_crud.get_customer(db, customer_id)
         if not customer:
                 raise HTTPException(status_code=404, detail="Customer not found")
         if payload.name:
-                existing = crud.get_customer_by_name(db, payload.name)
+                existing = await async_crud.get_customer_by_name(db, payload.name)
                 if existing and existing.id != customer_id:
                         raise HTTPException(status_code=400, detail="Customer name already exists")
-        return crud.update_customer(db, customer, payload)
+        return await async_crud.update_customer(db, customer, payload)
 
 
 @router.delete("/{customer_id}", status_code=204)
-def delete_customer(customer_id: int, db: Session = Depends(get_db)):
-        customer = crud.get_customer(db, customer_id)
+async def delete_customer(customer_id: int, db: DbSession = Depends(get_db)):
+        customer = await async_crud.get_customer(db, customer_id)
         if not customer:
                 raise HTTPException(status_code=404, detail="Customer not found")
         try:
-                crud.delete_customer(db, customer)
+                await async_crud.delete_customer(db, customer)
         except ValueError as exc:
                 raise HTTPException(status_code=400, detail=str(exc)) from exc
         return None
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import time
+from typing import Optional, Set
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from .. import events
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# Comment line sent when idle so proxies keep the stream open
+HEARTBEAT_SECONDS = 15.0
+# Streams end after this long and EventSource reconnects (after ``retry``),
+# which spreads clients over workers and lets a shutdown drain them
+MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
+ENTITIES = {"books", "vendors", "customers", "purchases", "sales", "sales_returns", "sales_orders", "purchase_orders"}
+
+
+def _entities(raw: Optional[str]) -> Optional[Set[str]]:
+        """The requested entity set (None for all); raises ValueError on an unknown name."""
+        if not raw:
+                return None
+        names = {name.strip() for name in raw.split(",") if name.strip()}
+        unknown = names - ENTITIES
+        if unknown:
+                raise ValueError(f"Unknown entities: {', '.join(sorted(unknown))}; expected {', '.join(sorted(ENTITIES))}")
+        return names
+
+
+async def _stream(subscription: events.Subscription):
+        deadline = time.monotonic() + MAX_STREAM_SECONDS
+        try:
+                yield "retry: 2000\n\n"
+                while time.monotonic() < deadline:
+                        try:
+                                change = await subscription.get(min(HEARTBEAT_SECONDS, max(deadline - time.monotonic(), 0.01)))
+                        except asyncio.TimeoutError:
+                                yield ": ping\n\n"
+                                continue
+                        if change is None:
+                                yield "event: reset\ndata: {}\n\n"
+                                return
+                        yield f"event: change\ndata: {json.dumps(change, separators=(',', ':'))}\n\n"
+        finally:
+                events.broadcaster.unsubscribe(subscription)
+
+
+@router.get("")
+async def stream_events(
+        entities: Optional[str] = Query(None, description="Comma-separated entities to receive, e.g. books,sales"),
+):
+        try:
+                subscription = events.broadcaster.subscribe(_entities(entities))
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return StreamingResponse(
+                _stream(subscription),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, entities: Optional[str] = None):
+        await websocket.accept()
+        try:
+                subscription = events.broadcaster.subscribe(_entities(entities))
+        except ValueError as exc:
+                # Accepted first so the client sees the code and reason, not a failed handshake
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc)[:120])
+                return
+        receiver = asyncio.ensure_future(websocket.receive())
+        try:
+                while True:
+                        getter = asyncio.ensure_future(subscription.get(HEARTBEAT_SECONDS))
+                        done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                        if receiver in done:
+                                # Clients only listen; anything they send (or a close) ends the feed
+                                getter.cancel()
+                                break
+                        try:
+                                change = getter.result()
+                        except asyncio.TimeoutError:
+                                continue
+                        if change is None:
+                                await websocket.send_json({"event": "reset"})
+                                break
+                        await websocket.send_json({"event": "change", **change})
+        except WebSocketDisconnect:
+                pass
+        finally:
+                receiver.cancel()
+                events.broadcaster.unsubscribe(subscription)
+        await _close(websocket)
+
+
+async def _close(websocket: WebSocket) -> None:
+        try:
+                await websocket.close()
+        except RuntimeError:
+                # Already closed by the client
+                pass
@@ -0,0 +1,50 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from .. import export, filtering, schemas
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+
+def _response(entity: str, fmt: schemas.FileFormat, request: Request, **filters) -> StreamingResponse:
+        # Parsed before streaming starts, so a bad filter is still a plain 400
+        try:
+                where = filtering.parse(entity, request.query_params).filters
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return StreamingResponse(
+                export.stream(entity, fmt.value, where=where, **filters),
+                media_type=export.MEDIA_TYPES[fmt.value],
+                headers={"Content-Disposition": f'attachment; filename="{entity}.{fmt.value}"'},
+        )
+
+
+@router.get("/books", description=filtering.filter_help("books"))
+def export_books(
+        request: Request,
+        format: schemas.FileFormat = Query(schemas.FileFormat.CSV, description="csv or ndjson"),
+        q: Optional[str] = Query(None, description="Search by title, author, or ISBN"),
+):
+        return _response("books", format, request, q=q)
+
+
+@router.get("/sales", description=filtering.filter_help("sales"))
+def export_sales(
+        request: Request,
+        format: schemas.FileFormat = Query(schemas.FileFormat.CSV, description="csv or ndjson"),
+        customer_id: Optional[int] = Query(None, description="Filter by customer ID"),
+        book_id: Optional[int] = Query(None, description="Filter by book ID"),
+):
+        return _response("sales", format, request, customer_id=customer_id, book_id=book_id)
+
+
+@router.get("/purchases", description=filtering.filter_help("purchases"))
+def export_purchases(
+        request: Request,
+        format: schemas.FileFormat = Query(schemas.FileFormat.CSV, description="csv or ndjson"),
+        vendor_id: Optional[int] = Query(None, description="Filter by vendor ID"),
+        book_id: Optional[int] = Query(None, description="Filter by book ID"),
+):
+        return _response("purchases", format, request, vendor_id=vendor_id, book_id=book_id)
@@ -0,0 +1,79 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from ..database import DbSession, get_db
+from .. import async_crud, conditional, crud, filtering, schemas, serialization
+
+router = APIRouter(prefix="/purchase-orders", tags=["purchase_orders"])
+http_cache = conditional.Policy("purchase_orders")
+SORT_HELP = filtering.sort_help("purchase_orders")
+
+
+@router.get("/", response_model=schemas.PaginatedPurchaseOrders)
+async def list_purchase_orders(
+        request: Request,
+        response: Response,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(20, ge=1, le=100),
+        vendor_id: Optional[int] = Query(None, description="Filter by vendor ID"),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+        sort: Optional[str] = Query(None, description=SORT_HELP),
+        total_mode: schemas.TotalMode = Query(
+                schemas.TotalMode.EXACT, description="How to compute total: exact, estimate, or none"
+        ),
+        db: DbSession = Depends(get_db),
+):
+        try:
+                query = filtering.parse("purchase_orders", request.query_params, sort)
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+                page = await async_crud.list_purchase_orders(
+                        db,
+                        skip=skip,
+                        limit=limit,
+                        vendor_id=vendor_id,
+                        cursor=cursor,
+                        total_mode=total_mode,
+                        as_rows=serialization.fast(),
+                        filters=query.filters,
+                        sort=query.sort,
+                )
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        result = serialization.respond(
+                schemas.PaginatedPurchaseOrders(
+                        items=page.items,
+                        total=page.total,
+                        skip=skip,
+                        limit=limit,
+                        next_cursor=page.next_cursor,
+                        has_more=page.has_more,
+                )
+        )
+        return http_cache.send_page(request, result, response)
+
+
+@router.post("/", response_model=schemas.PurchaseOrder, status_code=201)
+async def create_purchase_order(payload: schemas.PurchaseOrderCreate, db: DbSession = Depends(get_db)):
+        vendor = await async_crud.get_vendor(db, payload.vendor_id)
+        if not vendor:
+                raise HTTPException(status_code=404, detail="Vendor not found")
+        try:
+                order_id = await async_crud.create_purchase_order(db, vendor=vendor, order_in=payload)
+        except crud.BulkWriteError as exc:
+                raise HTTPException(status_code=400, detail=exc.errors) from exc
+        return await async_crud.get_purchase_order(db, order_id)
+
+
+@router.get("/{order_id}", response_model=schemas.PurchaseOrder)
+async def get_purchase_order(order_id: int, request: Request, response: Response, db: DbSession = Depends(get_db)):
+        order = await async_crud.get_purchase_order(db, order_id)
+        if not order:
+                raise HTTPException(status_code=404, detail="Purchase order not found")
+        validators = conditional.object_validators(order)
+        not_modified = http_cache.not_modified(request, validators)
+        if not_modified is not None:
+                return not_modified
+        return http_cache.send(schemas.PurchaseOrder.model_validate(order), response, validators)
@@ -1,40 +1,101 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from ..database import get_db
-from .. import crud, schemas
+from ..database import DbSession, get_db
+from .. import async_crud, conditional, filtering, crud, schemas, serialization
 
 router = APIRouter(prefix="/purchases", tags=["purchases"])
+http_cache = conditional.Policy("purchases")
+SORT_HELP = filtering.sort_help("purchases")
 
 
-@router.get("/", response_model=schemas.PaginatedPurchases)
-def list_purchases(
+@router.get("/", response_model=schemas.PaginatedPurchasesView)
+async def list_purchases(
+        request: Request,
+        response: Response,
         skip: int = Query(0, ge=0),
         limit: int = Query(20, ge=1, le=100),
         vendor_id: Optional[int] = Query(None, description="Filter by vendor ID"),
         book_id: Optional[int] = Query(None, description="Filter by book ID"),
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+        sort: Optional[str] = Query(None, description=SORT_HELP),
+        total_mode: schemas.TotalMode = Query(
+                schemas.TotalMode.EXACT, description="How to compute total: exact, estimate, or none"
+        ),
+        expand: schemas.Expand = Query(
+                schemas.Expand.FULL, description="Related records: ids, compact (names only) or full objects"
+        ),
+        db: DbSession = Depends(get_db),
 ):
-        items, total = crud.list_purchases(db, skip=skip, limit=limit, vendor_id=vendor_id, book_id=book_id)
-        return schemas.PaginatedPurchases(items=items, total=total, skip=skip, limit=limit)
+        try:
+                query = filtering.parse("purchases", request.query_params, sort)
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+                page = await async_crud.list_purchases(
+                        db,
+                        skip=skip,
+                        limit=limit,
+                        vendor_id=vendor_id,
+                        book_id=book_id,
+                        cursor=cursor,
+                        total_mode=total_mode,
+                        expand=expand,
+                        as_rows=serialization.fast(),
+                        filters=query.filters,
+                        sort=query.sort,
+                )
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        result = serialization.respond(
+                schemas.PURCHASE_PAGES[expand](
+                        items=page.items,
+                        total=page.total,
+                        skip=skip,
+                        limit=limit,
+                        next_cursor=page.next_cursor,
+                        has_more=page.has_more,
+                )
+        )
+        return http_cache.send_page(request, result, response)
 
 
 @router.post("/", response_model=schemas.Purchase, status_code=201)
-def create_purchase(payload: schemas.PurchaseCreate, db: Session = Depends(get_db)):
-        vendor = crud.get_vendor(db, payload.vendor_id)
+async def create_purchase(payload: schemas.PurchaseCreate, db: DbSession = Depends(get_db)):
+        vendor = await async_crud.get_vendor(db, payload.vendor_id)
         if not vendor:
                 raise HTTPException(status_code=404, detail="Vendor not found")
-        book = crud.get_book(db, payload.book_id)
+        book = await async_crud.get_book(db, payload.book_id)
         if not book:
                 raise HTTPException(status_code=404, detail="Book not found")
-        return crud.create_purchase(db, vendor=vendor, book=book, purchase_in=payload)
+        return await async_crud.create_purchase(db, vendor=vendor, book=book, purchase_in=payload)
 
 
-@router.get("/{purchase_id}", response_model=schemas.Purchase)
-def get_purchase(purchase_id: int, db: Session = Depends(get_db)):
-        purchase = crud.get_purchase(db, purchase_id)
+@router.post("/bulk", response_model=schemas.BulkCreateResult, status_code=201)
+async def create_purchases_bulk(payload: schemas.PurchaseBulkCreate, db: DbSession = Depends(get_db)):
+        try:
+                ids = await async_crud.create_purchases_bulk(db, payload.items)
+        except crud.BulkWriteError as exc:
+                raise HTTPException(status_code=400, detail=exc.errors) from exc
+        return schemas.BulkCreateResult(created=len(ids), ids=ids)
+
+
+@router.get("/{purchase_id}", response_model=schemas.PurchaseView)
+async def get_purchase(
+        purchase_id: int,
+        request: Request,
+        response: Response,
+        expand: schemas.Expand = Query(
+                schemas.Expand.FULL, description="Related records: ids, compact (names only) or full objects"
+        ),
+        db: DbSession = Depends(get_db),
+):
+        purchase = await async_crud.get_purchase(db, purchase_id, expand=expand)
         if not purchase:
                 raise HTTPException(status_code=404, detail="Purchase not found")
-        return purchase
+        validators = conditional.object_validators(purchase, expand)
+        not_modified = http_cache.not_modified(request, validators)
+        if not_modified is not None:
+                return not_modified
+        return http_cache.send(schemas.PURCHASE_VIEWS[expand].model_validate(purchase), response, validators)
@@ -0,0 +1,18 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from ..database import DbSession, get_db, run_db
+from .. import reorder, schemas
+
+router = APIRouter(prefix="/reorder-suggestions", tags=["reorder"])
+
+
+@router.get("", response_model=List[schemas.ReorderSuggestion])
+async def reorder_suggestions(
+        book_id: Optional[int] = Query(None, description="Only this book"),
+        include_all: bool = Query(False, description="List every selling book, not just those at their reorder point"),
+        limit: int = Query(50, ge=1, le=500),
+        db: DbSession = Depends(get_db),
+):
+        return await run_db(db, reorder.suggestions, limit=limit, book_id=book_id, include_all=include_all)
@@ -0,0 +1,61 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ..database import DbSession, get_db, run_db
+from .. import reports, schemas
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+@router.get("/revenue", response_model=List[schemas.RevenuePoint])
+async def revenue(
+        period: str = Query("day", description="Bucket size: day, week or month"),
+        start: Optional[date] = Query(None, description="First day to include"),
+        end: Optional[date] = Query(None, description="Last day to include"),
+        db: DbSession = Depends(get_db),
+):
+        try:
+                return await run_db(db, reports.revenue, period=period, start=start, end=end)
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.get("/books/net-units", response_model=List[schemas.BookNetUnits])
+async def book_net_units(
+        start: Optional[date] = Query(None, description="First day to include"),
+        end: Optional[date] = Query(None, description="Last day to include"),
+        limit: int = Query(20, ge=1, le=100),
+        db: DbSession = Depends(get_db),
+):
+        return await run_db(db, reports.book_net_units, start=start, end=end, limit=limit)
+
+
+@router.get("/stock-valuation", response_model=schemas.StockValuation)
+async def stock_valuation(
+        limit: int = Query(10, ge=1, le=100, description="Number of most valuable books to list"),
+        db: DbSession = Depends(get_db),
+):
+        return await run_db(db, reports.stock_valuation, limit=limit)
+
+
+@router.get("/top-customers", response_model=List[schemas.CustomerRanking])
+async def top_customers(
+        category: Optional[schemas.CustomerCategory] = Query(None, description="Filter by customer category"),
+        start: Optional[date] = Query(None, description="First day to include"),
+        end: Optional[date] = Query(None, description="Last day to include"),
+        limit: int = Query(10, ge=1, le=100),
+        db: DbSession = Depends(get_db),
+):
+        return await run_db(db, reports.top_customers, category=category, start=start, end=end, limit=limit)
+
+
+@router.get("/vendor-spend", response_model=List[schemas.VendorSpend])
+async def vendor_spend(
+        start: Optional[date] = Query(None, description="First day to include"),
+        end: Optional[date] = Query(None, description="Last day to include"),
+        limit: int = Query(10, ge=1, le=100),
+        db: DbSession = Depends(get_db),
+):
+        return await run_db(db, reports.vendor_spend, start=start, end=end, limit=limit)
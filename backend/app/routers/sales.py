@@ -1,43 +1,104 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from ..database import get_db
-from .. import crud, schemas
+from ..database import DbSession, get_db
+from .. import async_crud, conditional, filtering, crud, schemas, serialization
 
 router = APIRouter(prefix="/sales", tags=["sales"])
+http_cache = conditional.Policy("sales")
+SORT_HELP = filtering.sort_help("sales")
 
 
-@router.get("/", response_model=schemas.PaginatedSales)
-def list_sales(
+@router.get("/", response_model=schemas.PaginatedSalesView)
+async def list_sales(
+        request: Request,
+        response: Response,
         skip: int = Query(0, ge=0),
         limit: int = Query(20, ge=1, le=100),
         customer_id: Optional[int] = Query(None, description="Filter by customer ID"),
         book_id: Optional[int] = Query(None, description="Filter by book ID"),
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+        sort: Optional[str] = Query(None, description=SORT_HELP),
+        total_mode: schemas.TotalMode = Query(
+                schemas.TotalMode.EXACT, description="How to compute total: exact, estimate, or none"
+        ),
+        expand: schemas.Expand = Query(
+                schemas.Expand.FULL, description="Related records: ids, compact (names only) or full objects"
+        ),
+        db: DbSession = Depends(get_db),
 ):
-        items, total = crud.list_sales(db, skip=skip, limit=limit, customer_id=customer_id, book_id=book_id)
-        return schemas.PaginatedSales(items=items, total=total, skip=skip, limit=limit)
+        try:
+                query = filtering.parse("sales", request.query_params, sort)
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+                page = await async_crud.list_sales(
+                        db,
+                        skip=skip,
+                        limit=limit,
+                        customer_id=customer_id,
+                        book_id=book_id,
+                        cursor=cursor,
+                        total_mode=total_mode,
+                        expand=expand,
+                        as_rows=serialization.fast(),
+                        filters=query.filters,
+                        sort=query.sort,
+                )
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        result = serialization.respond(
+                schemas.SALE_PAGES[expand](
+                        items=page.items,
+                        total=page.total,
+                        skip=skip,
+                        limit=limit,
+                        next_cursor=page.next_cursor,
+                        has_more=page.has_more,
+                )
+        )
+        return http_cache.send_page(request, result, response)
 
 
 @router.post("/", response_model=schemas.Sale, status_code=201)
-def create_sale(payload: schemas.SaleCreate, db: Session = Depends(get_db)):
-        customer = crud.get_customer(db, payload.customer_id)
+async def create_sale(payload: schemas.SaleCreate, db: DbSession = Depends(get_db)):
+        customer = await async_crud.get_customer(db, payload.customer_id)
         if not customer:
                 raise HTTPException(status_code=404, detail="Customer not found")
-        book = crud.get_book(db, payload.book_id)
+        book = await async_crud.get_book(db, payload.book_id)
         if not book:
                 raise HTTPException(status_code=404, detail="Book not found")
         try:
-                return crud.create_sale(db, customer=customer, book=book, sale_in=payload)
+                return await async_crud.create_sale(db, customer=customer, book=book, sale_in=payload)
         except ValueError as exc:
                 raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
-@router.get("/{sale_id}", response_model=schemas.Sale)
-def get_sale(sale_id: int, db: Session = Depends(get_db)):
-        sale = crud.get_sale(db, sale_id)
+@router.post("/bulk", response_model=schemas.BulkCreateResult, status_code=201)
+async def create_sales_bulk(payload: schemas.SaleBulkCreate, db: DbSession = Depends(get_db)):
+        try:
+                ids = await async_crud.create_sales_bulk(db, payload.items)
+        except crud.BulkWriteError as exc:
+                raise HTTPException(status_code=400, detail=exc.errors) from exc
+        return schemas.BulkCreateResult(created=len(ids), ids=ids)
+
+
+@router.get("/{sale_id}", response_model=schemas.SaleView)
+async def get_sale(
+        sale_id: int,
+        request: Request,
+        response: Response,
+        expand: schemas.Expand = Query(
+                schemas.Expand.FULL, description="Related records: ids, compact (names only) or full objects"
+        ),
+        db: DbSession = Depends(get_db),
+):
+        sale = await async_crud.get_sale(db, sale_id, expand=expand)
         if not sale:
                 raise HTTPException(status_code=404, detail="Sale not found")
-        return sale
+        validators = conditional.object_validators(sale, expand)
+        not_modified = http_cache.not_modified(request, validators)
+        if not_modified is not None:
+                return not_modified
+        return http_cache.send(schemas.SALE_VIEWS[expand].model_validate(sale), response, validators)
@@ -0,0 +1,79 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from ..database import DbSession, get_db
+from .. import async_crud, conditional, crud, filtering, schemas, serialization
+
+router = APIRouter(prefix="/sales-orders", tags=["sales_orders"])
+http_cache = conditional.Policy("sales_orders")
+SORT_HELP = filtering.sort_help("sales_orders")
+
+
+@router.get("/", response_model=schemas.PaginatedSalesOrders)
+async def list_sales_orders(
+        request: Request,
+        response: Response,
+        skip: int = Query(0, ge=0),
+        limit: int = Query(20, ge=1, le=100),
+        customer_id: Optional[int] = Query(None, description="Filter by customer ID"),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+        sort: Optional[str] = Query(None, description=SORT_HELP),
+        total_mode: schemas.TotalMode = Query(
+                schemas.TotalMode.EXACT, description="How to compute total: exact, estimate, or none"
+        ),
+        db: DbSession = Depends(get_db),
+):
+        try:
+                query = filtering.parse("sales_orders", request.query_params, sort)
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+                page = await async_crud.list_sales_orders(
+                        db,
+                        skip=skip,
+                        limit=limit,
+                        customer_id=customer_id,
+                        cursor=cursor,
+                        total_mode=total_mode,
+                        as_rows=serialization.fast(),
+                        filters=query.filters,
+                        sort=query.sort,
+                )
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        result = serialization.respond(
+                schemas.PaginatedSalesOrders(
+                        items=page.items,
+                        total=page.total,
+                        skip=skip,
+                        limit=limit,
+                        next_cursor=page.next_cursor,
+                        has_more=page.has_more,
+                )
+        )
+        return http_cache.send_page(request, result, response)
+
+
+@router.post("/", response_model=schemas.SalesOrder, status_code=201)
+async def create_sales_order(payload: schemas.SalesOrderCreate, db: DbSession = Depends(get_db)):
+        customer = await async_crud.get_customer(db, payload.customer_id)
+        if not customer:
+                raise HTTPException(status_code=404, detail="Customer not found")
+        try:
+                order_id = await async_crud.create_sales_order(db, customer=customer, order_in=payload)
+        except crud.BulkWriteError as exc:
+                raise HTTPException(status_code=400, detail=exc.errors) from exc
+        return await async_crud.get_sales_order(db, order_id)
+
+
+@router.get("/{order_id}", response_model=schemas.SalesOrder)
+async def get_sales_order(order_id: int, request: Request, response: Response, db: DbSession = Depends(get_db)):
+        order = await async_crud.get_sales_order(db, order_id)
+        if not order:
+                raise HTTPException(status_code=404, detail="Sales order not found")
+        validators = conditional.object_validators(order)
+        not_modified = http_cache.not_modified(request, validators)
+        if not_modified is not None:
+                return not_modified
+        return http_cache.send(schemas.SalesOrder.model_validate(order), response, validators)
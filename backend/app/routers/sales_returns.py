@@ -1,39 +1,90 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from ..database import get_db
-from .. import crud, schemas
+from ..database import DbSession, get_db
+from .. import async_crud, conditional, filtering, schemas, serialization
 
 router = APIRouter(prefix="/sales-returns", tags=["sales_returns"])
+http_cache = conditional.Policy("sales_returns")
+SORT_HELP = filtering.sort_help("sales_returns")
 
 
-@router.get("/", response_model=schemas.PaginatedSalesReturns)
-def list_sales_returns(
+@router.get("/", response_model=schemas.PaginatedSalesReturnsView)
+async def list_sales_returns(
+        request: Request,
+        response: Response,
         skip: int = Query(0, ge=0),
         limit: int = Query(20, ge=1, le=100),
         sale_id: Optional[int] = Query(None, description="Filter by sale ID"),
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+        sort: Optional[str] = Query(None, description=SORT_HELP),
+        total_mode: schemas.TotalMode = Query(
+                schemas.TotalMode.EXACT, description="How to compute total: exact, estimate, or none"
+        ),
+        expand: schemas.Expand = Query(
+                schemas.Expand.FULL, description="Related records: ids, compact (names only) or full objects"
+        ),
+        db: DbSession = Depends(get_db),
 ):
-        items, total = crud.list_sales_returns(db, skip=skip, limit=limit, sale_id=sale_id)
-        return schemas.PaginatedSalesReturns(items=items, total=total, skip=skip, limit=limit)
+        try:
+                query = filtering.parse("sales_returns", request.query_params, sort)
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+                page = await async_crud.list_sales_returns(
+                        db,
+                        skip=skip,
+                        limit=limit,
+                        sale_id=sale_id,
+                        cursor=cursor,
+                        total_mode=total_mode,
+                        expand=expand,
+                        as_rows=serialization.fast(),
+                        filters=query.filters,
+                        sort=query.sort,
+                )
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        result = serialization.respond(
+                schemas.SALES_RETURN_PAGES[expand](
+                        items=page.items,
+                        total=page.total,
+                        skip=skip,
+                        limit=limit,
+                        next_cursor=page.next_cursor,
+                        has_more=page.has_more,
+                )
+        )
+        return http_cache.send_page(request, result, response)
 
 
 @router.post("/", response_model=schemas.SalesReturn, status_code=201)
-def create_sales_return(payload: schemas.SalesReturnCreate, db: Session = Depends(get_db)):
-        sale = crud.get_sale(db, payload.sale_id)
+async def create_sales_return(payload: schemas.SalesReturnCreate, db: DbSession = Depends(get_db)):
+        sale = await async_crud.get_sale(db, payload.sale_id)
         if not sale:
                 raise HTTPException(status_code=404, detail="Sale not found")
         try:
-                return crud.create_sales_return(db, sale=sale, sales_return_in=payload)
+                return await async_crud.create_sales_return(db, sale=sale, sales_return_in=payload)
         except ValueError as exc:
                 raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
-@router.get("/{sales_return_id}", response_model=schemas.SalesReturn)
-def get_sales_return(sales_return_id: int, db: Session = Depends(get_db)):
-        sales_return = crud.get_sales_return(db, sales_return_id)
+@router.get("/{sales_return_id}", response_model=schemas.SalesReturnView)
+async def get_sales_return(
+        sales_return_id: int,
+        request: Request,
+        response: Response,
+        expand: schemas.Expand = Query(
+                schemas.Expand.FULL, description="Related records: ids, compact (names only) or full objects"
+        ),
+        db: DbSession = Depends(get_db),
+):
+        sales_return = await async_crud.get_sales_return(db, sales_return_id, expand=expand)
         if not sales_return:
                 raise HTTPException(status_code=404, detail="Sales return not found")
-        return sales_return
+        validators = conditional.object_validators(sales_return, expand)
+        not_modified = http_cache.not_modified(request, validators)
+        if not_modified is not None:
+                return not_modified
+        return http_cache.send(schemas.SALES_RETURN_VIEWS[expand].model_validate(sales_return), response, validators)
@@ -1,60 +1,99 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from ..database import get_db
-from .. import crud, schemas
+from ..database import DbSession, get_db
+from .. import async_crud, conditional, filtering, schemas, serialization
 
 router = APIRouter(prefix="/vendors", tags=["vendors"])
+http_cache = conditional.Policy("vendors")
+SORT_HELP = filtering.sort_help("vendors")
 
 
 @router.get("/", response_model=schemas.PaginatedVendors)
-def list_vendors(
+async def list_vendors(
+        request: Request,
+        response: Response,
         skip: int = Query(0, ge=0),
         limit: int = Query(20, ge=1, le=100),
         q: Optional[str] = Query(None, description="Search by vendor name"),
-        db: Session = Depends(get_db),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+        sort: Optional[str] = Query(None, description=SORT_HELP),
+        total_mode: schemas.TotalMode = Query(
+                schemas.TotalMode.EXACT, description="How to compute total: exact, estimate, or none"
+        ),
+        db: DbSession = Depends(get_db),
 ):
-        items, total = crud.list_vendors(db, skip=skip, limit=limit, q=q)
-        return schemas.PaginatedVendors(items=items, total=total, skip=skip, limit=limit)
+        try:
+                query = filtering.parse("vendors", request.query_params, sort)
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        try:
+                page = await async_crud.list_vendors(
+                        db,
+                        skip=skip,
+                        limit=limit,
+                        q=q,
+                        cursor=cursor,
+                        total_mode=total_mode,
+                        as_rows=serialization.fast(),
+                        filters=query.filters,
+                        sort=query.sort,
+                )
+        except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+        result = serialization.respond(
+                schemas.PaginatedVendors(
+                        items=page.items,
+                        total=page.total,
+                        skip=skip,
+                        limit=limit,
+                        next_cursor=page.next_cursor,
+                        has_more=page.has_more,
+                )
+        )
+        return http_cache.send_page(request, result, response)
 
 
 @router.post("/", response_model=schemas.Vendor, status_code=201)
-def create_vendor(payload: schemas.VendorCreate, db: Session = Depends(get_db)):
-        existing = crud.get_vendor_by_name(db, payload.name)
+async def create_vendor(payload: schemas.VendorCreate, db: DbSession = Depends(get_db)):
+        existing = await async_crud.get_vendor_by_name(db, payload.name)
         if existing:
                 raise HTTPException(status_code=400, detail="Vendor name already exists")
-        return crud.create_vendor(db, payload)
+        return await async_crud.create_vendor(db, payload)
 
 
 @router.get("/{vendor_id}", response_model=schemas.Vendor)
-def get_vendor(vendor_id: int, db: Session = Depends(get_db)):
-        vendor = crud.get_vendor(db, vendor_id)
+async def get_vendor(vendor_id: int, request: Request, response: Response, db: DbSession = Depends(get_db)):
+        vendor = await async_crud.get_vendor(db, vendor_id, cached=True)
         if not vendor:
                 raise HTTPException(status_code=404, detail="Vendor not found")
-        return vendor
+        validators = conditional.object_validators(vendor)
+        not_modified = http_cache.not_modified(request, validators)
+        if not_modified is not None:
+                return not_modified
+        return http_cache.send(vendor, response, validators)
 
 
 @router.put("/{vendor_id}", response_model=schemas.Vendor)
-def update_vendor(vendor_id: int, payload: schemas.VendorUpdate, db: Session = Depends(get_db)):
-        vendor = crud.get_vendor(db, vendor_id)
+async def update_vendor(vendor_id: int, payload: schemas.VendorUpdate, db: DbSession = Depends(get_db)):
+        vendor = await async_crud.get_vendor(db, vendor_id)
         if not vendor:
                 raise HTTPException(status_code=404, detail="Vendor not found")
         if payload.name:
-                existing = crud.get_vendor_by_name(db, payload.name)
+                existing = await async_crud.get_vendor_by_name(db, payload.name)
                 if existing and existing.id != vendor_id:
                         raise HTTPException(status_code=400, detail="Vendor name already exists")
-        return crud.update_vendor(db, vendor, payload)
+        return await async_crud.update_vendor(db, vendor, payload)
 
 
 @router.delete("/{vendor_id}", status_code=204)
-def delete_vendor(vendor_id: int, db: Session = Depends(get_db)):
-        vendor = crud.get_vendor(db, vendor_id)
+async def delete_vendor(vendor_id: int, db: DbSession = Depends(get_db)):
+        vendor = await async_crud.get_vendor(db, vendor_id)
         if not vendor:
                 raise HTTPException(status_code=404, detail="Vendor not found")
         try:
-                crud.delete_vendor(db, vendor)
+                await async_crud.delete_vendor(db, vendor)
         except ValueError as exc:
                 raise HTTPException(status_code=400, detail=str(exc)) from exc
         return None
@@ -1,7 +1,26 @@
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Union
+from datetime import date, datetime
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, AliasPath, BaseModel, Field, computed_field
+
+
+class TotalMode(str, Enum):
+        EXACT = "exact"
+        ESTIMATE = "estimate"
+        NONE = "none"
+
+
+class Expand(str, Enum):
+        """How much of a line's related records to embed in responses."""
+
+        IDS = "ids"  # foreign keys only
+        COMPACT = "compact"  # plus display names, e.g. book_title
+        FULL = "full"  # nested objects
+
+
+class FileFormat(str, Enum):
+        CSV = "csv"
+        NDJSON = "ndjson"
 
 
 class BookBase(BaseModel):
@@ -34,11 +53,39 @@ class Book(BookBase):
         from_attributes = True
 
 
+class StockLevel(BaseModel):
+        book_id: int
+        quantity: int
+
+
+class BookStock(StockLevel):
+        as_of: datetime
+
+
+class StockSnapshot(BaseModel):
+        as_of: datetime
+        checkpoint: Optional[datetime] = Field(None, description="Checkpoint the figures were computed from")
+        items: List[StockLevel] = Field(..., description="Books with copies on hand, by book id")
+
+
 class PaginatedBooks(BaseModel):
         items: List[Book]
-        total: int
+        total: Optional[int]
         skip: int
         limit: int
+        next_cursor: Optional[str] = None
+        has_more: bool = False
+
+
+class RowError(BaseModel):
+        index: int
+        detail: str
+
+
+class BookImportResult(BaseModel):
+        created: int
+        updated: int
+        errors: List[RowError]
 
 
 class VendorBase(BaseModel):
@@ -48,6 +95,7 @@ class VendorBase(BaseModel):
         contact_number: Optional[str] = Field(None, max_length=64)
         email: Optional[str] = Field(None, max_length=255)
         tax_number: Optional[str] = Field(None, max_length=64)
+        lead_time_days: Optional[int] = Field(None, ge=0, description="Days from order to delivery")
 
 
 class VendorCreate(VendorBase):
@@ -61,6 +109,7 @@ class VendorUpdate(BaseModel):
         contact_number: Optional[str] = Field(None, max_length=64)
         email: Optional[str] = Field(None, max_length=255)
         tax_number: Optional[str] = Field(None, max_length=64)
+        lead_time_days: Optional[int] = Field(None, ge=0, description="Days from order to delivery")
 
 
 class Vendor(VendorBase):
@@ -74,9 +123,11 @@ class Vendor(VendorBase):
 
 class PaginatedVendors(BaseModel):
         items: List[Vendor]
-        total: int
+        total: Optional[int]
         skip: int
         limit: int
+        next_cursor: Optional[str] = None
+        has_more: bool = False
 
 
 class CustomerCategory(str, Enum):
@@ -120,9 +171,11 @@ class Customer(CustomerBase):
 
 class PaginatedCustomers(BaseModel):
         items: List[Customer]
-        total: int
+        total: Optional[int]
         skip: int
         limit: int
+        next_cursor: Optional[str] = None
+        has_more: bool = False
 
 
 class PurchaseBase(BaseModel):
@@ -138,23 +191,57 @@ class PurchaseCreate(PurchaseBase):
         pass
 
 
-class Purchase(PurchaseBase):
+class PurchaseRef(PurchaseBase):
         id: int
         total_cost: float
+        order_id: Optional[int] = None
         created_at: datetime
         updated_at: datetime
-        vendor: Optional[Vendor]
-        book: Optional[Book]
 
         class Config:
                 from_attributes = True
 
 
+class PurchaseCompact(PurchaseRef):
+        vendor_name: Optional[str] = Field(validation_alias=AliasChoices("vendor_name", AliasPath("vendor", "name")))
+        book_title: Optional[str] = Field(validation_alias=AliasChoices("book_title", AliasPath("book", "title")))
+
+
+class Purchase(PurchaseRef):
+        vendor: Optional[Vendor]
+        book: Optional[Book]
+
+
+# Full first: a full payload also satisfies the narrower views, and on a tie
+# the union keeps the leftmost match. Pages use one concrete class per view
+# (*_PAGES) since validating and dumping a union per item is slow.
+PurchaseView = Union[Purchase, PurchaseCompact, PurchaseRef]
+PURCHASE_VIEWS = {Expand.IDS: PurchaseRef, Expand.COMPACT: PurchaseCompact, Expand.FULL: Purchase}
+
+
+class PurchaseBulkCreate(BaseModel):
+        items: List[PurchaseCreate] = Field(..., min_length=1, max_length=10000)
+
+
 class PaginatedPurchases(BaseModel):
         items: List[Purchase]
-        total: int
+        total: Optional[int]
         skip: int
         limit: int
+        next_cursor: Optional[str] = None
+        has_more: bool = False
+
+
+class PaginatedPurchasesCompact(PaginatedPurchases):
+        items: List[PurchaseCompact]
+
+
+class PaginatedPurchasesRef(PaginatedPurchases):
+        items: List[PurchaseRef]
+
+
+PaginatedPurchasesView = Union[PaginatedPurchases, PaginatedPurchasesCompact, PaginatedPurchasesRef]
+PURCHASE_PAGES = {Expand.IDS: PaginatedPurchasesRef, Expand.COMPACT: PaginatedPurchasesCompact, Expand.FULL: PaginatedPurchases}
 
 
 class SaleBase(BaseModel):
@@ -170,23 +257,67 @@ class SaleCreate(SaleBase):
         pass
 
 
-class Sale(SaleBase):
+class SaleRef(SaleBase):
         id: int
         total_amount: float
+        returned_quantity: int = 0
+        order_id: Optional[int] = None
         created_at: datetime
         updated_at: datetime
-        customer: Optional[Customer]
-        book: Optional[Book]
 
         class Config:
                 from_attributes = True
 
+        @computed_field
+        @property
+        def net_quantity(self) -> int:
+                return self.quantity - self.returned_quantity
+
+
+class SaleCompact(SaleRef):
+        customer_name: Optional[str] = Field(
+                validation_alias=AliasChoices("customer_name", AliasPath("customer", "name"))
+        )
+        book_title: Optional[str] = Field(validation_alias=AliasChoices("book_title", AliasPath("book", "title")))
+
+
+class Sale(SaleRef):
+        customer: Optional[Customer]
+        book: Optional[Book]
+
+
+SaleView = Union[Sale, SaleCompact, SaleRef]
+SALE_VIEWS = {Expand.IDS: SaleRef, Expand.COMPACT: SaleCompact, Expand.FULL: Sale}
+
+
+class SaleBulkCreate(BaseModel):
+        items: List[SaleCreate] = Field(..., min_length=1, max_length=10000)
+
 
 class PaginatedSales(BaseModel):
         items: List[Sale]
-        total: int
+        total: Optional[int]
         skip: int
         limit: int
+        next_cursor: Optional[str] = None
+        has_more: bool = False
+
+
+class PaginatedSalesCompact(PaginatedSales):
+        items: List[SaleCompact]
+
+
+class PaginatedSalesRef(PaginatedSales):
+        items: List[SaleRef]
+
+
+PaginatedSalesView = Union[PaginatedSales, PaginatedSalesCompact, PaginatedSalesRef]
+SALE_PAGES = {Expand.IDS: PaginatedSalesRef, Expand.COMPACT: PaginatedSalesCompact, Expand.FULL: PaginatedSales}
+
+
+class BulkCreateResult(BaseModel):
+        created: int
+        ids: List[int]
 
 
 class SalesReturnBase(BaseModel):
@@ -199,21 +330,229 @@ class SalesReturnCreate(SalesReturnBase):
         pass
 
 
-class SalesReturn(SalesReturnBase):
+class SalesReturnRef(SalesReturnBase):
         id: int
         processed_at: datetime
         created_at: datetime
         updated_at: datetime
-        sale: Optional[Sale]
 
         class Config:
                 from_attributes = True
 
 
+class SalesReturnCompact(SalesReturnRef):
+        book_id: int = Field(validation_alias=AliasChoices("book_id", AliasPath("sale", "book_id")))
+        book_title: Optional[str] = Field(
+                validation_alias=AliasChoices("book_title", AliasPath("sale", "book", "title"))
+        )
+        customer_name: Optional[str] = Field(
+                validation_alias=AliasChoices("customer_name", AliasPath("sale", "customer", "name"))
+        )
+
+
+class SalesReturn(SalesReturnRef):
+        sale: Optional[Sale]
+
+
+SalesReturnView = Union[SalesReturn, SalesReturnCompact, SalesReturnRef]
+SALES_RETURN_VIEWS = {Expand.IDS: SalesReturnRef, Expand.COMPACT: SalesReturnCompact, Expand.FULL: SalesReturn}
+
+
 class PaginatedSalesReturns(BaseModel):
         items: List[SalesReturn]
-        total: int
+        total: Optional[int]
         skip: int
         limit: int
+        next_cursor: Optional[str] = None
+        has_more: bool = False
+
+
+class PaginatedSalesReturnsCompact(PaginatedSalesReturns):
+        items: List[SalesReturnCompact]
+
+
+class PaginatedSalesReturnsRef(PaginatedSalesReturns):
+        items: List[SalesReturnRef]
+
+
+PaginatedSalesReturnsView = Union[PaginatedSalesReturns, PaginatedSalesReturnsCompact, PaginatedSalesReturnsRef]
+SALES_RETURN_PAGES = {Expand.IDS: PaginatedSalesReturnsRef, Expand.COMPACT: PaginatedSalesReturnsCompact, Expand.FULL: PaginatedSalesReturns}
 
 
+# Orders: a header with many lines, created in one request. Totals are
+# summed from the lines by the database.
+
+
+class SaleLineCreate(BaseModel):
+        book_id: int
+        quantity: int = Field(..., ge=1)
+        unit_price: float = Field(..., ge=0)
+
+
+class SalesOrderBase(BaseModel):
+        customer_id: int
+        sold_at: Optional[datetime] = None
+        notes: Optional[str] = Field(None, max_length=512)
+
+
+class SalesOrderCreate(SalesOrderBase):
+        lines: List[SaleLineCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class SalesOrderSummary(SalesOrderBase):
+        id: int
+        sold_at: datetime
+        customer_name: Optional[str] = Field(
+                validation_alias=AliasChoices("customer_name", AliasPath("customer", "name"))
+        )
+        line_count: int
+        total_quantity: int
+        total_amount: float
+        created_at: datetime
+        updated_at: datetime
+
+        class Config:
+                from_attributes = True
+
+
+class SalesOrderLine(BaseModel):
+        id: int
+        book_id: int
+        book_title: Optional[str] = Field(validation_alias=AliasChoices("book_title", AliasPath("book", "title")))
+        quantity: int
+        unit_price: float
+        total_amount: float
+        returned_quantity: int = 0
+
+        class Config:
+                from_attributes = True
+
+
+class SalesOrder(SalesOrderSummary):
+        lines: List[SalesOrderLine]
+
+
+class PaginatedSalesOrders(BaseModel):
+        items: List[SalesOrderSummary]
+        total: Optional[int]
+        skip: int
+        limit: int
+        next_cursor: Optional[str] = None
+        has_more: bool = False
+
+
+class PurchaseLineCreate(BaseModel):
+        book_id: int
+        quantity: int = Field(..., ge=1)
+        unit_cost: float = Field(..., ge=0)
+
+
+class PurchaseOrderBase(BaseModel):
+        vendor_id: int
+        purchased_at: Optional[datetime] = None
+        notes: Optional[str] = Field(None, max_length=512)
+
+
+class PurchaseOrderCreate(PurchaseOrderBase):
+        lines: List[PurchaseLineCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class PurchaseOrderSummary(PurchaseOrderBase):
+        id: int
+        purchased_at: datetime
+        vendor_name: Optional[str] = Field(validation_alias=AliasChoices("vendor_name", AliasPath("vendor", "name")))
+        line_count: int
+        total_quantity: int
+        total_cost: float
+        created_at: datetime
+        updated_at: datetime
+
+        class Config:
+                from_attributes = True
+
+
+class PurchaseOrderLine(BaseModel):
+        id: int
+        book_id: int
+        book_title: Optional[str] = Field(validation_alias=AliasChoices("book_title", AliasPath("book", "title")))
+        quantity: int
+        unit_cost: float
+        total_cost: float
+
+        class Config:
+                from_attributes = True
+
+
+class PurchaseOrder(PurchaseOrderSummary):
+        lines: List[PurchaseOrderLine]
+
+
+class PaginatedPurchaseOrders(BaseModel):
+        items: List[PurchaseOrderSummary]
+        total: Optional[int]
+        skip: int
+        limit: int
+        next_cursor: Optional[str] = None
+        has_more: bool = False
+
+
+class RevenuePoint(BaseModel):
+        period: date
+        units_sold: int
+        units_returned: int
+        revenue: float
+        refunds: float
+        net_revenue: float
+
+
+class BookNetUnits(BaseModel):
+        book_id: int
+        title: str
+        author: str
+        units_sold: int
+        units_returned: int
+        net_units: int
+        net_revenue: float
+
+
+class BookValuation(BaseModel):
+        book_id: int
+        title: str
+        quantity: int
+        price: float
+        value: float
+
+
+class StockValuation(BaseModel):
+        titles: int
+        units: int
+        value: float
+        top_books: List[BookValuation]
+
+
+class CustomerRanking(BaseModel):
+        customer_id: int
+        name: str
+        category: CustomerCategory
+        net_units: int
+        net_revenue: float
+
+
+class VendorSpend(BaseModel):
+        vendor_id: int
+        name: str
+        units: int
+        spend: float
+
+
+class ReorderSuggestion(BaseModel):
+        book_id: int
+        title: str
+        quantity: int
+        velocity: float = Field(..., description="Net units sold per day, recent days weighted most")
+        days_of_cover: float
+        lead_time_days: int
+        reorder_point: int
+        suggested_quantity: int
+        vendor_id: Optional[int]
+        vendor_name: Optional[str]
@@ -0,0 +1,130 @@
+"""Index-backed search for books, vendors and customers.
+
+``ILIKE '%q%'`` cannot use a B-tree index, so the list endpoints route free
+text through a backend that can:
+
+* PostgreSQL: ``pg_trgm`` GIN indexes (migration ``v003``) serve the same
+  ``ILIKE`` predicate, and results are ranked by ``word_similarity``.
+* SQLite: FTS5 tables with the ``trigram`` tokenizer, kept in sync by
+  triggers created in :func:`install`, ranked by ``bm25``.
+
+Queries shorter than a trigram, or a database without the extension/tables,
+fall back to the plain unranked ``ILIKE`` scan. ISBN-shaped queries are
+answered from the unique ``isbn`` index before any text search runs.
+"""
+
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, literal_column, or_, select, table, column, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Subquery
+
+from . import models
+
+
+SEARCH_COLUMNS: Dict[str, Tuple[str, ...]] = {
+        "books": ("title", "author", "isbn"),
+        "vendors": ("name",),
+        "customers": ("name",),
+}
+
+_MIN_TRIGRAM_QUERY = 3
+_ISBN_RE = re.compile(r"^(?:\d{9}[\dX]|\d{13})$")
+
+# Filled in by install() / lazily per backend; the app only ever has one engine.
+_fts_tables: set = set()
+_pg_trgm: Optional[bool] = None
+
+
+class SearchPlan(NamedTuple):
+        condition: ColumnElement
+        # Subquery of (id, score), higher score first; None when unranked.
+        ranked: Optional[Subquery]
+
+
+def install(engine: Engine) -> None:
+        """Create the SQLite FTS5 tables and sync triggers if they are missing."""
+        if engine.dialect.name != "sqlite":
+                return
+        with engine.begin() as conn:
+                try:
+                        conn.exec_driver_sql("CREATE VIRTUAL TABLE temp._trigram_probe USING fts5(x, tokenize='trigram')")
+                        conn.exec_driver_sql("DROP TABLE temp._trigram_probe")
+                except Exception:
+                        # SQLite older than 3.34 or built without FTS5
+                        return
+                for table_name, columns in SEARCH_COLUMNS.items():
+                        fts = f"{table_name}_fts"
+                        cols = ", ".join(columns)
+                        new_cols = ", ".join(f"new.{c}" for c in columns)
+                        old_cols = ", ".join(f"old.{c}" for c in columns)
+                        exists = conn.exec_driver_sql(
+                                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+                        ).first()
+                        conn.exec_driver_sql(
+                                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                                f"{cols}, content='{table_name}', content_rowid='id', tokenize='trigram')"
+                        )
+                        conn.exec_driver_sql(
+                                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+                                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+                        )
+                        conn.exec_driver_sql(
+                                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+                                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+                        )
+                        conn.exec_driver_sql(
+                                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table_name} BEGIN "
+                                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+                        )
+                        if not exists:
+                                conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                        _fts_tables.add(table_name)
+
+
+def find_by_isbn(db: Session, q: str) -> Optional[models.Book]:
+        """Exact ISBN fast path; returns None unless ``q`` looks like an ISBN."""
+        normalized = re.sub(r"[\s-]", "", q).upper()
+        if not _ISBN_RE.match(normalized):
+                return None
+        stmt = select(models.Book).where(models.Book.isbn.in_({q.strip(), normalized}))
+        return db.scalars(stmt).first()
+
+
+def plan(db: Session, model, q: str) -> SearchPlan:
+        table_name = model.__tablename__
+        columns = [getattr(model, name) for name in SEARCH_COLUMNS[table_name]]
+        pattern = f"%{q}%"
+        like = or_(*(col.ilike(pattern) for col in columns))
+        if len(q.strip()) < _MIN_TRIGRAM_QUERY:
+                return SearchPlan(like, None)
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite" and table_name in _fts_tables:
+                return _fts5_plan(model, q)
+        if dialect == "postgresql" and _has_pg_trgm(db):
+                score = func.greatest(*(func.coalesce(func.word_similarity(q, col), 0) for col in columns))
+                ranked = select(model.id.label("id"), score.label("score")).where(like).subquery()
+                return SearchPlan(like, ranked)
+        return SearchPlan(like, None)
+
+
+def _fts5_plan(model, q: str) -> SearchPlan:
+        fts_name = f"{model.__tablename__}_fts"
+        fts = table(fts_name, column("rowid"), column("rank"))
+        # A quoted FTS5 string is a phrase; with the trigram tokenizer that is a
+        # case-insensitive substring match, i.e. the same semantics as ILIKE.
+        phrase = '"' + q.replace('"', '""') + '"'
+        match = literal_column(fts_name).op("MATCH")(phrase)
+        condition = model.id.in_(select(fts.c.rowid).where(match))
+        ranked = select(fts.c.rowid.label("id"), (-fts.c.rank).label("score")).where(match).subquery()
+        return SearchPlan(condition, ranked)
+
+
+def _has_pg_trgm(db: Session) -> bool:
+        global _pg_trgm
+        if _pg_trgm is None:
+                _pg_trgm = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+        return _pg_trgm
@@ -0,0 +1,66 @@
+"""Response serialization mode.
+
+FastAPI's default path for a returned Pydantic model is: dump it to a dict,
+validate that dict again against ``response_model``, serialize it to
+JSON-compatible Python objects and finally ``json.dumps`` them. With fast JSON
+on (the default; ``FAST_JSON=0`` or ``create_app(fast_json=False)`` turns it
+off) list endpoints instead:
+
+* read plain column rows rather than ORM objects where the response shape
+  allows it (``crud.list_*(as_rows=True)``), and
+* return the page model's ``model_dump_json()`` bytes directly, which FastAPI
+  passes through untouched.
+
+Other endpoints keep the standard path but render with ``ORJSONResponse``
+when ``orjson`` is installed. The setting is process-wide.
+"""
+
+import os
+from typing import Optional, Union
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from . import instrumentation
+
+try:
+        import orjson  # noqa: F401
+        from fastapi.responses import ORJSONResponse as _FastJSONResponse
+except ImportError:  # optional speed-up
+        _FastJSONResponse = JSONResponse
+
+_fast = os.getenv("FAST_JSON", "1").lower() in {"1", "true", "yes"}
+
+
+def configure(fast_json: Optional[bool] = None) -> None:
+        global _fast
+        if fast_json is not None:
+                _fast = fast_json
+
+
+def fast() -> bool:
+        return _fast
+
+
+class _TimedRender:
+        # Reported as serialization time by the instrumentation middleware
+        def render(self, content) -> bytes:
+                with instrumentation.serializing():
+                        return super().render(content)
+
+
+class DefaultResponse(_TimedRender, _FastJSONResponse):
+        pass
+
+
+class StandardResponse(_TimedRender, JSONResponse):
+        pass
+
+
+def respond(model: BaseModel, status_code: int = 200) -> Union[BaseModel, Response]:
+        """Encode ``model`` straight to JSON bytes in fast mode, else return it unchanged."""
+        if not _fast:
+                return model
+        with instrumentation.serializing():
+                body = model.model_dump_json()
+        return Response(body, status_code=status_code, media_type="application/json")
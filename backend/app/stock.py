@@ -0,0 +1,213 @@
+"""Atomic stock mutations.
+
+Every change to ``books.quantity`` made by a sale, purchase or return goes
+through here as a single conditional ``UPDATE ... RETURNING`` so concurrent
+workers can never oversell: the database checks and applies the delta in one
+statement, with no Python read-modify-write and no ``SELECT ... FOR UPDATE``.
+The returned row refreshes the session's ``Book`` in place, so responses need
+no follow-up ``SELECT``. Nothing is committed; callers own the transaction.
+
+Each change is also appended to the ``stock_movements`` ledger with
+:func:`record`, in the same transaction, so stock at any past moment can be
+answered (:func:`level`, :func:`snapshot`). To keep those reads from replaying
+all history, a periodic job writes per-book ``stock_checkpoints``::
+
+    python -m app.stock checkpoint
+
+A read then starts from the latest checkpoint at or before ``as_of`` and only
+sums the movements after it. Checkpoints are computed from the ledger itself
+(previous checkpoint plus the movements since), never from ``books.quantity``,
+and lag :data:`CHECKPOINT_DELAY` behind the clock so no transaction that is
+still in flight can land before one.
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import DateTime, delete, func, insert, literal, select, union_all, update
+from sqlalchemy.orm import Session
+
+from . import events, models
+
+# How far behind now a checkpoint is taken; comfortably longer than any write
+# transaction, whose movements carry the transaction's start time
+CHECKPOINT_DELAY = timedelta(minutes=5)
+
+
+class InsufficientStockError(ValueError):
+        def __init__(self, book_id: int):
+                super().__init__("Insufficient stock for sale")
+                self.book_id = book_id
+
+
+def _apply(db: Session, stmt) -> models.Book:
+        book = db.scalars(
+                stmt.returning(models.Book),
+                execution_options={"populate_existing": True, "synchronize_session": False},
+        ).first()
+        if book is not None:
+                events.record(db, "books", book.id, quantity=book.quantity, updated_at=book.updated_at)
+        return book
+
+
+def take(db: Session, book_id: int, quantity: int) -> models.Book:
+        """Remove ``quantity`` from stock and return the updated book.
+
+        Raises :class:`InsufficientStockError` if the book has fewer than
+        ``quantity`` copies (or does not exist); stock is left untouched.
+        """
+        book = _apply(
+                db,
+                update(models.Book)
+                .where(models.Book.id == book_id, models.Book.quantity >= quantity)
+                .values(quantity=models.Book.quantity - quantity),
+        )
+        if book is None:
+                raise InsufficientStockError(book_id)
+        return book
+
+
+def put(db: Session, book_id: int, quantity: int) -> models.Book:
+        """Add ``quantity`` to stock and return the updated book."""
+        book = _apply(
+                db,
+                update(models.Book).where(models.Book.id == book_id).values(quantity=models.Book.quantity + quantity),
+        )
+        if book is None:
+                raise ValueError("Book not found")
+        return book
+
+
+def adjust(db: Session, book_id: int, quantity: int) -> Optional[int]:
+        """Set stock to ``quantity`` (a manual correction) and record the difference.
+
+        The one absolute write: the current figure is read under a row lock so
+        the recorded delta matches what was overwritten. Returns the delta.
+        """
+        current = db.scalars(select(models.Book.quantity).where(models.Book.id == book_id).with_for_update()).first()
+        if current is None:
+                raise ValueError("Book not found")
+        if quantity != current:
+                _apply(db, update(models.Book).where(models.Book.id == book_id).values(quantity=quantity))
+                record(db, [(book_id, quantity - current, models.StockMovementKind.ADJUSTMENT, None)])
+        return quantity - current
+
+
+def record(db: Session, movements: Iterable[Tuple[int, int, models.StockMovementKind, Optional[int]]]) -> None:
+        """Append ``(book_id, delta, kind, reference_id)`` movements to the ledger."""
+        rows = [
+                {"book_id": book_id, "delta": delta, "kind": kind, "reference_id": reference_id}
+                for book_id, delta, kind, reference_id in movements
+                if delta
+        ]
+        if rows:
+                db.execute(insert(models.StockMovement), rows)
+
+
+def forget_book(db: Session, book_id: int) -> None:
+        """Drop a book's ledger and checkpoints before the book is deleted."""
+        db.execute(delete(models.StockMovement).where(models.StockMovement.book_id == book_id))
+        db.execute(delete(models.StockCheckpoint).where(models.StockCheckpoint.book_id == book_id))
+
+
+def _utc(moment: datetime) -> datetime:
+        # Naive values (SQLite hands those back) are UTC, like the stored ones
+        if moment.tzinfo is None:
+                return moment.replace(tzinfo=timezone.utc)
+        return moment.astimezone(timezone.utc)
+
+
+def _checkpoint_at(db: Session, as_of: datetime) -> Optional[datetime]:
+        taken_at = db.scalars(
+                select(func.max(models.StockCheckpoint.taken_at)).where(models.StockCheckpoint.taken_at <= as_of)
+        ).first()
+        return _utc(taken_at) if taken_at is not None else None
+
+
+def _levels(after: Optional[datetime], as_of: datetime, book_id: Optional[int] = None):
+        """``(book_id, quantity)`` rows: the checkpoint taken at ``after`` plus the movements up to ``as_of``."""
+        movements = select(models.StockMovement.book_id, models.StockMovement.delta.label("quantity")).where(
+                models.StockMovement.moved_at <= as_of
+        )
+        if book_id is not None:
+                movements = movements.where(models.StockMovement.book_id == book_id)
+        if after is None:
+                parts = movements.subquery()
+        else:
+                checkpoint = select(models.StockCheckpoint.book_id, models.StockCheckpoint.quantity).where(
+                        models.StockCheckpoint.taken_at == after
+                )
+                if book_id is not None:
+                        checkpoint = checkpoint.where(models.StockCheckpoint.book_id == book_id)
+                parts = union_all(checkpoint, movements.where(models.StockMovement.moved_at > after)).subquery()
+        quantity = func.sum(parts.c.quantity)
+        return (
+                select(parts.c.book_id, quantity.label("quantity"))
+                .group_by(parts.c.book_id)
+                .having(quantity != 0)
+                .order_by(parts.c.book_id)
+        )
+
+
+def level(db: Session, book_id: int, as_of: Optional[datetime] = None) -> int:
+        """Copies of ``book_id`` on hand at ``as_of`` (default: now)."""
+        as_of = _utc(as_of) if as_of else datetime.now(timezone.utc)
+        after = _checkpoint_at(db, as_of)
+        row = db.execute(_levels(after, as_of, book_id)).first()
+        return row.quantity if row else 0
+
+
+class Snapshot(NamedTuple):
+        as_of: datetime
+        checkpoint: Optional[datetime]
+        items: List[dict]
+
+
+def snapshot(db: Session, as_of: Optional[datetime] = None) -> Snapshot:
+        """Stock of every book with copies on hand at ``as_of`` (default: now), by book id."""
+        as_of = _utc(as_of) if as_of else datetime.now(timezone.utc)
+        after = _checkpoint_at(db, as_of)
+        items = [row._asdict() for row in db.execute(_levels(after, as_of))]
+        return Snapshot(as_of, after, items)
+
+
+def checkpoint(db: Session, at: Optional[datetime] = None) -> Optional[datetime]:
+        """Write one checkpoint row per book with stock as of ``at`` (not committed).
+
+        ``at`` defaults to :data:`CHECKPOINT_DELAY` ago. Returns the checkpoint
+        time, or None if a checkpoint at or after ``at`` already exists.
+        """
+        at = _utc(at) if at else datetime.now(timezone.utc) - CHECKPOINT_DELAY
+        latest = db.scalars(select(func.max(models.StockCheckpoint.taken_at))).first()
+        if latest is not None and _utc(latest) >= at:
+                return None
+        levels = _levels(_utc(latest) if latest is not None else None, at).order_by(None).subquery()
+        db.execute(
+                insert(models.StockCheckpoint).from_select(
+                        ["taken_at", "book_id", "quantity"],
+                        select(literal(at, DateTime(timezone=True)), levels.c.book_id, levels.c.quantity),
+                )
+        )
+        return at
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description="Maintain the stock ledger checkpoints")
+        parser.add_argument("command", choices=["checkpoint"])
+        parser.add_argument("--at", type=datetime.fromisoformat, help="checkpoint time (default: a few minutes ago)")
+        args = parser.parse_args()
+
+        from .database import SessionLocal
+
+        with SessionLocal() as db:
+                taken_at = checkpoint(db, args.at)
+                db.commit()
+        if taken_at is None:
+                print("A checkpoint at or after that time already exists")
+        else:
+                print(f"Checkpoint taken at {taken_at.isoformat()}")
+
+
+if __name__ == "__main__":
+        main()
@@ -0,0 +1,179 @@
+"""Incrementally maintained daily summary tables.
+
+Every sale, return and purchase bumps one row per ``(day, entity)`` in
+``book_sales_daily``, ``customer_sales_daily`` and ``vendor_purchases_daily``
+with an ``INSERT ... ON CONFLICT DO UPDATE`` in the writer's own transaction,
+so the summaries commit (or roll back) together with the rows they describe.
+Reports read these tables, whose size grows with days rather than rows.
+
+Days are UTC calendar dates. If the tables ever drift (e.g. rows edited by
+hand), rebuild them from the raw tables from ``backend/``::
+
+    python -m app.summaries rebuild
+"""
+
+import argparse
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import upsert_insert
+
+
+def _day(moment: Optional[datetime]) -> date:
+        # Unset timestamps get the server's now() on insert
+        if moment is None:
+                return datetime.now(timezone.utc).date()
+        if moment.tzinfo is not None:
+                moment = moment.astimezone(timezone.utc)
+        return moment.date()
+
+
+def _bump(db: Session, model, key: Tuple[str, str], deltas: Dict[tuple, Dict[str, object]]) -> None:
+        """Add ``deltas`` (``{(day, entity_id): {column: amount}}``) to ``model``.
+
+        Rows are upserted in key order, so concurrent writers lock them in the
+        same order and cannot deadlock.
+        """
+        if not deltas:
+                return
+        columns = sorted({name for values in deltas.values() for name in values})
+        rows = []
+        for (day, entity_id), values in sorted(deltas.items()):
+                row = {key[0]: day, key[1]: entity_id}
+                row.update({name: values.get(name, 0) for name in columns})
+                rows.append(row)
+        stmt = upsert_insert(db, model.__table__)
+        stmt = stmt.on_conflict_do_update(
+                index_elements=list(key),
+                set_={name: getattr(model.__table__.c, name) + getattr(stmt.excluded, name) for name in columns},
+        )
+        db.execute(stmt, rows)
+
+
+def _add(deltas: Dict[tuple, Dict[str, object]], key: tuple, **amounts) -> None:
+        values = deltas.setdefault(key, {})
+        for name, amount in amounts.items():
+                values[name] = values.get(name, 0) + amount
+
+
+def record_sales(db: Session, lines: Iterable[Tuple[int, int, int, Decimal, Optional[datetime]]]) -> None:
+        """Count sale lines given as ``(book_id, customer_id, quantity, total_amount, sold_at)``."""
+        by_book: Dict[tuple, Dict[str, object]] = {}
+        by_customer: Dict[tuple, Dict[str, object]] = {}
+        for book_id, customer_id, quantity, amount, sold_at in lines:
+                day = _day(sold_at)
+                _add(by_book, (day, book_id), units_sold=quantity, revenue=amount)
+                _add(by_customer, (day, customer_id), units_sold=quantity, revenue=amount)
+        _bump(db, models.BookSalesDaily, ("day", "book_id"), by_book)
+        _bump(db, models.CustomerSalesDaily, ("day", "customer_id"), by_customer)
+
+
+def record_returns(db: Session, lines: Iterable[Tuple[int, int, int, Decimal, Optional[datetime]]]) -> None:
+        """Count return lines given as ``(book_id, customer_id, quantity, refund, processed_at)``.
+
+        Returns land on the day they are processed, not the day of the sale.
+        """
+        by_book: Dict[tuple, Dict[str, object]] = {}
+        by_customer: Dict[tuple, Dict[str, object]] = {}
+        for book_id, customer_id, quantity, amount, processed_at in lines:
+                day = _day(processed_at)
+                _add(by_book, (day, book_id), units_returned=quantity, refunds=amount)
+                _add(by_customer, (day, customer_id), units_returned=quantity, refunds=amount)
+        _bump(db, models.BookSalesDaily, ("day", "book_id"), by_book)
+        _bump(db, models.CustomerSalesDaily, ("day", "customer_id"), by_customer)
+
+
+def record_purchases(db: Session, lines: Iterable[Tuple[int, int, Decimal, Optional[datetime]]]) -> None:
+        """Count purchase lines given as ``(vendor_id, quantity, total_cost, purchased_at)``."""
+        by_vendor: Dict[tuple, Dict[str, object]] = {}
+        for vendor_id, quantity, amount, purchased_at in lines:
+                _add(by_vendor, (_day(purchased_at), vendor_id), units=quantity, spend=amount)
+        _bump(db, models.VendorPurchasesDaily, ("day", "vendor_id"), by_vendor)
+
+
+def _sale_lines(db: Session, *conditions):
+        stmt = select(
+                models.Sale.book_id, models.Sale.customer_id, models.Sale.quantity, models.Sale.total_amount, models.Sale.sold_at
+        ).where(*conditions)
+        return db.execute(stmt.execution_options(yield_per=1000))
+
+
+def _return_lines(db: Session, *conditions):
+        stmt = (
+                select(
+                        models.Sale.book_id,
+                        models.Sale.customer_id,
+                        models.SalesReturn.quantity,
+                        models.SalesReturn.quantity * models.Sale.unit_price,
+                        models.SalesReturn.processed_at,
+                )
+                .join(models.Sale, models.SalesReturn.sale_id == models.Sale.id)
+                .where(*conditions)
+        )
+        return db.execute(stmt.execution_options(yield_per=1000))
+
+
+def _purchase_lines(db: Session, *conditions):
+        stmt = select(
+                models.Purchase.vendor_id, models.Purchase.quantity, models.Purchase.total_cost, models.Purchase.purchased_at
+        ).where(*conditions)
+        return db.execute(stmt.execution_options(yield_per=1000))
+
+
+def _negated(lines, amount_index: int, quantity_index: int):
+        for line in lines:
+                line = list(line)
+                line[quantity_index] = -line[quantity_index]
+                line[amount_index] = -line[amount_index]
+                yield line
+
+
+def forget_book(db: Session, book_id: int) -> None:
+        """Take a book's sales, returns and purchases back out of the summaries.
+
+        Called before the book (and, by cascade, its lines) is deleted so
+        customer and vendor totals stay equal to the remaining rows.
+        """
+        record_sales(db, _negated(list(_sale_lines(db, models.Sale.book_id == book_id)), 3, 2))
+        record_returns(db, _negated(list(_return_lines(db, models.Sale.book_id == book_id)), 3, 2))
+        record_purchases(db, _negated(list(_purchase_lines(db, models.Purchase.book_id == book_id)), 2, 1))
+        db.execute(delete(models.BookSalesDaily).where(models.BookSalesDaily.book_id == book_id))
+        # Drop rows that only existed because of this book
+        for model, columns in (
+                (models.CustomerSalesDaily, ("units_sold", "units_returned", "revenue", "refunds")),
+                (models.VendorPurchasesDaily, ("units", "spend")),
+        ):
+                db.execute(delete(model).where(*(getattr(model, name) == 0 for name in columns)))
+
+
+def rebuild(db: Session) -> None:
+        """Recompute every summary table from the raw rows (not committed)."""
+        for model in (models.BookSalesDaily, models.CustomerSalesDaily, models.VendorPurchasesDaily):
+                db.execute(delete(model))
+        record_sales(db, _sale_lines(db))
+        record_returns(db, _return_lines(db))
+        record_purchases(db, _purchase_lines(db))
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description="Maintain the daily summary tables behind /reports")
+        parser.add_argument("command", choices=["rebuild"])
+        parser.parse_args()
+
+        from . import migrations
+        from .database import SessionLocal, engine
+
+        migrations.upgrade(engine)
+        with SessionLocal() as db:
+                rebuild(db)
+                db.commit()
+        print("Summary tables rebuilt")
+
+
+if __name__ == "__main__":
+        main()
@@ -0,0 +1,111 @@
+"""Concurrency benchmark for the stock mutation path.
+
+Many threads sell the same book at once through ``crud.create_sale``, asking
+for more copies in total than are in stock, then the script checks that stock
+never went negative and that every successful sale is accounted for.
+
+Run from ``backend/``::
+
+    python -m benchmarks.concurrent_sales --workers 32 --attempts 2000 --stock 500
+
+Set ``DATABASE_URL`` to benchmark PostgreSQL; by default a throwaway SQLite
+file is used.
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/concurrent_sales.db"
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app import crud, migrations, models, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+
+def _seed(stock: int):
+        with SessionLocal() as db:
+                book = models.Book(title="Benchmark title", author="Benchmark", quantity=stock, price=10)
+                customer = models.Customer(
+                        name=f"Benchmark customer {time.time_ns()}", category=models.CustomerCategory.SCHOOL
+                )
+                db.add_all([book, customer])
+                db.commit()
+                return book.id, customer.id
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+        parser.add_argument("--workers", type=int, default=32)
+        parser.add_argument("--attempts", type=int, default=2000, help="total sale attempts across all workers")
+        parser.add_argument("--stock", type=int, default=500)
+        parser.add_argument("--quantity", type=int, default=1, help="copies per sale")
+        args = parser.parse_args()
+
+        migrations.upgrade(engine)
+        book_id, customer_id = _seed(args.stock)
+        counters = {"sold": 0, "rejected": 0, "errors": 0}
+        lock = threading.Lock()
+        remaining = iter(range(args.attempts))
+
+        def worker() -> None:
+                while True:
+                        with lock:
+                                if next(remaining, None) is None:
+                                        return
+                        outcome = "sold"
+                        with SessionLocal() as db:
+                                try:
+                                        crud.create_sale(
+                                                db,
+                                                customer=crud.get_customer(db, customer_id),
+                                                book=crud.get_book(db, book_id),
+                                                sale_in=schemas.SaleCreate(
+                                                        customer_id=customer_id,
+                                                        book_id=book_id,
+                                                        quantity=args.quantity,
+                                                        unit_price=10,
+                                                ),
+                                        )
+                                except ValueError:
+                                        outcome = "rejected"
+                                except OperationalError:
+                                        # e.g. SQLite "database is locked" under heavy write contention
+                                        db.rollback()
+                                        outcome = "errors"
+                        with lock:
+                                counters[outcome] += 1
+
+        threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+        started = time.perf_counter()
+        for thread in threads:
+                thread.start()
+        for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+
+        with SessionLocal() as db:
+                on_hand = db.get(models.Book, book_id).quantity
+                sold_units = db.execute(
+                        select(func.coalesce(func.sum(models.Sale.quantity), 0)).where(models.Sale.book_id == book_id)
+                ).scalar_one()
+
+        print(f"backend:      {engine.dialect.name}")
+        print(f"attempts:     {args.attempts} over {args.workers} workers in {elapsed:.2f}s")
+        print(f"throughput:   {args.attempts / elapsed:.0f} sale attempts/s")
+        print(f"sold:         {counters['sold']}  rejected: {counters['rejected']}  errors: {counters['errors']}")
+        print(f"stock:        {args.stock} -> {on_hand} (sold units recorded: {sold_units})")
+
+        consistent = on_hand >= 0 and on_hand + sold_units == args.stock
+        consistent = consistent and sold_units == counters["sold"] * args.quantity
+        print("result:       OK, no overselling" if consistent else "result:       FAILED, stock is inconsistent")
+        raise SystemExit(0 if consistent else 1)
+
+
+if __name__ == "__main__":
+        main()
@@ -0,0 +1,235 @@
+"""Seed a realistic, reproducible dataset for the load benchmarks.
+
+Rows go in through the ``models`` tables with multi-row ``INSERT``s in chunks,
+then the ``/reports`` summary tables and the reorder sales velocity are
+rebuilt from them. The data is internally consistent: every book's stock equals purchased - sold + returned,
+and ``sales.returned_quantity`` matches the returns recorded against it.
+Every purchase, sale and return is also in the stock ledger at its own
+timestamp, with a checkpoint every 30 days.
+Sales are skewed towards a minority of popular books and customers and spread
+over the last ``--days`` days. The first sales and purchases are grouped into
+``--orders`` sales orders and a tenth as many purchase orders, ``ORDER_LINES``
+lines each.
+
+Run from ``backend/`` against an empty database::
+
+    python -m benchmarks.dataset --scale 1       # 100k books, 10k customers, 1M sales, 100k returns, 50k orders
+    python -m benchmarks.dataset --scale 0.01    # 1% of that, for a quick run
+
+Set ``DATABASE_URL`` to seed PostgreSQL; by default ``benchmarks/bench.db``
+(SQLite) is used, the same file :mod:`benchmarks.load` reads.
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, List
+
+BENCH_DATABASE_URL = f"sqlite:///{os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench.db')}"
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+
+from sqlalchemy import func, insert, select, update  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app import migrations, models, reorder, search, stock, summaries  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+CHUNK_ROWS = 10_000
+
+# Counts at --scale 1
+DEFAULTS = {
+        "books": 100_000,
+        "vendors": 500,
+        "customers": 10_000,
+        "sales": 1_000_000,
+        "returns": 100_000,
+        "orders": 50_000,
+}
+# Lines per sales order and per purchase order; purchase orders are a tenth as many
+ORDER_LINES = 4
+
+WORDS = (
+        "river garden shadow empire winter silent golden broken hidden lost night city ocean stone "
+        "fire glass paper iron summer letters journey secret island mountain kingdom forest storm "
+        "history science practical guide modern complete introduction advanced principles"
+).split()
+SURNAMES = "Smith Khan Garcia Okafor Chen Rossi Novak Silva Haddad Kowalski Tanaka Dubois Murphy Larsen".split()
+
+
+def _skewed(rng: random.Random, ids: List[int]) -> int:
+        # Squaring a uniform draw puts most picks on the first ids: a few bestsellers
+        return ids[int(len(ids) * rng.random() ** 2)]
+
+
+def _insert(db: Session, model, rows: List[dict]) -> List[int]:
+        # SQLite has no sentinel for sort_by_parameter_order (it would insert row
+        # by row); a single statement there assigns increasing ids in input order
+        sqlite = db.get_bind().dialect.name == "sqlite"
+        ids: List[int] = []
+        for start in range(0, len(rows), CHUNK_ROWS):
+                chunk = rows[start : start + CHUNK_ROWS]
+                if sqlite:
+                        ids.extend(sorted(db.scalars(insert(model).returning(model.id), chunk).all()))
+                else:
+                        ids.extend(db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), chunk).all())
+        return ids
+
+
+def _movement(book_id: int, delta: int, kind: models.StockMovementKind, reference_id: int, moved_at: datetime) -> dict:
+        return {"book_id": book_id, "delta": delta, "kind": kind, "reference_id": reference_id, "moved_at": moved_at}
+
+
+def seed(db: Session, counts: Dict[str, int], days: int = 365, seed_value: int = 42) -> None:
+        """Insert ``counts`` rows of each kind and rebuild the summary tables (commits)."""
+        rng = random.Random(seed_value)
+        now = datetime.now(timezone.utc)
+
+        def moment() -> datetime:
+                return now - timedelta(seconds=rng.randrange(days * 86400))
+
+        book_rows = []
+        for i in range(counts["books"]):
+                title = " ".join(rng.sample(WORDS, rng.randint(2, 4))).title()
+                book_rows.append(
+                        {
+                                "title": f"{title} {i}",
+                                "author": f"{rng.choice(SURNAMES)} {rng.choice(WORDS).title()}",
+                                "isbn": f"978{i:010d}",
+                                "quantity": 0,
+                                "price": Decimal(rng.randrange(500, 6000)) / 100,
+                        }
+                )
+        book_ids = _insert(db, models.Book, book_rows)
+        price = {book_id: row["price"] for book_id, row in zip(book_ids, book_rows)}
+        vendor_ids = _insert(db, models.Vendor, [{"name": f"Vendor {i}"} for i in range(counts["vendors"])])
+        categories = list(models.CustomerCategory)
+        customer_ids = _insert(
+                db,
+                models.Customer,
+                [
+                        {"name": f"{rng.choice(SURNAMES)} customer {i}", "category": rng.choice(categories)}
+                        for i in range(counts["customers"])
+                ],
+        )
+
+        sales_orders = [
+                {"customer_id": _skewed(rng, customer_ids), "sold_at": moment()}
+                for _ in range(min(counts["orders"], counts["sales"] // ORDER_LINES))
+        ]
+        sales_order_ids = _insert(db, models.SalesOrder, sales_orders)
+        sold: Dict[int, int] = {}
+        sale_rows = []
+        for i in range(counts["sales"]):
+                book_id = _skewed(rng, book_ids)
+                quantity = rng.choice((1, 1, 1, 2, 3, 5))
+                sold[book_id] = sold.get(book_id, 0) + quantity
+                row = {
+                        "customer_id": _skewed(rng, customer_ids),
+                        "book_id": book_id,
+                        "quantity": quantity,
+                        "unit_price": price[book_id],
+                        "total_amount": price[book_id] * quantity,
+                        "sold_at": moment(),
+                        "order_id": None,
+                }
+                if i // ORDER_LINES < len(sales_order_ids):
+                        row.update(sales_orders[i // ORDER_LINES], order_id=sales_order_ids[i // ORDER_LINES])
+                sale_rows.append(row)
+        sale_ids = _insert(db, models.Sale, sale_rows)
+
+        returned: Dict[int, int] = {}
+        return_rows = []
+        return_books = []
+        for index in rng.sample(range(len(sale_ids)), min(counts["returns"], len(sale_ids))):
+                sale = sale_rows[index]
+                returned[sale["book_id"]] = returned.get(sale["book_id"], 0) + 1
+                return_books.append(sale["book_id"])
+                return_rows.append({"sale_id": sale_ids[index], "quantity": 1, "processed_at": sale["sold_at"]})
+        return_ids = _insert(db, models.SalesReturn, return_rows)
+        for start in range(0, len(return_rows), CHUNK_ROWS):
+                db.execute(
+                        update(models.Sale),
+                        [{"id": row["sale_id"], "returned_quantity": 1} for row in return_rows[start : start + CHUNK_ROWS]],
+                )
+
+        purchase_rows = []
+        levels = []
+        for book_id in book_ids:
+                on_hand = rng.randint(10_000, 20_000)
+                bought = sold.get(book_id, 0) - returned.get(book_id, 0) + on_hand
+                first = rng.randint(0, bought)
+                for quantity in (first, bought - first):
+                        if quantity:
+                                unit_cost = (price[book_id] * Decimal("0.6")).quantize(Decimal("0.01"))
+                                purchase_rows.append(
+                                        {
+                                                "vendor_id": rng.choice(vendor_ids),
+                                                "book_id": book_id,
+                                                "quantity": quantity,
+                                                "unit_cost": unit_cost,
+                                                "total_cost": unit_cost * quantity,
+                                                "purchased_at": moment(),
+                                        }
+                                )
+                levels.append({"id": book_id, "quantity": on_hand})
+        purchase_orders = [
+                {"vendor_id": rng.choice(vendor_ids), "purchased_at": moment()}
+                for _ in range(min(counts["orders"] // 10, len(purchase_rows) // ORDER_LINES))
+        ]
+        purchase_order_ids = _insert(db, models.PurchaseOrder, purchase_orders)
+        for row in purchase_rows:
+                row["order_id"] = None
+        for i, order_id in enumerate(purchase_order_ids):
+                for row in purchase_rows[i * ORDER_LINES : (i + 1) * ORDER_LINES]:
+                        row.update(purchase_orders[i], order_id=order_id)
+        purchase_ids = _insert(db, models.Purchase, purchase_rows)
+        for start in range(0, len(levels), CHUNK_ROWS):
+                db.execute(update(models.Book), levels[start : start + CHUNK_ROWS])
+
+        kind = models.StockMovementKind
+        movements = [
+                _movement(r["book_id"], r["quantity"], kind.PURCHASE, i, r["purchased_at"])
+                for r, i in zip(purchase_rows, purchase_ids)
+        ]
+        movements += [_movement(r["book_id"], -r["quantity"], kind.SALE, i, r["sold_at"]) for r, i in zip(sale_rows, sale_ids)]
+        movements += [
+                _movement(book_id, r["quantity"], kind.RETURN, i, r["processed_at"])
+                for r, i, book_id in zip(return_rows, return_ids, return_books)
+        ]
+        for start in range(0, len(movements), CHUNK_ROWS):
+                db.execute(insert(models.StockMovement), movements[start : start + CHUNK_ROWS])
+        for age in range(days - days % 30, 0, -30):
+                stock.checkpoint(db, now - timedelta(days=age))
+        summaries.rebuild(db)
+        reorder.rebuild(db)
+        db.commit()
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+        parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the default row counts")
+        for name, default in DEFAULTS.items():
+                parser.add_argument(f"--{name}", type=int, help=f"row count (default {default} x scale)")
+        parser.add_argument("--days", type=int, default=365, help="history spread for sales and purchases")
+        parser.add_argument("--seed", type=int, default=42)
+        args = parser.parse_args()
+        counts = {
+                name: getattr(args, name) if getattr(args, name) is not None else max(int(default * args.scale), 1)
+                for name, default in DEFAULTS.items()
+        }
+
+        migrations.upgrade(engine)
+        search.install(engine)
+        with SessionLocal() as db:
+                if db.execute(select(func.count()).select_from(models.Book)).scalar_one():
+                        raise SystemExit(f"{engine.url.render_as_string()} already has books; seed an empty database")
+                started = time.perf_counter()
+                seed(db, counts, days=args.days, seed_value=args.seed)
+        print(f"seeded {counts} into {engine.dialect.name} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+        main()
@@ -0,0 +1,175 @@
+"""Check that every filter and sort the list endpoints accept is index-backed.
+
+For each entity, each whitelisted sort column (both directions) is combined
+with no filter, each field of ``app.filtering.FIELDS`` on its own (``eq`` and
+``in`` for ids, a ``gte``/``lt`` pair for ranges), and each id filter paired
+with each range. The combination runs through ``crud.list_*`` for the first
+and second page (the second uses the keyset cursor), with an exact total.
+Every ``SELECT`` it issues is then explained. A plan that reads a table in
+full, with ``SCAN <table>`` on SQLite or ``Seq Scan`` on PostgreSQL (checked
+with ``enable_seqscan`` off, so it means no usable index), fails the check.
+Sorting a filtered subset in memory is allowed. Run from ``backend/`` against
+a seeded database and add ``--verbose`` to print every plan::
+
+    python -m benchmarks.dataset --scale 0.01
+    python -m benchmarks.explain
+
+Exits non-zero if any combination is not served by an index.
+"""
+
+import argparse
+import itertools
+import os
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from benchmarks.dataset import BENCH_DATABASE_URL
+
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+
+from sqlalchemy import event, select  # noqa: E402
+
+from app import counting, crud, filtering, models, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+MODELS = {
+        "books": models.Book,
+        "vendors": models.Vendor,
+        "customers": models.Customer,
+        "purchases": models.Purchase,
+        "sales": models.Sale,
+        "sales_returns": models.SalesReturn,
+        "sales_orders": models.SalesOrder,
+        "purchase_orders": models.PurchaseOrder,
+}
+# Order totals are summed from their lines, which must be found by index too
+LINES = {"sales_orders": models.Sale, "purchase_orders": models.Purchase}
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+_PG_FULL_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def _sample(db, entity: str) -> Dict[str, object]:
+        """An existing value per filter field, so plans see realistic bounds."""
+        model = MODELS[entity]
+        row = db.execute(select(model).order_by(model.id.desc()).limit(1)).scalar_one_or_none()
+        if row is None:
+                raise SystemExit(f"No {entity}: seed the database first with python -m benchmarks.dataset")
+        return {name: getattr(row, name) for name in filtering.FIELDS[entity]}
+
+
+def _filters(entity: str, sample: Dict[str, object]) -> List[Tuple[filtering.Filter, ...]]:
+        ids, ranges = [], []
+        for name, field in filtering.FIELDS[entity].items():
+                value = sample[name]
+                if filtering.IN in field.ops:
+                        ids.append((filtering.Filter(name, filtering.EQ, value),))
+                        ids.append((filtering.Filter(name, filtering.IN, (value,) * 3),))
+                else:
+                        if isinstance(value, datetime):
+                                low, high = value - timedelta(days=30), value + timedelta(seconds=1)
+                        elif isinstance(value, Decimal):
+                                low, high = value / 2, value * 2 + 1
+                        else:
+                                low, high = value // 2, value * 2 + 1
+                        ranges.append((filtering.Filter(name, "gte", low), filtering.Filter(name, "lt", high)))
+        pairs = [eq + bounds for eq, bounds in itertools.product(ids[::2], ranges)]
+        return [()] + ids + ranges + pairs
+
+
+def _list(db, entity: str, filters: Sequence[filtering.Filter], sort: filtering.Sort, cursor: Optional[str]):
+        kwargs = dict(
+                limit=20, cursor=cursor, total_mode=schemas.TotalMode.EXACT, as_rows=True, filters=filters, sort=sort
+        )
+        if entity in ("purchases", "sales", "sales_returns"):
+                kwargs["expand"] = schemas.Expand.IDS
+        return getattr(crud, f"list_{entity}")(db, **kwargs)
+
+
+def _plan(db, statement: str, parameters) -> List[str]:
+        connection = db.connection()
+        if engine.dialect.name == "postgresql":
+                connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+                rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+                return [row[0] for row in rows]
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        return [row[-1] for row in rows]
+
+
+def _full_scans(plan: List[str], tables: Sequence[str]) -> List[str]:
+        pattern = _PG_FULL_SCAN if engine.dialect.name == "postgresql" else _SQLITE_FULL_SCAN
+        scans = []
+        for line in plan:
+                match = pattern.search(line.strip())
+                if match and match.group(1) in tables:
+                        scans.append(line.strip())
+        return scans
+
+
+def _describe(filters: Sequence[filtering.Filter], sort: filtering.Sort) -> str:
+        parts = [f"sort={'-' if sort.descending else ''}{sort.field}"]
+        parts += [f"{name}[{op}]" for name, op, _ in filters]
+        return " ".join(parts)
+
+
+def check(verbose: bool = False) -> int:
+        """Explain every combination; returns the number that read a table in full."""
+        statements: List[Tuple[str, object]] = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("SELECT"):
+                        statements.append((statement, parameters))
+
+        failures = 0
+        checked = 0
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+                with SessionLocal() as db:
+                        for entity, columns in filtering.SORTS.items():
+                                sample = _sample(db, entity)
+                                tables = [MODELS[entity].__tablename__]
+                                if entity in LINES:
+                                        tables.append(LINES[entity].__tablename__)
+                                for column, descending, filters in itertools.product(
+                                        columns, (True, False), _filters(entity, sample)
+                                ):
+                                        sort = filtering.Sort(column, descending)
+                                        counting.invalidate(*tables)
+                                        statements.clear()
+                                        page = _list(db, entity, filters, sort, None)
+                                        if page.next_cursor:
+                                                _list(db, entity, filters, sort, page.next_cursor)
+                                        captured = list(statements)
+                                        scans = []
+                                        plans = []
+                                        for statement, parameters in captured:
+                                                plan = _plan(db, statement, parameters)
+                                                plans.append(plan)
+                                                scans += _full_scans(plan, tables)
+                                        db.rollback()
+                                        checked += 1
+                                        status = "FULL SCAN" if scans else "ok"
+                                        failures += bool(scans)
+                                        if scans or verbose:
+                                                print(f"{status:9} {entity:15} {_describe(filters, sort)}")
+                                                for plan in plans if verbose else []:
+                                                        print("          " + "\n          ".join(plan))
+                                                for scan in scans:
+                                                        print(f"          {scan}")
+        finally:
+                event.remove(engine, "before_cursor_execute", capture)
+        print(f"{checked} combinations on {engine.dialect.name}, {failures} reading a table in full")
+        return failures
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+        parser.add_argument("--verbose", action="store_true", help="print every plan")
+        args = parser.parse_args()
+        if check(verbose=args.verbose):
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+        main()
@@ -0,0 +1,351 @@
+"""Load test of the API routers against a seeded dataset.
+
+Each scenario sends ``--requests`` requests from ``--concurrency`` concurrent
+clients and reports p50/p95/p99 latency, requests per second and SQL
+statements per request (read from the ``Server-Timing`` header, so
+``INSTRUMENTATION`` must stay on). Requests go either:
+
+* in process, through ``httpx.ASGITransport`` (``--mode asgi``, default), or
+* over HTTP (``--mode http``) to ``--url``, or to a uvicorn started by the
+  script with ``--serve-workers N``.
+
+Results are written to ``benchmarks/results/<timestamp>-<commit>.json``;
+``--baseline`` compares against an earlier file and ``--max-regression``
+turns a p95 slowdown beyond that percentage into a non-zero exit, so
+regressions in ``crud.list_*``, ``create_sale`` or search show up between
+commits. Seed first with :mod:`benchmarks.dataset`; run from ``backend/``::
+
+    python -m benchmarks.dataset --scale 0.01
+    python -m benchmarks.load --requests 300 --concurrency 8
+    python -m benchmarks.load --mode http --serve-workers 4 --baseline benchmarks/results/<earlier>.json
+
+``DATABASE_URL`` must point at the seeded database (default: the dataset
+script's SQLite file); it is also used to pick existing ids for requests.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.dataset import BENCH_DATABASE_URL, WORDS
+
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Ids:
+        """Upper bounds of the seeded ids, so requests hit existing rows."""
+
+        def __init__(self) -> None:
+                with SessionLocal() as db:
+                        self.max = {
+                                name: db.execute(select(func.max(model.id))).scalar() or 0
+                                for name, model in (
+                                        ("books", models.Book),
+                                        ("customers", models.Customer),
+                                        ("sales", models.Sale),
+                                        ("purchases", models.Purchase),
+                                        ("sales_orders", models.SalesOrder),
+                                )
+                        }
+                if not self.max["books"] or not self.max["sales"]:
+                        raise SystemExit("No data: seed the database first with python -m benchmarks.dataset")
+
+        def pick(self, rng: random.Random, name: str) -> int:
+                return rng.randint(1, self.max[name])
+
+
+# name -> (rng, ids) -> (method, path, query params, JSON body)
+Scenario = Callable[[random.Random, Ids], tuple]
+
+SCENARIOS: Dict[str, Scenario] = {
+        "books.list": lambda rng, ids: ("GET", "/books/", {"limit": 20}, None),
+        "books.list_no_total": lambda rng, ids: ("GET", "/books/", {"limit": 20, "total_mode": "none"}, None),
+        "books.search": lambda rng, ids: ("GET", "/books/", {"q": rng.choice(WORDS), "limit": 20}, None),
+        "books.isbn": lambda rng, ids: ("GET", "/books/", {"q": f"978{ids.pick(rng, 'books') - 1:010d}"}, None),
+        "books.get": lambda rng, ids: ("GET", f"/books/{ids.pick(rng, 'books')}", {}, None),
+        "books.stock_as_of": lambda rng, ids: (
+                "GET",
+                f"/books/{ids.pick(rng, 'books')}/stock",
+                {"as_of": (datetime.now(timezone.utc) - timedelta(days=rng.randrange(1, 365))).isoformat()},
+                None,
+        ),
+        "books.stock_snapshot": lambda rng, ids: (
+                "GET",
+                "/books/stock",
+                {"as_of": (datetime.now(timezone.utc) - timedelta(days=rng.randrange(1, 365))).isoformat()},
+                None,
+        ),
+        "customers.search": lambda rng, ids: ("GET", "/customers/", {"q": "customer 1", "limit": 20}, None),
+        "sales.list_full": lambda rng, ids: ("GET", "/sales/", {"limit": 50}, None),
+        "sales.list_compact": lambda rng, ids: ("GET", "/sales/", {"limit": 50, "expand": "compact"}, None),
+        "sales.by_customer": lambda rng, ids: (
+                "GET",
+                "/sales/",
+                {"customer_id": ids.pick(rng, "customers"), "limit": 20, "expand": "compact"},
+                None,
+        ),
+        "sales.by_customer_month": lambda rng, ids: (
+                "GET",
+                "/sales/",
+                {
+                        "customer_id[in]": f"{ids.pick(rng, 'customers')},{ids.pick(rng, 'customers')}",
+                        "sold_at[gte]": (datetime.now(timezone.utc) - timedelta(days=rng.randrange(30, 365))).isoformat(),
+                        "limit": 20,
+                        "expand": "compact",
+                },
+                None,
+        ),
+        "sales.top_amounts": lambda rng, ids: (
+                "GET",
+                "/sales/",
+                {"total_amount[gte]": rng.randrange(10, 100), "sort": "-total_amount", "limit": 20, "expand": "ids"},
+                None,
+        ),
+        "books.low_stock": lambda rng, ids: (
+                "GET",
+                "/books/",
+                {"quantity[lte]": rng.randrange(10_000, 12_000), "sort": "quantity", "limit": 20},
+                None,
+        ),
+        "sales.get": lambda rng, ids: ("GET", f"/sales/{ids.pick(rng, 'sales')}", {}, None),
+        "purchases.list": lambda rng, ids: ("GET", "/purchases/", {"limit": 50, "expand": "compact"}, None),
+        "sales.create": lambda rng, ids: (
+                "POST",
+                "/sales/",
+                {},
+                {
+                        "customer_id": ids.pick(rng, "customers"),
+                        "book_id": ids.pick(rng, "books"),
+                        "quantity": 1,
+                        "unit_price": 10,
+                },
+        ),
+        "sales_orders.list": lambda rng, ids: ("GET", "/sales-orders/", {"limit": 50}, None),
+        "sales_orders.get": lambda rng, ids: ("GET", f"/sales-orders/{ids.pick(rng, 'sales_orders')}", {}, None),
+        "sales_orders.create": lambda rng, ids: (
+                "POST",
+                "/sales-orders/",
+                {},
+                {
+                        "customer_id": ids.pick(rng, "customers"),
+                        "lines": [{"book_id": ids.pick(rng, "books"), "quantity": 1, "unit_price": 10} for _ in range(20)],
+                },
+        ),
+        "reports.revenue": lambda rng, ids: ("GET", "/reports/revenue", {"period": "month"}, None),
+        "reorder.suggestions": lambda rng, ids: ("GET", "/reorder-suggestions", {"limit": 50}, None),
+}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+        ordered = sorted(values)
+        index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+        return ordered[min(index, len(ordered) - 1)]
+
+
+async def run_scenario(
+        client: httpx.AsyncClient, name: str, ids: Ids, requests: int, concurrency: int, warmup: int, seed: int
+) -> dict:
+        scenario = SCENARIOS[name]
+        rng = random.Random(f"{seed}:{name}")
+        latencies: List[float] = []
+        statements: List[int] = []
+        errors = 0
+
+        async def send(measure: bool) -> None:
+                nonlocal errors
+                method, path, params, body = scenario(rng, ids)
+                started = time.perf_counter()
+                response = await client.request(method, path, params=params, json=body)
+                elapsed = time.perf_counter() - started
+                if not measure:
+                        return
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                        errors += 1
+                match = _QUERIES.search(response.headers.get("server-timing", ""))
+                if match:
+                        statements.append(int(match.group(1)))
+
+        for _ in range(warmup):
+                await send(False)
+        remaining = iter(range(requests))
+
+        async def worker() -> None:
+                for _ in remaining:
+                        await send(True)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        return {
+                "requests": requests,
+                "errors": errors,
+                "rps": round(requests / elapsed, 1),
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+                "sql_per_request": round(sum(statements) / len(statements), 2) if statements else None,
+        }
+
+
+def _git_commit() -> str:
+        try:
+                commit = subprocess.run(
+                        ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+                ).stdout.strip()
+                dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+                return commit + ("-dirty" if dirty.stdout.strip() else "")
+        except (OSError, subprocess.CalledProcessError):
+                return "unknown"
+
+
+def _free_port() -> int:
+        with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                return sock.getsockname()[1]
+
+
+def _serve(workers: int) -> tuple:
+        port = _free_port()
+        server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+        )
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+                try:
+                        if httpx.get(f"{url}/health").status_code == 200:
+                                return server, url
+                except httpx.TransportError:
+                        time.sleep(0.2)
+        server.terminate()
+        raise SystemExit("uvicorn did not become ready within 60s")
+
+
+def compare(results: dict, baseline: dict, max_regression: Optional[float]) -> bool:
+        """Print p95 / rps deltas against ``baseline``; False if any p95 regressed too far."""
+        ok = True
+        print(f"\nvs {baseline['meta']['commit']} ({baseline['meta']['started_at']})")
+        print(f"{'scenario':<22}{'p95 ms':>18}{'change':>9}{'rps':>18}")
+        for name, current in results["scenarios"].items():
+                before = baseline["scenarios"].get(name)
+                if before is None:
+                        continue
+                change = (current["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+                flag = ""
+                if max_regression is not None and change > max_regression:
+                        ok = False
+                        flag = "  REGRESSION"
+                print(
+                        f"{name:<22}{before['p95_ms']:>8.2f} -> {current['p95_ms']:<7.2f}{change:>+8.1f}%"
+                        f"{before['rps']:>8.1f} -> {current['rps']:<7.1f}{flag}"
+                )
+        return ok
+
+
+async def _run(args, ids: Ids, names: List[str]) -> Dict[str, dict]:
+        server = None
+        if args.mode == "asgi":
+                from app.main import app
+
+                client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        else:
+                url = args.url
+                if url is None:
+                        server, url = _serve(args.serve_workers)
+                client = httpx.AsyncClient(
+                        base_url=url, timeout=60, limits=httpx.Limits(max_connections=args.concurrency)
+                )
+        scenarios = {}
+        try:
+                async with client:
+                        for name in names:
+                                scenarios[name] = await run_scenario(
+                                        client, name, ids, args.requests, args.concurrency, args.warmup, args.seed
+                                )
+                                result = scenarios[name]
+                                sql = "-" if result["sql_per_request"] is None else f"{result['sql_per_request']:g}"
+                                print(
+                                        f"{name:<22}{result['p50_ms']:>8.2f}{result['p95_ms']:>8.2f}{result['p99_ms']:>8.2f}"
+                                        f"{result['rps']:>9.1f}{sql:>6}{result['errors']:>7}"
+                                )
+        finally:
+                if server is not None:
+                        server.terminate()
+                        server.wait()
+        return scenarios
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+        parser.add_argument("--mode", choices=("asgi", "http"), default="asgi")
+        parser.add_argument("--url", help="running server for --mode http")
+        parser.add_argument("--serve-workers", type=int, default=1, help="uvicorn workers when --url is not given")
+        parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="repeatable; default all")
+        parser.add_argument("--output", help="results file (default benchmarks/results/<timestamp>-<commit>.json)")
+        parser.add_argument("--baseline", help="earlier results file to compare against")
+        parser.add_argument("--max-regression", type=float, help="fail if any p95 is this many percent slower")
+        args = parser.parse_args()
+
+        ids = Ids()
+        names = args.scenario or list(SCENARIOS)
+        started_at = datetime.now(timezone.utc)
+        print(f"{engine.dialect.name}, {args.mode}, {args.concurrency} concurrent, {args.requests} requests/scenario")
+        print(f"{'scenario':<22}{'p50':>8}{'p95':>8}{'p99':>8}{'req/s':>9}{'sql':>6}{'errors':>7}")
+        scenarios = asyncio.run(_run(args, ids, names))
+
+        commit = _git_commit()
+        results = {
+                "meta": {
+                        "commit": commit,
+                        "started_at": started_at.isoformat(timespec="seconds"),
+                        "database": engine.dialect.name,
+                        "mode": args.mode,
+                        "concurrency": args.concurrency,
+                        "requests": args.requests,
+                        "serve_workers": args.serve_workers if args.mode == "http" and not args.url else None,
+                        "max_ids": ids.max,
+                        "python": platform.python_version(),
+                        "env": {key: os.environ[key] for key in ("DB_ASYNC", "FAST_JSON", "ENTITY_CACHE") if key in os.environ},
+                },
+                "scenarios": scenarios,
+        }
+        output = args.output or os.path.join(RESULTS_DIR, f"{started_at:%Y%m%dT%H%M%S}-{commit}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as fh:
+                json.dump(results, fh, indent=2)
+        print(f"saved {output}")
+
+        if args.baseline:
+                with open(args.baseline) as fh:
+                        ok = compare(results, json.load(fh), args.max_regression)
+                raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+        main()
@@ -0,0 +1,149 @@
+"""Serialization cost per list page: standard FastAPI path vs fast JSON.
+
+For each list shape the script times, per page of ``--limit`` rows:
+
+* ``load``: the page query, as ORM objects (standard) or column dicts (fast);
+* ``encode``: building the ``Paginated*`` model and turning it into JSON bytes,
+  either the way FastAPI does for a returned model (dump, re-validate against
+  ``response_model``, serialize, ``json.dumps``) or with ``model_dump_json``;
+* ``request``: the whole ``GET`` through the app with ``FAST_JSON`` off / on.
+
+Run from ``backend/``::
+
+    python -m benchmarks.serialization --rows 2000 --limit 100 --repeat 200
+
+Set ``DATABASE_URL`` to benchmark PostgreSQL; by default a throwaway SQLite
+file is used.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/serialization.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import crud, models, schemas, serialization  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import create_app  # noqa: E402
+
+CASES = [
+        # (label, crud function, kwargs, page schema, endpoint response_model, path, query)
+        ("books", crud.list_books, {}, schemas.PaginatedBooks, schemas.PaginatedBooks, "/books/", {}),
+        (
+                "sales ids",
+                crud.list_sales,
+                {"expand": schemas.Expand.IDS},
+                schemas.PaginatedSalesRef,
+                schemas.PaginatedSalesView,
+                "/sales/",
+                {"expand": "ids"},
+        ),
+        (
+                "sales compact",
+                crud.list_sales,
+                {"expand": schemas.Expand.COMPACT},
+                schemas.PaginatedSalesCompact,
+                schemas.PaginatedSalesView,
+                "/sales/",
+                {"expand": "compact"},
+        ),
+        (
+                "sales full",
+                crud.list_sales,
+                {"expand": schemas.Expand.FULL},
+                schemas.PaginatedSales,
+                schemas.PaginatedSalesView,
+                "/sales/",
+                {"expand": "full"},
+        ),
+]
+
+
+def _seed(rows: int) -> None:
+        with SessionLocal() as db:
+                if db.query(models.Sale).count() >= rows:
+                        return
+                customer = models.Customer(name=f"Bench customer {time.time_ns()}", category=models.CustomerCategory.SCHOOL)
+                books = [
+                        models.Book(title=f"Bench title {i}", author=f"Author {i % 50}", quantity=10**6, price=12.5)
+                        for i in range(max(rows // 10, 1))
+                ]
+                db.add(customer)
+                db.add_all(books)
+                db.commit()
+                crud.create_sales_bulk(
+                        db,
+                        [
+                                schemas.SaleCreate(
+                                        customer_id=customer.id, book_id=books[i % len(books)].id, quantity=1, unit_price=12.5
+                                )
+                                for i in range(rows)
+                        ],
+                )
+
+
+_adapters: dict = {}
+
+
+def _fastapi_default(page_model, response_model) -> bytes:
+        # What FastAPI does with a returned model when response_model is set
+        adapter = _adapters.setdefault(response_model, TypeAdapter(response_model))
+        data = page_model.model_dump(by_alias=True)
+        validated = adapter.validate_python(data)
+        content = adapter.dump_python(validated, mode="json", by_alias=True)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _timed(fn, repeat: int) -> float:
+        started = time.perf_counter()
+        for _ in range(repeat):
+                fn()
+        return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+        parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+        parser.add_argument("--rows", type=int, default=2000, help="sales rows to seed")
+        parser.add_argument("--limit", type=int, default=100, help="rows per page")
+        parser.add_argument("--repeat", type=int, default=200)
+        args = parser.parse_args()
+
+        app = create_app()
+        _seed(args.rows)
+        client = TestClient(app)
+        print(f"per-page milliseconds, {args.limit} rows/page, mean of {args.repeat}")
+        print(f"{'shape':<15}{'mode':<10}{'load':>8}{'encode':>8}{'request':>9}{'bytes':>8}")
+        for label, list_fn, kwargs, page_schema, response_model, path, query in CASES:
+                for fast in (False, True):
+                        serialization.configure(fast)
+                        with SessionLocal() as db:
+
+                                def load():
+                                        db.expunge_all()
+                                        return list_fn(
+                                                db, limit=args.limit, total_mode=schemas.TotalMode.NONE, as_rows=fast, **kwargs
+                                        )
+
+                                page = load()
+
+                                def encode():
+                                        model = page_schema(items=page.items, total=page.total, skip=0, limit=args.limit)
+                                        return model.model_dump_json().encode() if fast else _fastapi_default(model, response_model)
+
+                                load_ms = _timed(load, args.repeat)
+                                encode_ms = _timed(encode, args.repeat)
+                                body = encode()
+                        params = {"limit": args.limit, "total_mode": "none", **query}
+                        request_ms = _timed(lambda: client.get(path, params=params).raise_for_status(), args.repeat)
+                        mode = "fast" if fast else "standard"
+                        print(f"{label:<15}{mode:<10}{load_ms:>8.2f}{encode_ms:>8.2f}{request_ms:>9.2f}{len(body):>8}")
+
+
+if __name__ == "__main__":
+        main()
@@ -5,6 +5,8 @@ type Pagination<T> = {
         total: number;
         skip: number;
         limit: number;
+        next_cursor?: string | null;
+        has_more?: boolean;
 };
 
 export type Book = {
@@ -38,6 +40,7 @@ export type Vendor = {
         contact_number?: string | null;
         email?: string | null;
         tax_number?: string | null;
+        lead_time_days?: number | null;
         created_at: string;
         updated_at: string;
 };
@@ -98,6 +101,8 @@ export type Sale = {
         quantity: number;
         unit_price: number;
         total_amount: number;
+        returned_quantity: number;
+        net_quantity: number;
         sold_at: string;
         notes?: string | null;
         created_at: string;
@@ -136,6 +141,112 @@ export type SalesReturnCreate = {
 
 export type PaginatedSalesReturns = Pagination<SalesReturn>;
 
+export type SalesOrderSummary = {
+        id: number;
+        customer_id: number;
+        customer_name?: string | null;
+        sold_at: string;
+        notes?: string | null;
+        line_count: number;
+        total_quantity: number;
+        total_amount: number;
+        created_at: string;
+        updated_at: string;
+};
+
+export type SalesOrder = SalesOrderSummary & {
+        lines: {
+                id: number;
+                book_id: number;
+                book_title?: string | null;
+                quantity: number;
+                unit_price: number;
+                total_amount: number;
+                returned_quantity: number;
+        }[];
+};
+
+export type SalesOrderCreate = {
+        customer_id: number;
+        sold_at?: string | null;
+        notes?: string | null;
+        lines: { book_id: number; quantity: number; unit_price: number }[];
+};
+
+export type PaginatedSalesOrders = Pagination<SalesOrderSummary>;
+
+export type PurchaseOrderSummary = {
+        id: number;
+        vendor_id: number;
+        vendor_name?: string | null;
+        purchased_at: string;
+        notes?: string | null;
+        line_count: number;
+        total_quantity: number;
+        total_cost: number;
+        created_at: string;
+        updated_at: string;
+};
+
+export type PurchaseOrder = PurchaseOrderSummary & {
+        lines: {
+                id: number;
+                book_id: number;
+                book_title?: string | null;
+                quantity: number;
+                unit_cost: number;
+                total_cost: number;
+        }[];
+};
+
+export type PurchaseOrderCreate = {
+        vendor_id: number;
+        purchased_at?: string | null;
+        notes?: string | null;
+        lines: { book_id: number; quantity: number; unit_cost: number }[];
+};
+
+export type PaginatedPurchaseOrders = Pagination<PurchaseOrderSummary>;
+
+export type ChangeEntity =
+        | 'books'
+        | 'vendors'
+        | 'customers'
+        | 'purchases'
+        | 'sales'
+        | 'sales_returns'
+        | 'sales_orders'
+        | 'purchase_orders';
+
+// One committed write, as pushed by GET /events
+export type Change = {
+        entity: ChangeEntity;
+        id: number;
+        op: 'upsert' | 'delete';
+        quantity?: number;
+        updated_at?: string;
+        book_id?: number;
+        returned_quantity?: number;
+};
+
+/**
+ * Subscribe to the server's change feed (browser only). `onChange` patches
+ * local state; `onReset` fires on every (re)connect and when the client fell
+ * behind, and should re-fetch whatever is on screen. Returns an unsubscribe
+ * function.
+ */
+export function subscribeChanges(
+        entities: ChangeEntity[],
+        onChange: (change: Change) => void,
+        onReset?: () => void,
+): () => void {
+        const source = new EventSource(`${API_BASE}/events${buildQuery({ entities: entities.join(',') })}`);
+        source.addEventListener('change', (event) => onChange(JSON.parse((event as MessageEvent).data)));
+        source.addEventListener('reset', () => onReset?.());
+        source.onopen = () => onReset?.();
+        return () => source.close();
+}
+
 async function request<T>(path: string, options?: RequestInit): Promise<T> {
         const res = await fetch(`${API_BASE}${path}`, {
                 ...options,
@@ -155,6 +266,10 @@ async function request<T>(path: string, options?: RequestInit): Promise<T> {
         return res.json();
 }
 
+// Backend list filters, e.g. { 'sold_at[gte]': '2026-01-01', 'book_id[in]': '1,2,3', sort: '-total_amount' }
+export type FilterOp = 'eq' | 'in' | 'gt' | 'gte' | 'lt' | 'lte';
+export type ListFilters = { sort?: string } & { [field: `${string}[${FilterOp}]`]: string | number | undefined };
+
 function buildQuery(params: Record<string, string | number | undefined | null>): string {
         const query = new URLSearchParams();
         Object.entries(params).forEach(([key, value]) => {
@@ -167,7 +282,7 @@ function buildQuery(params: Record<string, string | number | undefined | null>):
 }
 
 export const api = {
-        listBooks: (params: { skip?: number; limit?: number; q?: string } = {}) => {
+        listBooks: (params: { skip?: number; limit?: number; cursor?: string; q?: string } & ListFilters = {}) => {
                 const qs = buildQuery(params);
                 return request<PaginatedBooks>(`/books/${qs}`);
         },
@@ -176,7 +291,7 @@ export const api = {
         updateBook: (id: number, payload: BookUpdate) => request<Book>(`/books/${id}`, { method: 'PUT', body: JSON.stringify(payload) }),
         deleteBook: (id: number) => request<void>(`/books/${id}`, { method: 'DELETE' }),
 
-        listVendors: (params: { skip?: number; limit?: number; q?: string } = {}) => {
+        listVendors: (params: { skip?: number; limit?: number; cursor?: string; q?: string } & ListFilters = {}) => {
                 const qs = buildQuery(params);
                 return request<PaginatedVendors>(`/vendors/${qs}`);
         },
@@ -186,7 +301,7 @@ export const api = {
         deleteVendor: (id: number) => request<void>(`/vendors/${id}`, { method: 'DELETE' }),
 
         listCustomers: (
-                params: { skip?: number; limit?: number; q?: string; category?: CustomerCategory } = {},
+                params: { skip?: number; limit?: number; cursor?: string; q?: string; category?: CustomerCategory } & ListFilters = {},
         ) => {
                 const qs = buildQuery(params);
                 return request<PaginatedCustomers>(`/customers/${qs}`);
@@ -198,7 +313,7 @@ export const api = {
         deleteCustomer: (id: number) => request<void>(`/customers/${id}`, { method: 'DELETE' }),
 
         listPurchases: (
-                params: { skip?: number; limit?: number; vendor_id?: number; book_id?: number } = {},
+                params: { skip?: number; limit?: number; cursor?: string; vendor_id?: number; book_id?: number } & ListFilters = {},
         ) => {
                 const qs = buildQuery(params);
                 return request<PaginatedPurchases>(`/purchases/${qs}`);
@@ -206,18 +321,34 @@ export const api = {
         createPurchase: (payload: PurchaseCreate) =>
                 request<Purchase>(`/purchases/`, { method: 'POST', body: JSON.stringify(payload) }),
 
-        listSales: (params: { skip?: number; limit?: number; customer_id?: number; book_id?: number } = {}) => {
+        listSales: (params: { skip?: number; limit?: number; cursor?: string; customer_id?: number; book_id?: number } & ListFilters = {}) => {
                 const qs = buildQuery(params);
                 return request<PaginatedSales>(`/sales/${qs}`);
         },
         createSale: (payload: SaleCreate) => request<Sale>(`/sales/`, { method: 'POST', body: JSON.stringify(payload) }),
 
-        listSalesReturns: (params: { skip?: number; limit?: number; sale_id?: number } = {}) => {
+        listSalesReturns: (params: { skip?: number; limit?: number; cursor?: string; sale_id?: number } & ListFilters = {}) => {
                 const qs = buildQuery(params);
                 return request<PaginatedSalesReturns>(`/sales-returns/${qs}`);
         },
         createSalesReturn: (payload: SalesReturnCreate) =>
                 request<SalesReturn>(`/sales-returns/`, { method: 'POST', body: JSON.stringify(payload) }),
+
+        listSalesOrders: (params: { skip?: number; limit?: number; cursor?: string; customer_id?: number } & ListFilters = {}) => {
+                const qs = buildQuery(params);
+                return request<PaginatedSalesOrders>(`/sales-orders/${qs}`);
+        },
+        getSalesOrder: (id: number) => request<SalesOrder>(`/sales-orders/${id}`),
+        createSalesOrder: (payload: SalesOrderCreate) =>
+                request<SalesOrder>(`/sales-orders/`, { method: 'POST', body: JSON.stringify(payload) }),
+
+        listPurchaseOrders: (params: { skip?: number; limit?: number; cursor?: string; vendor_id?: number } & ListFilters = {}) => {
+                const qs = buildQuery(params);
+                return request<PaginatedPurchaseOrders>(`/purchase-orders/${qs}`);
+        },
+        getPurchaseOrder: (id: number) => request<PurchaseOrder>(`/purchase-orders/${id}`),
+        createPurchaseOrder: (payload: PurchaseOrderCreate) =>
+                request<PurchaseOrder>(`/purchase-orders/`, { method: 'POST', body: JSON.stringify(payload) }),
 };
 
 
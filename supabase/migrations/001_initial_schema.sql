@@ -1,5 +1,7 @@
 -- Book Inventory schema for Supabase PostgreSQL
--- Run in Supabase SQL Editor: https://supabase.com/dashboard → SQL → New query
+-- Frozen legacy: the original schema, kept for reference only. Do not run or
+-- extend it; the schema is versioned in backend/app/migrations, applied with
+-- `python -m app.migrations upgrade` from backend/.
 
 create table if not exists public.books (
 	id serial primary key,